@@ -1,29 +1,48 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.db_operations import get_db_ops, UserOperations
-from app.core.security import verify_token
+from app.core.logs import set_user
+from app.core.security import decode_token
+from app.core.sessions import session_denylist
+from app.core.tracing import traced
+from app.models.user import UserRole
 from app.schemas.user import TokenData
 
 security = HTTPBearer()
 
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
 
-def get_current_user(
+
+@traced("dependency get_token_claims")
+def get_token_claims(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
+    """Verified access token claims (no database lookup)"""
     token = credentials.credentials
-    user_id = verify_token(token)
-    if user_id is None:
+    payload = decode_token(token)
+    if payload is None or payload.get("sub") is None:
         raise credentials_exception
     
+    # Tokens from a logged-out or compromised session are rejected
+    session_id = payload.get("sid")
+    if session_id and session_denylist.is_revoked(session_id):
+        raise credentials_exception
+    
+    set_user(payload["sub"])
+    return payload
+
+
+@traced("dependency get_current_user")
+def get_current_user(
+    claims = Depends(get_token_claims)
+):
     db_ops = get_db_ops()
     user_ops = UserOperations(db_ops)
-    user = user_ops.get_user_by_id(user_id)
+    user = user_ops.get_user_by_id(claims["sub"])
     
     if not user:
         raise credentials_exception
@@ -31,6 +50,19 @@ def get_current_user(
     return user
 
 
+def _user_from_claims(claims):
+    """Authorize from the role claims, falling back to the database for older tokens"""
+    if "role" not in claims:
+        return get_current_user(claims)
+    return {
+        "id": claims["sub"],
+        "role": claims["role"],
+        "donor_id": claims.get("donor_id"),
+        "receiver_id": claims.get("receiver_id"),
+    }
+
+
+@traced("dependency get_current_admin_user")
 def get_current_admin_user(
     current_user = Depends(get_current_user)
 ):
@@ -42,10 +74,12 @@ def get_current_admin_user(
     return current_user
 
 
+@traced("dependency get_current_donor_user")
 def get_current_donor_user(
-    current_user = Depends(get_current_user)
+    claims = Depends(get_token_claims)
 ):
-    if current_user['role'] != "donor":
+    current_user = _user_from_claims(claims)
+    if current_user['role'] != UserRole.DONOR.value:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
@@ -53,10 +87,12 @@ def get_current_donor_user(
     return current_user
 
 
+@traced("dependency get_current_receiver_user")
 def get_current_receiver_user(
-    current_user = Depends(get_current_user)
+    claims = Depends(get_token_claims)
 ):
-    if current_user['role'] != "receiver":
+    current_user = _user_from_claims(claims)
+    if current_user['role'] != UserRole.RECEIVER.value:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
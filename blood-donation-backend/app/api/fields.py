@@ -0,0 +1,59 @@
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, create_model
+from functools import lru_cache
+from typing import Dict, List, Optional, Type
+from app.core.db_operations import check_columns
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[List[str]]:
+    """Parse a comma-separated fields= query parameter against a response schema"""
+    if not fields:
+        return None
+
+    requested = []
+    for name in fields.split(","):
+        name = name.strip()
+        if name and name not in requested:
+            requested.append(name)
+
+    unknown = [name for name in requested if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    # Records are always identified by id
+    if "id" not in requested:
+        requested.insert(0, "id")
+    return requested
+
+
+def select_columns(table: str, fields: List[str],
+                   computed: Dict[str, List[str]] = None) -> List[str]:
+    """Map response fields to the table columns needed to build them"""
+    columns = []
+    for name in fields:
+        for column in (computed or {}).get(name, [name]):
+            if column not in columns:
+                columns.append(column)
+    check_columns(table, columns)
+    return columns
+
+
+@lru_cache(maxsize=256)
+def partial_model(schema: Type[BaseModel], fields: tuple) -> Type[BaseModel]:
+    """Build a response model holding only the selected fields of schema"""
+    return create_model(
+        f"{schema.__name__}Partial",
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields}
+    )
+
+
+def partial_response(schema: Type[BaseModel], fields: List[str], rows: List[dict]) -> JSONResponse:
+    """Validate rows against the partial model and return them as JSON"""
+    model = partial_model(schema, tuple(fields))
+    return JSONResponse(content=[
+        model.model_validate(row).model_dump(mode="json") for row in rows
+    ])
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, Query, status
+from app.api.deps import get_current_admin_user
+from app.core.config import settings
+from app.core.profiling import query_profiler
+from app.core.slow_queries import slow_query_log
+from app.core.tracing import TracedRoute
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@router.get("/query-profile")
+def get_query_profile(current_user = Depends(get_current_admin_user)):
+    """Statements per request and query latency percentiles per route and query shape (admin only)"""
+    return {"routes": query_profiler.report()}
+
+
+@router.delete("/query-profile", status_code=status.HTTP_204_NO_CONTENT)
+def reset_query_profile(current_user = Depends(get_current_admin_user)):
+    """Clear the collected query profile (admin only)"""
+    query_profiler.reset()
+
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    limit: int = Query(100, ge=1, le=1000),
+    current_user = Depends(get_current_admin_user)
+):
+    """Recent statements over SLOW_QUERY_THRESHOLD_MS with their EXPLAIN plans, newest first (admin only)"""
+    return {
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "entries": slow_query_log.recent(limit)
+    }
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+def clear_slow_queries(current_user = Depends(get_current_admin_user)):
+    """Clear recorded slow queries and captured plans (admin only)"""
+    slow_query_log.clear()
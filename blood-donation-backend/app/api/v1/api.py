@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1 import auth, donors, blood_requests, events, donation_records, dashboard, receivers, database_test
+from app.api.v1 import auth, donors, blood_requests, events, donation_records, dashboard, receivers, database_test, search, live, admin
 
 api_router = APIRouter()
 
@@ -10,4 +10,7 @@ api_router.include_router(blood_requests.router, prefix="/blood-requests", tags=
 api_router.include_router(events.router, prefix="/events", tags=["events"])
 api_router.include_router(donation_records.router, prefix="/donation-records", tags=["donation-records"])
 api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(live.router, prefix="/live", tags=["live"])
 api_router.include_router(database_test.router, prefix="/database-test", tags=["database-test"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -1,20 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.core.db_operations import get_db_ops, UserOperations
-from app.core.security import verify_password, get_password_hash, create_access_token
-from app.schemas.user import UserCreate, UserLogin, Token, User as UserSchema
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+from app.core.database import get_db
+from app.core.resilience import DatabaseUnavailable
+from app.core.db_operations import get_db_ops, DynamicDBOperations, UserOperations, SessionOperations, DonorOperations, ReceiverOperations
+from app.core.security import create_access_token
+from app.core.password_hashing import password_hasher, PasswordHasherBusy
+from app.core.sessions import session_denylist
+from app.schemas.user import UserCreate, UserLogin, Token, RefreshTokenRequest, User as UserSchema
+from app.models.user import UserRole
 from app.api.deps import get_current_user
 from datetime import timedelta
 from app.core.config import settings
+from app.core.tracing import TracedRoute
 import uuid
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
+hasher_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Authentication service is busy, please retry shortly",
+    headers={"Retry-After": "1"},
+)
 
-@router.post("/register", response_model=UserSchema)
-def register(user_data: UserCreate):
-    try:
-        db_ops = get_db_ops()
-        user_ops = UserOperations(db_ops)
+
+def _token_claims(db_ops, user) -> dict:
+    """Role and profile ids carried in the access token, so deps can authorize without the DB"""
+    claims = {"role": user['role']}
+    if user['role'] == UserRole.DONOR.value:
+        donor = DonorOperations(db_ops).get_donor_by_user_id(user['id'])
+        claims["donor_id"] = donor['id'] if donor else None
+    elif user['role'] == UserRole.RECEIVER.value:
+        receiver = ReceiverOperations(db_ops).get_receiver_by_user_id(user['id'])
+        claims["receiver_id"] = receiver['id'] if receiver else None
+    return claims
+
+
+def _create_user(user_data: UserCreate, hashed_password: str) -> dict:
+    with get_db().unit_of_work() as uow:
+        user_ops = UserOperations(DynamicDBOperations(uow))
         
         # Check if user already exists
         existing_user = user_ops.get_user_by_email(user_data.email)
@@ -25,10 +48,23 @@ def register(user_data: UserCreate):
             )
         
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
-        return user_ops.create_user(user_data.email, hashed_password, user_data.role.value)
-    except HTTPException:
+        created_user = user_ops.create_user(user_data.email, hashed_password, user_data.role.value)
+        uow.commit()
+        return created_user
+
+
+# register and login are async so a queued bcrypt hash is awaited instead of
+# holding a threadpool thread; their database work runs in the threadpool
+@router.post("/register", response_model=UserSchema)
+async def register(user_data: UserCreate):
+    try:
+        # Hash before taking a connection, so no transaction waits on bcrypt
+        hashed_password = await password_hasher.hash_async(user_data.password)
+        return await run_in_threadpool(_create_user, user_data, hashed_password)
+    except (HTTPException, DatabaseUnavailable):
         raise
+    except PasswordHasherBusy:
+        raise hasher_busy_exception
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -36,33 +72,98 @@ def register(user_data: UserCreate):
         )
 
 
+def _start_session(db_ops, user, user_agent: str) -> dict:
+    # Start a device session so the client can refresh without re-sending credentials
+    session_ops = SessionOperations(db_ops)
+    session_id, refresh_token = session_ops.create_session(user['id'], user_agent)
+    
+    # Create access token
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        subject=user['id'], expires_delta=access_token_expires, session_id=session_id,
+        claims=_token_claims(db_ops, user)
+    )
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token
+    }
+
+
 @router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin):
+async def login(user_credentials: UserLogin, request: Request):
     db_ops = get_db_ops()
     user_ops = UserOperations(db_ops)
     
     # Authenticate user
-    user = user_ops.get_user_by_email(user_credentials.email)
+    user = await run_in_threadpool(user_ops.get_user_by_email, user_credentials.email)
+    
+    try:
+        password_ok = user is not None and await password_hasher.verify_async(user_credentials.password, user['password'])
+    except PasswordHasherBusy:
+        raise hasher_busy_exception
     
-    if not user or not verify_password(user_credentials.password, user['password']):
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create access token
+    return await run_in_threadpool(_start_session, db_ops, user, request.headers.get("User-Agent"))
+
+
+@router.post("/refresh", response_model=Token)
+def refresh(refresh_data: RefreshTokenRequest):
+    """Exchange a refresh token for a new access token and refresh token"""
+    db_ops = get_db_ops()
+    session_ops = SessionOperations(db_ops)
+    
+    rotated = session_ops.rotate_session(refresh_data.refresh_token)
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    session, refresh_token = rotated
+    user = UserOperations(db_ops).get_user_by_id(session['user_id'])
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        subject=user['id'], expires_delta=access_token_expires
+        subject=user['id'], expires_delta=access_token_expires, session_id=session['id'],
+        claims=_token_claims(db_ops, user)
     )
     
     return {
         "access_token": access_token,
-        "token_type": "bearer"
+        "token_type": "bearer",
+        "refresh_token": refresh_token
     }
 
 
+@router.post("/logout")
+def logout(refresh_data: RefreshTokenRequest):
+    """Revoke the session behind a refresh token"""
+    db_ops = get_db_ops()
+    session_ops = SessionOperations(db_ops)
+    
+    session = session_ops.get_session_by_token(refresh_data.refresh_token)
+    if session:
+        session_ops.revoke_session(session['id'])
+        session_denylist.add(session['id'])
+    
+    return {"message": "Logged out successfully"}
+
+
 @router.get("/me", response_model=UserSchema)
 def get_current_user_info(current_user = Depends(get_current_user)):
     return current_user
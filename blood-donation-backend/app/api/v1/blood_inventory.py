@@ -3,9 +3,11 @@ from typing import List
 from app.core.database import get_db
 from app.schemas.blood_inventory import BloodInventoryCreate, BloodInventoryUpdate, BloodInventory as BloodInventorySchema
 from app.api.deps import get_current_admin_user
+from app.core.pubsub import publish
+from app.core.tracing import TracedRoute
 import uuid
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/", response_model=List[BloodInventorySchema])
@@ -48,6 +50,7 @@ def create_blood_inventory_item(
         (inventory_id,)
     )[0]
     
+    publish("inventory", {"action": "created", "item": created_item})
     return created_item
 
 
@@ -100,6 +103,7 @@ def update_blood_inventory_item(
         (inventory_id,)
     )[0]
     
+    publish("inventory", {"action": "updated", "item": updated_item})
     return updated_item
 
 
@@ -142,6 +146,7 @@ def update_blood_units(
         (inventory_id,)
     )[0]
     
+    publish("inventory", {"action": "updated", "item": updated_item})
     return updated_item
 
 
@@ -168,4 +173,5 @@ def delete_blood_inventory_item(
         (inventory_id,)
     )
     
+    publish("inventory", {"action": "deleted", "item": inventory_items[0]})
     return {"message": "Inventory item deleted successfully"}
@@ -1,35 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List, Optional
+from datetime import datetime
 from app.core.db_operations import get_db_ops, ReceiverOperations
+from app.models.blood_receiver import BloodType, UrgencyLevel, RequestStatus
 from app.api.deps import get_current_admin_user
+from app.core.pubsub import publish_request_change
+from app.core.resilience import DatabaseUnavailable
+from app.core.tracing import TracedRoute
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/", response_model=List[dict])
 def get_blood_receivers(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    status_filter: str = None,
-    urgency_level: str = None
+    status_filter: Optional[RequestStatus] = None,
+    urgency_level: Optional[UrgencyLevel] = None,
+    blood_type: Optional[BloodType] = None,
+    hospital_name: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
 ):
-    """Get all blood receivers (admin only)"""
+    """Get all blood receivers (admin only)
+
+    Sorted by urgency (critical first) then request_date. The total number of
+    matching requests is returned in the X-Total-Count header.
+    """
     try:
         db_ops = get_db_ops()
         receiver_ops = ReceiverOperations(db_ops)
         
-        # Get all receivers
-        receivers = receiver_ops.get_all_receivers(limit=limit, offset=skip)
+        filters = {
+            "status": status_filter.value if status_filter else None,
+            "urgency_level": urgency_level.value if urgency_level else None,
+            "blood_type": blood_type.value if blood_type else None,
+            "hospital_name": hospital_name,
+            "date_from": date_from,
+            "date_to": date_to
+        }
         
-        # Apply filters if provided
-        if status_filter:
-            receivers = [r for r in receivers if r.get('status') == status_filter]
-        if urgency_level:
-            receivers = [r for r in receivers if r.get('urgency_level') == urgency_level]
+        receivers = receiver_ops.search_requests(limit=limit, offset=skip, **filters)
+        response.headers["X-Total-Count"] = str(receiver_ops.count_requests(**filters))
         
         return receivers
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
-        print(f"Error fetching blood receivers: {e}")
+        logger.error("Error fetching blood receivers", exc_info=e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error fetching blood receivers: {str(e)}"
@@ -62,12 +84,13 @@ def update_receiver_status(
         
         # Update status
         updated_receiver = db_ops.update_record("blood_receivers", receiver_id, {"status": new_status})
+        publish_request_change("updated", updated_receiver)
         return updated_receiver
         
-    except HTTPException:
+    except (HTTPException, DatabaseUnavailable):
         raise
     except Exception as e:
-        print(f"Error updating receiver status: {e}")
+        logger.error("Error updating receiver status", exc_info=e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error updating receiver status: {str(e)}"
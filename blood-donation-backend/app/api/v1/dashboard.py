@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends
 from app.core.database import get_db
+from app.core.tracing import TracedRoute
 from app.api.deps import get_current_admin_user
 from datetime import datetime, timedelta
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/stats")
@@ -10,10 +10,12 @@ from app.core.db_operations import (
     DonationRecordOperations,
     BloodInventoryOperations
 )
+from app.core.resilience import DatabaseUnavailable
+from app.core.tracing import TracedRoute
 from app.api.deps import get_current_admin_user
 from datetime import datetime
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/test-all-tables")
@@ -166,6 +168,8 @@ def test_all_table_operations(current_user = Depends(get_current_admin_user)):
         results["cleanup"] = "success"
         results["overall_status"] = "All tables working dynamically!"
         
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         results["error"] = str(e)
         results["overall_status"] = "Some tables have issues"
@@ -187,6 +191,8 @@ def get_table_counts(current_user = Depends(get_current_admin_user)):
     for table in tables:
         try:
             counts[table] = db_ops.count_records(table)
+        except DatabaseUnavailable:
+            raise
         except Exception as e:
             counts[table] = f"Error: {str(e)}"
     
@@ -217,6 +223,8 @@ def get_table_structure(table_name: str, current_user = Depends(get_current_admi
             "count": db_ops.count_records(table_name),
             "sample_records": records
         }
+    except DatabaseUnavailable:
+        raise
     except Exception as e:
         return {
             "table": table_name,
@@ -284,6 +292,8 @@ def execute_dynamic_query(
             "status": "success"
         }
     
+    except (HTTPException, DatabaseUnavailable):
+        raise
     except Exception as e:
         return {
             "table": table,
@@ -1,11 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.core.database import get_db
+from typing import List, Optional
+from app.core.database import get_db, get_uow
 from app.schemas.donation_record import DonationRecordCreate, DonationRecordUpdate, DonationRecord as DonationRecordSchema
 from app.api.deps import get_current_user, get_current_admin_user
+from app.api.fields import parse_fields, select_columns, partial_response
+from app.core.tasks import enqueue_test_results
+from app.core.tracing import TracedRoute
 import uuid
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
+
+# Columns needed to build the computed test_results field
+TEST_RESULT_COLUMNS = ['hiv_test', 'hepatitis_b_test', 'hepatitis_c_test', 'syphilis_test']
 
 
 @router.get("/", response_model=List[DonationRecordSchema])
@@ -13,10 +19,18 @@ def get_donation_records(
     skip: int = 0,
     limit: int = 100,
     donor_id: str = None,
+    fields: Optional[str] = None,
     db = Depends(get_db)
 ):
-    """Get all donation records (admin only)"""
-    query = "SELECT * FROM donation_records WHERE 1=1"
+    """Get all donation records (admin only, fields= selects a comma-separated subset of fields)"""
+    selected = parse_fields(fields, DonationRecordSchema)
+    columns = "*"
+    if selected:
+        columns = ", ".join(select_columns(
+            "donation_records", selected, computed={'test_results': TEST_RESULT_COLUMNS}
+        ))
+    
+    query = f"SELECT {columns} FROM donation_records WHERE 1=1"
     params = []
     
     if donor_id:
@@ -29,13 +43,17 @@ def get_donation_records(
     records = db.execute_query(query, tuple(params))
     
     # Add test_results field to each record
-    for record in records:
-        record['test_results'] = {
-            'hiv': record['hiv_test'],
-            'hepatitis_b': record['hepatitis_b_test'],
-            'hepatitis_c': record['hepatitis_c_test'],
-            'syphilis': record['syphilis_test']
-        }
+    if not selected or 'test_results' in selected:
+        for record in records:
+            record['test_results'] = {
+                'hiv': record['hiv_test'],
+                'hepatitis_b': record['hepatitis_b_test'],
+                'hepatitis_c': record['hepatitis_c_test'],
+                'syphilis': record['syphilis_test']
+            }
+    
+    if selected:
+        return partial_response(DonationRecordSchema, selected, records)
     
     return records
 
@@ -241,12 +259,12 @@ def update_test_results(
     hepatitis_b_test: bool,
     hepatitis_c_test: bool,
     syphilis_test: bool,
-    db = Depends(get_db),
-    current_user = Depends(get_current_admin_user)
+    current_user = Depends(get_current_admin_user),
+    uow = Depends(get_uow)
 ):
     """Update test results (admin only)"""
-    records = db.execute_query(
-        "SELECT * FROM donation_records WHERE id = %s",
+    records = uow.execute_query(
+        "SELECT * FROM donation_records WHERE id = %s FOR UPDATE",
         (record_id,)
     )
     
@@ -257,19 +275,24 @@ def update_test_results(
         )
     
     # Update status based on test results
-    status = "approved" if all([hiv_test, hepatitis_b_test, hepatitis_c_test, syphilis_test]) else "rejected"
+    record_status = "approved" if all([hiv_test, hepatitis_b_test, hepatitis_c_test, syphilis_test]) else "rejected"
     
-    db.execute_update(
+    uow.defer(
         """UPDATE donation_records SET hiv_test = %s, hepatitis_b_test = %s, 
            hepatitis_c_test = %s, syphilis_test = %s, status = %s WHERE id = %s""",
-        (hiv_test, hepatitis_b_test, hepatitis_c_test, syphilis_test, status, record_id)
+        (hiv_test, hepatitis_b_test, hepatitis_c_test, syphilis_test, record_status, record_id)
     )
     
+    # Inventory and donor eligibility are updated by a background job,
+    # queued in the same transaction so it exists only if the update commits
+    enqueue_test_results(record_id, records[0]['status'], record_status, db=uow)
+    
     # Get the updated record
-    updated_record = db.execute_query(
+    updated_record = uow.execute_query(
         "SELECT * FROM donation_records WHERE id = %s",
         (record_id,)
     )[0]
+    uow.commit()
     
     # Add test_results field
     updated_record['test_results'] = {
@@ -1,21 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.core.db_operations import get_db_ops, DonorOperations
+from typing import List, Optional
+from app.core.database import get_uow
+from app.core.resilience import DatabaseUnavailable
+from app.core.db_operations import get_db_ops, DynamicDBOperations, DonorOperations
+from app.core.tracing import TracedRoute
 from app.schemas.donor import DonorCreate, DonorUpdate, Donor as DonorSchema
 from app.api.deps import get_current_user, get_current_admin_user
+from app.api.fields import parse_fields, select_columns, partial_response
+import logging
 import uuid
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/", response_model=List[DonorSchema])
 def get_donors(
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    fields: Optional[str] = None
 ):
-    """Get all donors"""
+    """Get all donors (fields= selects a comma-separated subset of fields)"""
     db_ops = get_db_ops()
     donor_ops = DonorOperations(db_ops)
+    
+    selected = parse_fields(fields, DonorSchema)
+    if selected:
+        donors = donor_ops.get_all_donors(
+            limit=limit, offset=skip, fields=select_columns("donors", selected)
+        )
+        return partial_response(DonorSchema, selected, donors)
+    
     return donor_ops.get_all_donors(limit=limit, offset=skip)
 
 
@@ -39,42 +55,37 @@ def get_my_donor_profile(
 
 @router.post("/", response_model=DonorSchema)
 def create_donor_profile(
-    donor_data: DonorCreate
+    donor_data: DonorCreate,
+    uow = Depends(get_uow)
 ):
-    """Create donor profile"""
-    from app.core.db_operations import get_db_ops, DonorOperations, UserOperations
-    import uuid
-    
+    """Create donor profile (and its user, if the email is new) in one transaction"""
     try:
-        db_ops = get_db_ops()
+        db_ops = DynamicDBOperations(uow)
         donor_ops = DonorOperations(db_ops)
-        user_ops = UserOperations(db_ops)
         
-        # Check if user with this email already exists
-        existing_user = user_ops.get_user_by_email(donor_data.email)
+        # Existing user with this email, and their donor profile, in one round trip
+        existing = uow.execute_query(
+            """SELECT u.id AS user_id, d.id AS donor_id FROM users u
+               LEFT JOIN donors d ON d.user_id = u.id WHERE u.email = %s""",
+            (donor_data.email,)
+        )
         
-        if existing_user:
+        if existing:
             # Use existing user ID
-            user_id = existing_user['id']
+            user_id = existing[0]['user_id']
             
-            # Check if donor profile already exists for this user
-            existing_donor = donor_ops.get_donor_by_user_id(user_id)
-            if existing_donor:
+            if existing[0]['donor_id']:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Donor profile already exists for this email"
                 )
         else:
-            # Create new user record
-            temp_user_id = str(uuid.uuid4())
-            user_dict = {
-                "id": temp_user_id,
+            # Create new user record (sent together with the donor insert)
+            user_id = db_ops.insert_record("users", {
                 "email": donor_data.email,
                 "password": "temp_password",  # Temporary password
                 "role": "donor"
-            }
-            db_ops.create_record("users", user_dict)
-            user_id = temp_user_id
+            })
         
         # Create donor profile
         donor_dict = {
@@ -89,12 +100,14 @@ def create_donor_profile(
             "donation_units": donor_data.donation_units or 1
         }
         
-        return donor_ops.create_donor(user_id, donor_dict)
+        created_donor = donor_ops.create_donor(user_id, donor_dict)
+        uow.commit()
+        return created_donor
         
-    except HTTPException:
+    except (HTTPException, DatabaseUnavailable):
         raise
     except Exception as e:
-        print(f"Error creating donor profile: {e}")
+        logger.error("Error creating donor profile", exc_info=e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating donor profile: {str(e)}"
@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.core.database import get_db
+from typing import List, Optional
+from app.core.database import get_db, get_uow
 from app.schemas.donation_event import DonationEventCreate, DonationEventUpdate, DonationEvent as DonationEventSchema, EventRegistration
 from app.api.deps import get_current_user, get_current_admin_user
+from app.api.fields import parse_fields, select_columns, partial_response
+from app.core.pubsub import publish_event_change
+from app.core.tasks import enqueue_registration_notification
+from app.core.tracing import TracedRoute
 import uuid
 import json
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/", response_model=List[DonationEventSchema])
@@ -14,10 +18,14 @@ def get_events(
     skip: int = 0,
     limit: int = 100,
     status: str = None,
+    fields: Optional[str] = None,
     db = Depends(get_db)
 ):
-    """Get all events (public endpoint)"""
-    query = "SELECT * FROM donation_events WHERE 1=1"
+    """Get all events (public endpoint, fields= selects a comma-separated subset of fields)"""
+    selected = parse_fields(fields, DonationEventSchema)
+    columns = ", ".join(select_columns("donation_events", selected)) if selected else "*"
+    
+    query = f"SELECT {columns} FROM donation_events WHERE 1=1"
     params = []
     
     if status:
@@ -30,11 +38,15 @@ def get_events(
     events = db.execute_query(query, tuple(params))
     
     # Parse JSON fields
-    for event in events:
-        if event['registered_donors']:
-            event['registered_donors'] = json.loads(event['registered_donors'])
-        else:
-            event['registered_donors'] = []
+    if not selected or 'registered_donors' in selected:
+        for event in events:
+            if event['registered_donors']:
+                event['registered_donors'] = json.loads(event['registered_donors'])
+            else:
+                event['registered_donors'] = []
+    
+    if selected:
+        return partial_response(DonationEventSchema, selected, events)
     
     return events
 
@@ -65,6 +77,7 @@ def create_event(
     # Parse JSON fields
     created_event['registered_donors'] = json.loads(created_event['registered_donors'])
     
+    publish_event_change("created", created_event)
     return created_event
 
 
@@ -172,6 +185,7 @@ def update_event(
     # Parse JSON fields
     updated_event['registered_donors'] = json.loads(updated_event['registered_donors'])
     
+    publish_event_change("updated", updated_event)
     return updated_event
 
 
@@ -179,12 +193,13 @@ def update_event(
 def register_for_event(
     event_id: str,
     registration: EventRegistration,
-    db = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    uow = Depends(get_uow)
 ):
     """Register for event (authenticated users)"""
-    events = db.execute_query(
-        "SELECT * FROM donation_events WHERE id = %s",
+    # Lock the event row so concurrent registrations can't overwrite each other's list
+    events = uow.execute_query(
+        "SELECT * FROM donation_events WHERE id = %s FOR UPDATE",
         (event_id,)
     )
     
@@ -217,13 +232,13 @@ def register_for_event(
     
     registered_donors.append(registration.donor_id)
     
-    db.execute_update(
+    uow.defer(
         "UPDATE donation_events SET registered_donors = %s WHERE id = %s",
         (json.dumps(registered_donors), event_id)
     )
     
     # Get the updated event
-    updated_event = db.execute_query(
+    updated_event = uow.execute_query(
         "SELECT * FROM donation_events WHERE id = %s",
         (event_id,)
     )[0]
@@ -231,6 +246,10 @@ def register_for_event(
     # Parse JSON fields
     updated_event['registered_donors'] = json.loads(updated_event['registered_donors'])
     
+    enqueue_registration_notification(event_id, registration.donor_id, db=uow)
+    uow.commit()
+    
+    publish_event_change("updated", updated_event)
     return updated_event
 
 
@@ -238,12 +257,13 @@ def register_for_event(
 def unregister_from_event(
     event_id: str,
     registration: EventRegistration,
-    db = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    uow = Depends(get_uow)
 ):
     """Unregister from event (authenticated users)"""
-    events = db.execute_query(
-        "SELECT * FROM donation_events WHERE id = %s",
+    # Lock the event row so concurrent registrations can't overwrite each other's list
+    events = uow.execute_query(
+        "SELECT * FROM donation_events WHERE id = %s FOR UPDATE",
         (event_id,)
     )
     
@@ -264,13 +284,13 @@ def unregister_from_event(
     
     registered_donors.remove(registration.donor_id)
     
-    db.execute_update(
+    uow.defer(
         "UPDATE donation_events SET registered_donors = %s WHERE id = %s",
         (json.dumps(registered_donors), event_id)
     )
     
     # Get the updated event
-    updated_event = db.execute_query(
+    updated_event = uow.execute_query(
         "SELECT * FROM donation_events WHERE id = %s",
         (event_id,)
     )[0]
@@ -278,6 +298,9 @@ def unregister_from_event(
     # Parse JSON fields
     updated_event['registered_donors'] = json.loads(updated_event['registered_donors'])
     
+    uow.commit()
+    
+    publish_event_change("updated", updated_event)
     return updated_event
 
 
@@ -304,4 +327,5 @@ def delete_event(
         (event_id,)
     )
     
+    publish_event_change("deleted", events[0])
     return {"message": "Event deleted successfully"}
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.core.config import settings
+from app.core.pubsub import event_bus, format_sse
+from app.core.tracing import TracedRoute
+import asyncio
+
+router = APIRouter(route_class=TracedRoute)
+
+LIVE_TOPICS = ["inventory", "requests", "critical", "events"]
+
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    topics: Optional[str] = None,
+    last_event_id: Optional[int] = Header(None)
+):
+    """Server-Sent Events feed of inventory, blood request and event changes
+
+    topics is a comma-separated subset of inventory, requests, critical, events
+    (all by default). Reconnecting clients send Last-Event-ID to replay what
+    they missed.
+    """
+    selected = [t.strip() for t in topics.split(",") if t.strip()] if topics else LIVE_TOPICS
+    unknown = [t for t in selected if t not in LIVE_TOPICS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid topics: {', '.join(unknown)}. Valid topics: {LIVE_TOPICS}"
+        )
+    
+    async def event_stream():
+        subscription, missed = event_bus.subscribe(selected, last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            for event in missed:
+                yield format_sse(event)
+            
+            while not subscription.overflowed:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.LIVE_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,22 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.core.db_operations import get_db_ops, ReceiverOperations, BloodRequestOperations
+from typing import List, Optional
+from app.core.database import get_uow
+from app.core.db_operations import get_db_ops, DynamicDBOperations, ReceiverOperations, BloodRequestOperations
 from app.schemas.blood_receiver import BloodReceiverCreate, BloodReceiverUpdate, BloodReceiver as BloodReceiverSchema
 from app.api.deps import get_current_user, get_current_admin_user, get_current_receiver_user
+from app.api.fields import parse_fields, select_columns, partial_response
+from app.core.pubsub import publish_request_change
+from app.core.tracing import TracedRoute
 import uuid
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/", response_model=List[BloodReceiverSchema])
 def get_receivers(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = None,
     current_user = Depends(get_current_admin_user)
 ):
-    """Get all receivers (admin only)"""
+    """Get all receivers (admin only, fields= selects a comma-separated subset of fields)"""
     db_ops = get_db_ops()
     receiver_ops = ReceiverOperations(db_ops)
+    
+    selected = parse_fields(fields, BloodReceiverSchema)
+    if selected:
+        receivers = receiver_ops.get_all_receivers(
+            limit=limit, offset=skip, fields=select_columns("blood_receivers", selected)
+        )
+        return partial_response(BloodReceiverSchema, selected, receivers)
+    
     return receiver_ops.get_all_receivers(limit=limit, offset=skip)
 
 
@@ -41,11 +54,11 @@ def get_my_receiver_profile(
 @router.post("/", response_model=BloodReceiverSchema)
 def create_receiver_profile(
     receiver_data: BloodReceiverCreate,
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    uow = Depends(get_uow)
 ):
     """Create receiver profile"""
-    db_ops = get_db_ops()
-    receiver_ops = ReceiverOperations(db_ops)
+    receiver_ops = ReceiverOperations(DynamicDBOperations(uow))
     
     # Check if receiver profile already exists
     existing_receiver = receiver_ops.get_receiver_by_user_id(current_user['id'])
@@ -72,7 +85,10 @@ def create_receiver_profile(
         "notes": receiver_data.notes
     }
     
-    return receiver_ops.create_receiver(current_user['id'], receiver_dict)
+    created_receiver = receiver_ops.create_receiver(current_user['id'], receiver_dict)
+    uow.commit()
+    publish_request_change("created", created_receiver)
+    return created_receiver
 
 
 @router.put("/me", response_model=BloodReceiverSchema)
@@ -127,7 +143,9 @@ def update_my_receiver_profile(
             detail="No fields to update"
         )
     
-    return db_ops.update_record("blood_receivers", existing_receiver['id'], update_data)
+    updated_receiver = db_ops.update_record("blood_receivers", existing_receiver['id'], update_data)
+    publish_request_change("updated", updated_receiver)
+    return updated_receiver
 
 
 @router.get("/{receiver_id}", response_model=BloodReceiverSchema)
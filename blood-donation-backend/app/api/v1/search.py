@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from app.core.db_operations import get_db_ops, SearchOperations
+from app.core.tracing import TracedRoute
+from app.api.deps import get_current_admin_user
+
+router = APIRouter(route_class=TracedRoute)
+
+SEARCH_TYPES = ["donors", "receivers", "events"]
+
+
+@router.get("/")
+def search(
+    q: str = Query(..., min_length=2, max_length=100),
+    types: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user = Depends(get_current_admin_user)
+):
+    """Search donors, receivers and events by relevance (admin only)
+
+    types is a comma-separated subset of donors, receivers, events (all by default).
+    Donor email and phone also match by prefix.
+    """
+    requested = [t.strip() for t in types.split(",") if t.strip()] if types else SEARCH_TYPES
+    unknown = [t for t in requested if t not in SEARCH_TYPES]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid search types: {', '.join(unknown)}. Valid types: {SEARCH_TYPES}"
+        )
+    
+    db_ops = get_db_ops()
+    search_ops = SearchOperations(db_ops)
+    
+    results = {}
+    if "donors" in requested:
+        results["donors"] = search_ops.search_donors(q, limit)
+    if "receivers" in requested:
+        results["receivers"] = search_ops.search_receivers(q, limit)
+    if "events" in requested:
+        results["events"] = search_ops.search_events(q, limit)
+    
+    return results
@@ -0,0 +1,72 @@
+import threading
+import time
+from fastapi import status
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+
+
+class DBWaitTracker:
+    """Decaying average of how long requests wait to get a database connection.
+
+    The average halves every HALF_LIFE_SECONDS without new samples, so load
+    shedding stops on its own once requests stop reaching the database.
+    """
+
+    HALF_LIFE_SECONDS = 1.0
+    ALPHA = 0.2
+
+    def __init__(self):
+        self._average_ms = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decayed(self, now: float) -> float:
+        return self._average_ms * 0.5 ** ((now - self._updated_at) / self.HALF_LIFE_SECONDS)
+
+    def record(self, seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            self._average_ms = self._decayed(now) * (1 - self.ALPHA) + seconds * 1000 * self.ALPHA
+            self._updated_at = now
+
+    @property
+    def average_ms(self) -> float:
+        return self._decayed(time.monotonic())
+
+
+# Global DB wait tracker, fed by Database.get_connection
+db_wait = DBWaitTracker()
+
+
+class AdmissionControlMiddleware:
+    """Shed load with 503 once too many requests are in flight or the DB is backed up.
+
+    Paths in ADMISSION_EXEMPT_PATHS (health checks, long-lived streams) are
+    neither counted nor shed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or any(
+            scope["path"].startswith(path) for path in settings.ADMISSION_EXEMPT_PATHS
+        ):
+            return await self.app(scope, receive, send)
+
+        if (self.in_flight >= settings.ADMISSION_MAX_IN_FLIGHT
+                or db_wait.average_ms > settings.ADMISSION_MAX_DB_WAIT_MS):
+            response = JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": "Server is overloaded, please retry shortly"},
+                headers={"Retry-After": "1"}
+            )
+            return await response(scope, receive, send)
+
+        # Only touched from the event loop thread, so no lock is needed
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
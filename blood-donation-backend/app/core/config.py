@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 
 
@@ -10,11 +10,132 @@ class Settings(BaseSettings):
     DB_NAME: str = "blood_donation_db"
     DB_USER: str = "root"
     DB_PASSWORD: str = "your_mysql_password_here"
+    DB_POOL_SIZE: int = 10  # per worker process
+    DB_POOL_MIN_SIZE: int = 2  # connections opened before a worker takes traffic
+    DB_POOL_TIMEOUT_SECONDS: int = 5
+    DB_INIT_ON_STARTUP: bool = True  # create tables/indexes when a worker starts
+    DB_REPLICA_HOSTS: List[str] = []  # "host" or "host:port"; reads go here when set
+    DB_REPLICA_MAX_LAG_SECONDS: int = 5
+    DB_REPLICA_LAG_CHECK_SECONDS: int = 5
+    DB_REPLICA_ALLOW_STANDALONE: bool = False  # use replica hosts that aren't replicating (stand-ins for testing)
+    DB_READ_YOUR_WRITES_SECONDS: int = 5  # read from the primary this long after a write
+    DB_CONNECT_TIMEOUT_SECONDS: int = 5
+    DB_CONNECT_RETRIES: int = 2  # extra connect attempts, with exponential backoff
+    DB_CONNECT_BACKOFF_SECONDS: float = 0.1
+    DB_READ_RETRIES: int = 2  # extra attempts for SELECTs failing with transient errors
+    DB_POOL_PING_IDLE_SECONDS: int = 30  # ping pooled connections idle longer than this
+    DB_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    DB_CIRCUIT_RESET_SECONDS: int = 10
+    DEGRADED_CACHE_ENTRIES: int = 500  # GET responses kept for serving while the DB is down
+    DEGRADED_CACHE_MAX_BYTES: int = 65536
+    DEGRADED_CACHE_MAX_AGE_SECONDS: int = 3600
+    
+    # Server Configuration (production launcher)
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 0  # 0 = one worker process per CPU
+    WORKER_MAX_REQUESTS: int = 0  # recycle a worker after this many requests, 0 = never
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30
     
     # JWT Configuration
     JWT_SECRET_KEY: str = "your_super_secret_jwt_key_here_change_this_in_production"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    SESSION_DENYLIST_SYNC_SECONDS: int = 10
+    TOKEN_CACHE_SIZE: int = 10000
+    
+    # Password Hashing Configuration
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 0  # 0 = one worker process per CPU
+    PASSWORD_HASH_MAX_PENDING: int = 32  # queued + running hashes before 503
+    PASSWORD_HASH_TIMEOUT_SECONDS: int = 10
+    
+    # Query Configuration
+    COUNT_CACHE_TTL_SECONDS: int = 30
+    
+    # Live Feed Configuration
+    LIVE_HEARTBEAT_SECONDS: int = 15
+    LIVE_REPLAY_BUFFER_SIZE: int = 1000
+    LIVE_SUBSCRIBER_QUEUE_SIZE: int = 100
+    
+    # Query Profiler Configuration
+    QUERY_PROFILER_ENABLED: bool = True  # Server-Timing header and /admin/query-profile
+    QUERY_PROFILER_SAMPLES: int = 1000  # recent values kept per route and query shape
+    
+    # Slow Query Log Configuration
+    SLOW_QUERY_THRESHOLD_MS: int = 200  # 0 = off
+    SLOW_QUERY_LOG_SIZE: int = 500  # entries kept for /admin/slow-queries
+    SLOW_QUERY_LOG_FILE: str = ""  # also append JSON lines here when set
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10485760
+    SLOW_QUERY_LOG_BACKUPS: int = 5
+    
+    # Query Audit Configuration (development and tests)
+    QUERY_AUDIT_MODE: str = "off"  # "warn" prints N+1 findings per request, "raise" turns the response into a 500
+    QUERY_AUDIT_MAX_REPEATS: int = 5  # runs of one statement shape per request
+    QUERY_AUDIT_MAX_DUPLICATES: int = 1  # runs of one statement with the same parameters
+    QUERY_AUDIT_LOOKUP_LOOP: int = 3  # single-row lookups by one column that should be an IN query
+    
+    # Logging Configuration (JSON lines, written by a background thread)
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = ""  # stdout when empty
+    LOG_QUEUE_SIZE: int = 10000  # records waiting for the writer; more are dropped rather than blocking
+    LOG_RATE_LIMIT_BURST: int = 5  # warnings/errors per message per window; 0 = unlimited
+    LOG_RATE_LIMIT_SECONDS: int = 60
+    LOG_TRACEBACKS: bool = True
+    
+    # Tracing Configuration
+    TRACING_SAMPLE_RATE: float = 0.0  # fraction of requests traced; 0 = off
+    TRACING_FOLLOW_PARENT: bool = False  # honour the sampled flag of an incoming traceparent header (trusted callers only)
+    TRACING_EXPORTER: str = "file"  # "file" (JSON lines) or "collector" (POST to TRACING_COLLECTOR_URL)
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_FILE_MAX_BYTES: int = 10485760
+    TRACING_FILE_BACKUPS: int = 5
+    TRACING_COLLECTOR_URL: str = "http://localhost:4318/v1/traces"
+    
+    # Metrics Configuration
+    METRICS_ENABLED: bool = True  # Prometheus text format at /metrics
+    METRICS_ALLOWED_CLIENTS: List[str] = ["127.0.0.1", "::1"]  # client addresses that may scrape without a token
+    METRICS_TOKEN: str = ""  # when set, other clients may scrape with Authorization: Bearer <token>
+    
+    # Idempotency Configuration
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_WAIT_SECONDS: int = 10
+    IDEMPOTENCY_LEASE_SECONDS: int = 60  # an in-progress key whose request died is taken over after this
+    
+    # Background Job Configuration
+    JOB_WORKER_THREADS: int = 2  # per worker process, 0 = don't run jobs here
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_BATCH_SIZE: int = 10
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_BACKOFF_BASE_SECONDS: int = 2
+    JOB_BACKOFF_MAX_SECONDS: int = 600
+    JOB_LOCK_TIMEOUT_SECONDS: int = 300  # running jobs older than this are retried
+    BLOOD_SHELF_LIFE_DAYS: int = 42
+    
+    # Rate Limiting Configuration
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (per process) or "redis" (shared)
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    # Reverse proxies in front of the app that append to X-Forwarded-For; 0 = use the socket peer
+    RATE_LIMIT_TRUSTED_PROXIES: int = 0
+    # Route class -> [tokens per second, burst]
+    RATE_LIMIT_CLASSES: Dict[str, List[float]] = {
+        "auth": [0.2, 10],  # per client and submitted email (or refresh token)
+        "auth_client": [2, 100],  # per client across all auth requests
+        "write": [5, 20],
+        "read": [20, 50],
+    }
+    # [method or "*", path regex, route class]; unmatched GETs are "read", other methods "write"
+    RATE_LIMIT_ROUTES: List[List[str]] = [
+        ["POST", "^/api/v1/auth/(login|register|refresh)$", "auth"],
+        ["*", "^/(health|ready|docs|redoc|openapi.json)", "unlimited"],
+    ]
+    
+    # Admission Control Configuration
+    ADMISSION_MAX_IN_FLIGHT: int = 200
+    ADMISSION_MAX_DB_WAIT_MS: int = 500
+    ADMISSION_EXEMPT_PATHS: List[str] = ["/health", "/ready", "/api/v1/live/"]
     
     # FastAPI Configuration
     API_V1_STR: str = "/api/v1"
@@ -1,94 +1,720 @@
+import itertools
+import logging
+import os
 import pymysql
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from app.core.config import settings
+from app.core.admission import db_wait
+from app.core.resilience import CircuitBreaker, DatabaseUnavailable, is_connection_error, is_retryable_read_error
+from app.core.profiling import query_shape, record_statement
+from app.core.query_audit import audit_statement
+from app.core.metrics import metrics
+from app.core.slow_queries import slow_query_log
+from app.core import tracing
 import uuid
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
-class Database:
-    def __init__(self):
-        self.connection = None
+logger = logging.getLogger(__name__)
+
+# Who the current request acts for (user or client IP), set by ReadYourWritesMiddleware
+read_session: ContextVar[Optional[str]] = ContextVar("read_session", default=None)
+
+# When the current request (or job) last wrote through execute_update/execute_insert
+_last_write_at: ContextVar[float] = ContextVar("last_write_at", default=float("-inf"))
+
+
+def _run(cursor, query: str, params=None, many: bool = False):
+    """cursor.execute (or executemany), timed for the query profiler, metrics, slow query log, query audit and tracing"""
+    started = time.perf_counter()
+    try:
+        if many:
+            return cursor.executemany(query, params)
+        return cursor.execute(query, params)
+    finally:
+        elapsed = time.perf_counter() - started
+        record_statement(query, elapsed)
+        metrics.observe("db_query_duration_seconds", elapsed, query_shape(query))
+        if settings.SLOW_QUERY_THRESHOLD_MS and elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            # executemany: the first row's parameters stand in for the batch
+            slow_query_log.record(query, params[0] if many and params else params, elapsed, cursor.rowcount)
+        audit_statement(query, params, many, cursor.rowcount)
+        if tracing.current_span.get() is not None:
+            tracing.record("db.query", elapsed, **{"db.statement": query_shape(query), "db.rows": cursor.rowcount})
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection frees up within DB_POOL_TIMEOUT_SECONDS"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of up to pool_size connections to one MySQL server.
+
+    Connections are opened lazily (or up front by warm()) and reused LIFO so
+    idle ones stay few. One idle for longer than DB_POOL_PING_IDLE_SECONDS
+    is pinged before reuse and replaced if the server dropped it. Failed
+    connects are retried with exponential backoff, and a circuit breaker
+    fails fast while the server stays unreachable. A forked child starts
+    with an empty pool instead of sharing the parent's sockets.
+    """
+
+    def __init__(self, host: str, port: int, pool_size: int):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.name = f"{host}:{port}"
+        self.breaker = CircuitBreaker(self.name)
+        # Replica health, maintained by Database._check_replicas
+        self.healthy = True
+        self.lag_seconds: Optional[int] = None
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+    
+    def _reset(self):
+        # Holds (connection, idle_since) pairs
+        self._pool = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
     
     def connect(self):
-        """Create database connection"""
+        """Create database connection, retrying connection failures with backoff"""
+        delay = settings.DB_CONNECT_BACKOFF_SECONDS
+        for attempt in range(settings.DB_CONNECT_RETRIES + 1):
+            try:
+                connection = pymysql.connect(
+                    host=self.host,
+                    port=self.port,
+                    user=settings.DB_USER,
+                    password=settings.DB_PASSWORD,
+                    database=settings.DB_NAME,
+                    charset='utf8mb4',
+                    cursorclass=pymysql.cursors.DictCursor,
+                    autocommit=True,
+                    connect_timeout=settings.DB_CONNECT_TIMEOUT_SECONDS
+                )
+                self.breaker.record_success()
+                return connection
+            except Exception as e:
+                logger.warning("Database connection to %s:%s failed: %s", self.host, self.port, e)
+                if not is_connection_error(e):
+                    raise e
+                error = e
+            if attempt < settings.DB_CONNECT_RETRIES:
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                delay *= 2
+        
+        self.breaker.record_failure()
+        raise DatabaseUnavailable(f"Can't connect to database {self.host}:{self.port}") from error
+    
+    def _open(self):
+        """connect(), giving the slot back if it fails"""
         try:
-            self.connection = pymysql.connect(
-                host=settings.DB_HOST,
-                port=settings.DB_PORT,
-                user=settings.DB_USER,
-                password=settings.DB_PASSWORD,
-                database=settings.DB_NAME,
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor,
-                autocommit=True
-            )
-            return self.connection
-        except Exception as e:
-            print(f"Database connection failed: {e}")
-            raise e
+            return self.connect()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+    
+    def _alive(self, connection) -> bool:
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            connection.close()
+            return False
     
     def get_connection(self):
-        """Get database connection"""
-        if not self.connection or not self.connection.open:
-            self.connect()
-        return self.connection
+        """Borrow a connection from the pool; give it back with release()"""
+        self.breaker.check()
+        started = time.perf_counter()
+        try:
+            connection, idle_since = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.pool_size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                connection, idle_since = self._open(), None
+            else:
+                try:
+                    connection, idle_since = self._pool.get(timeout=settings.DB_POOL_TIMEOUT_SECONDS)
+                except queue.Empty:
+                    raise PoolTimeout("Timed out waiting for a database connection")
+        waited = time.perf_counter() - started
+        db_wait.record(waited)
+        metrics.observe("db_pool_wait_seconds", waited, self.name)
+        if tracing.current_span.get() is not None:
+            tracing.record("db.pool.wait", waited, **{"db.pool": self.name})
+        
+        # Keepalive: the server may have closed a long-idle connection (wait_timeout, restart)
+        if idle_since is not None and time.monotonic() - idle_since > settings.DB_POOL_PING_IDLE_SECONDS:
+            if not self._alive(connection):
+                connection = self._open()
+        elif not connection.open:
+            connection = self._open()
+        return connection
+    
+    def release(self, connection):
+        """Return a borrowed connection to the pool.
+
+        pymysql closes a connection on network errors, so a closed one here
+        counts as a failure for the circuit breaker, an open one as a success.
+        """
+        if connection.open:
+            self.breaker.record_success()
+            self._pool.put((connection, time.monotonic()))
+        else:
+            self.breaker.record_failure()
+            with self._lock:
+                self._opened -= 1
     
-    def execute_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
-        """Execute SELECT query and return results"""
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for the duration of a with block"""
+        connection = self.get_connection()
         try:
-            connection = self.get_connection()
+            yield connection
+        finally:
+            self.release(connection)
+    
+    def warm(self, size: int = None):
+        """Open connections up front so the first requests don't pay for connecting"""
+        connections = [self.get_connection() for _ in range(min(size or settings.DB_POOL_MIN_SIZE, self.pool_size))]
+        for connection in connections:
+            self.release(connection)
+    
+    def close(self):
+        """Close all idle pooled connections"""
+        while True:
+            try:
+                connection, _ = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._opened -= 1
+            if connection.open:
+                connection.close()
+
+
+def _replica_addresses() -> List[Tuple[str, int]]:
+    """Parse DB_REPLICA_HOSTS entries of the form host or host:port"""
+    addresses = []
+    for entry in settings.DB_REPLICA_HOSTS:
+        host, _, port = entry.partition(":")
+        addresses.append((host, int(port) if port else settings.DB_PORT))
+    return addresses
+
+
+class Database:
+    """Routes statements to the primary (DB_HOST) and optional read replicas.
+
+    execute_query reads from a healthy replica unless primary=True is passed
+    or the current request, or the same user, wrote within
+    DB_READ_YOUR_WRITES_SECONDS. Replicas lagging more than
+    DB_REPLICA_MAX_LAG_SECONDS, or failing, are skipped until the next lag
+    check; with none left, reads fall back to the primary.
+    """
+
+    def __init__(self, pool_size: int = None):
+        pool_size = pool_size or settings.DB_POOL_SIZE
+        self.primary = ConnectionPool(settings.DB_HOST, settings.DB_PORT, pool_size)
+        self.replicas = [ConnectionPool(host, port, pool_size) for host, port in _replica_addresses()]
+        self._next_replica = itertools.count()
+        self._recent_writers: Dict[str, float] = {}
+        self._replicas_checked_at = float("-inf")
+        self._check_lock = threading.Lock()
+    
+    def connect(self):
+        return self.primary.connect()
+    
+    def get_connection(self):
+        """Borrow a primary connection; give it back with release()"""
+        return self.primary.get_connection()
+    
+    def release(self, connection):
+        self.primary.release(connection)
+    
+    def connection(self):
+        """Borrow a primary connection for the duration of a with block"""
+        return self.primary.connection()
+    
+    def warm(self, size: int = None):
+        self.primary.warm(size)
+        for replica in self.replicas:
+            try:
+                replica.warm(size)
+            except Exception:
+                replica.healthy = False
+    
+    def close(self):
+        for pool in [self.primary, *self.replicas]:
+            pool.close()
+    
+    def _mark_write(self):
+        now = time.monotonic()
+        _last_write_at.set(now)
+        session = read_session.get()
+        if session is not None and self.replicas:
+            if len(self._recent_writers) > 10000:
+                cutoff = now - settings.DB_READ_YOUR_WRITES_SECONDS
+                self._recent_writers = {
+                    key: at for key, at in self._recent_writers.items() if at >= cutoff
+                }
+            self._recent_writers[session] = now
+    
+    def _wrote_recently(self) -> bool:
+        cutoff = time.monotonic() - settings.DB_READ_YOUR_WRITES_SECONDS
+        if _last_write_at.get() >= cutoff:
+            return True
+        session = read_session.get()
+        return session is not None and self._recent_writers.get(session, float("-inf")) >= cutoff
+    
+    def _replica_lag(self, replica: ConnectionPool) -> Optional[int]:
+        """Seconds behind the primary, or None (unhealthy) for a server that isn't replicating.
+
+        A server with no replication configured at all reports no status; it
+        counts as current only with DB_REPLICA_ALLOW_STANDALONE (a stand-in).
+        """
+        with replica.connection() as connection:
             with connection.cursor() as cursor:
-                cursor.execute(query, params)
-                return cursor.fetchall()
-        except Exception as e:
-            print(f"Query execution failed: {e}")
-            raise e
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                except pymysql.err.ProgrammingError:
+                    # MySQL before 8.0.22
+                    cursor.execute("SHOW SLAVE STATUS")
+                status = cursor.fetchone()
+        if not status:
+            return 0 if settings.DB_REPLICA_ALLOW_STANDALONE else None
+        return status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+    
+    def _check_replicas(self):
+        """Refresh replica health every DB_REPLICA_LAG_CHECK_SECONDS (one thread checks, others move on)"""
+        if time.monotonic() - self._replicas_checked_at < settings.DB_REPLICA_LAG_CHECK_SECONDS:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._replicas_checked_at = time.monotonic()
+            for replica in self.replicas:
+                try:
+                    replica.lag_seconds = self._replica_lag(replica)
+                except Exception as e:
+                    logger.warning("Replica %s:%s unavailable: %s", replica.host, replica.port, e)
+                    replica.lag_seconds = None
+                # None means replication is stopped or broken
+                replica.healthy = (replica.lag_seconds is not None
+                                   and replica.lag_seconds <= settings.DB_REPLICA_MAX_LAG_SECONDS)
+        finally:
+            self._check_lock.release()
+    
+    def _pick_replica(self) -> Optional[ConnectionPool]:
+        self._check_replicas()
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next_replica) % len(healthy)]
+    
+    def _query(self, pool: ConnectionPool, query: str, params: tuple = None) -> List[Dict[str, Any]]:
+        with pool.connection() as connection:
+            try:
+                with connection.cursor() as cursor:
+                    _run(cursor, query, params)
+                    return cursor.fetchall()
+            except Exception as e:
+                logger.error("Query execution failed", exc_info=e, extra={"statement": query_shape(query)})
+                raise e
+    
+    def _read(self, pool: ConnectionPool, query: str, params: tuple = None) -> List[Dict[str, Any]]:
+        """_query, retrying transient failures (reads are safe to repeat) with backoff"""
+        delay = settings.DB_CONNECT_BACKOFF_SECONDS
+        for attempt in range(settings.DB_READ_RETRIES + 1):
+            try:
+                return self._query(pool, query, params)
+            except DatabaseUnavailable:
+                raise
+            except Exception as e:
+                if not is_retryable_read_error(e):
+                    raise e
+                if attempt == settings.DB_READ_RETRIES:
+                    if is_connection_error(e):
+                        raise DatabaseUnavailable(f"Lost connection to database {pool.host}:{pool.port}") from e
+                    raise e
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            delay *= 2
     
+    def execute_query(self, query: str, params: tuple = None, primary: bool = False) -> List[Dict[str, Any]]:
+        """Execute SELECT query and return results (on a replica unless primary=True)"""
+        if self.replicas and not primary and not self._wrote_recently():
+            replica = self._pick_replica()
+            if replica:
+                try:
+                    return self._query(replica, query, params)
+                except Exception as e:
+                    if not isinstance(e, DatabaseUnavailable) and not is_connection_error(e):
+                        raise e
+                    # Stop using this replica until the next check
+                    logger.warning("Replica %s:%s failed, reading from primary", replica.host, replica.port)
+                    replica.healthy = False
+        return self._read(self.primary, query, params)
+    
+    def unit_of_work(self) -> "UnitOfWork":
+        return UnitOfWork(self)
+    
+    # Connections run with autocommit, so each statement below commits on its own
     def execute_update(self, query: str, params: tuple = None) -> int:
         """Execute INSERT/UPDATE/DELETE query and return affected rows"""
-        try:
-            connection = self.get_connection()
-            with connection.cursor() as cursor:
-                cursor.execute(query, params)
-                connection.commit()
-                return cursor.rowcount
-        except Exception as e:
-            print(f"Update execution failed: {e}")
-            connection.rollback()
-            raise e
+        self._mark_write()
+        with self.connection() as connection:
+            try:
+                with connection.cursor() as cursor:
+                    _run(cursor, query, params)
+                    return cursor.rowcount
+            except Exception as e:
+                logger.error("Update execution failed", exc_info=e, extra={"statement": query_shape(query)})
+                connection.rollback()
+                raise e
     
     def execute_insert(self, query: str, params: tuple = None) -> int:
         """Execute INSERT query and return last insert ID"""
+        self._mark_write()
+        with self.connection() as connection:
+            try:
+                with connection.cursor() as cursor:
+                    _run(cursor, query, params)
+                    return cursor.lastrowid
+            except Exception as e:
+                logger.error("Insert execution failed", exc_info=e, extra={"statement": query_shape(query)})
+                connection.rollback()
+                raise e
+
+
+class UnitOfWork:
+    """One primary connection and one transaction for a group of statements.
+
+    Offers the execute_* methods of Database, so the *Operations classes run
+    on it unchanged. defer() queues writes whose result isn't needed; they
+    are sent just before the next statement or commit, and consecutive
+    deferred statements with the same SQL go out as one executemany (a
+    single multi-row INSERT for inserts). Nothing is visible to other
+    connections until commit(); leaving the with block without committing
+    rolls back.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.connection = None
+        self.committed = False
+        self._deferred: List[Tuple[str, tuple]] = []
+    
+    def __enter__(self) -> "UnitOfWork":
+        self.connection = self.db.get_connection()
         try:
-            connection = self.get_connection()
-            with connection.cursor() as cursor:
-                cursor.execute(query, params)
-                connection.commit()
-                return cursor.lastrowid
+            self.connection.begin()
+        except Exception:
+            self.db.release(self.connection)
+            raise
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if not self.committed:
+                self.connection.rollback()
+        except Exception as e:
+            logger.error("Rollback failed", exc_info=e)
+        finally:
+            self.db.release(self.connection)
+            self.connection = None
+    
+    def _execute(self, query: str, params: tuple = None):
+        self.flush()
+        cursor = self.connection.cursor()
+        try:
+            _run(cursor, query, params)
         except Exception as e:
-            print(f"Insert execution failed: {e}")
-            connection.rollback()
+            logger.error("Query execution failed", exc_info=e, extra={"statement": query_shape(query)})
+            cursor.close()
             raise e
+        return cursor
     
-    def close(self):
-        """Close database connection"""
-        if self.connection and self.connection.open:
-            self.connection.close()
+    def execute_query(self, query: str, params: tuple = None, primary: bool = True) -> List[Dict[str, Any]]:
+        """Execute SELECT query and return results (always on the transaction's connection)"""
+        with self._execute(query, params) as cursor:
+            return cursor.fetchall()
+    
+    def execute_update(self, query: str, params: tuple = None) -> int:
+        self.db._mark_write()
+        with self._execute(query, params) as cursor:
+            return cursor.rowcount
+    
+    def execute_insert(self, query: str, params: tuple = None) -> int:
+        self.db._mark_write()
+        with self._execute(query, params) as cursor:
+            return cursor.lastrowid
+    
+    def defer(self, query: str, params: tuple = None):
+        """Queue a write to send with the next statement or commit"""
+        self.db._mark_write()
+        self._deferred.append((query, params))
+    
+    def flush(self):
+        """Send deferred writes, batching runs of the same statement"""
+        deferred, self._deferred = self._deferred, []
+        for query, group in itertools.groupby(deferred, key=lambda statement: statement[0]):
+            params = [statement[1] for statement in group]
+            with self.connection.cursor() as cursor:
+                try:
+                    if len(params) == 1:
+                        _run(cursor, query, params[0])
+                    else:
+                        _run(cursor, query, params, many=True)
+                except Exception as e:
+                    logger.error("Update execution failed", exc_info=e, extra={"statement": query_shape(query)})
+                    raise e
+    
+    def commit(self):
+        self.flush()
+        self.connection.commit()
+        self.committed = True
+
+
+# Users table
+USERS_TABLE = """
+CREATE TABLE IF NOT EXISTS users (
+    id VARCHAR(36) PRIMARY KEY,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    role ENUM('admin', 'donor', 'recv') NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+"""
+
+# Donors table
+DONORS_TABLE = """
+CREATE TABLE IF NOT EXISTS donors (
+    id VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) UNIQUE NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    phone VARCHAR(20) NOT NULL,
+    blood_type ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    age INT NOT NULL,
+    weight INT NOT NULL,
+    address TEXT NOT NULL,
+    medical_history TEXT,
+    donation_units INT DEFAULT 1,
+    last_donation_date TIMESTAMP NULL,
+    is_eligible BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+)
+"""
+
+# Blood receivers table (unified table for receiver profiles and requests)
+BLOOD_RECEIVERS_TABLE = """
+CREATE TABLE IF NOT EXISTS blood_receivers (
+    id VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) UNIQUE NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    phone VARCHAR(20) NOT NULL,
+    blood_type ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    address TEXT NOT NULL,
+    emergency_contact VARCHAR(255),
+    medical_conditions TEXT,
+    urgency_level ENUM('low', 'medium', 'high', 'critical') DEFAULT 'medium',
+    units_needed INT DEFAULT 1,
+    hospital_name VARCHAR(255),
+    doctor_name VARCHAR(255),
+    medical_condition TEXT,
+    request_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    status ENUM('pending', 'fulfilled', 'cancelled') DEFAULT 'pending',
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+)
+"""
+
+# Donation events table
+DONATION_EVENTS_TABLE = """
+CREATE TABLE IF NOT EXISTS donation_events (
+    id VARCHAR(36) PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    description TEXT NOT NULL,
+    date TIMESTAMP NOT NULL,
+    time VARCHAR(10) NOT NULL,
+    location VARCHAR(255) NOT NULL,
+    address TEXT NOT NULL,
+    capacity INT NOT NULL,
+    registered_donors JSON,
+    organizer VARCHAR(255) NOT NULL,
+    status ENUM('upcoming', 'ongoing', 'completed', 'cancelled') DEFAULT 'upcoming',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+"""
+
+# Donation records table
+DONATION_RECORDS_TABLE = """
+CREATE TABLE IF NOT EXISTS donation_records (
+    id VARCHAR(36) PRIMARY KEY,
+    donor_id VARCHAR(36) NOT NULL,
+    event_id VARCHAR(36) NULL,
+    donation_date TIMESTAMP NOT NULL,
+    blood_type ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    units_collected INT NOT NULL,
+    hiv_test BOOLEAN DEFAULT FALSE,
+    hepatitis_b_test BOOLEAN DEFAULT FALSE,
+    hepatitis_c_test BOOLEAN DEFAULT FALSE,
+    syphilis_test BOOLEAN DEFAULT FALSE,
+    status ENUM('collected', 'tested', 'approved', 'rejected') DEFAULT 'collected',
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (donor_id) REFERENCES donors(id) ON DELETE CASCADE,
+    FOREIGN KEY (event_id) REFERENCES donation_events(id) ON DELETE SET NULL
+)
+"""
+
+# Blood inventory table
+BLOOD_INVENTORY_TABLE = """
+CREATE TABLE IF NOT EXISTS blood_inventory (
+    id VARCHAR(36) PRIMARY KEY,
+    blood_type ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') UNIQUE NOT NULL,
+    units_available INT NOT NULL DEFAULT 0,
+    expiry_date TIMESTAMP NOT NULL,
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+"""
+
+# Sessions table (one row per logged-in device, holds the hashed refresh token)
+SESSIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) NOT NULL,
+    token_hash VARCHAR(64) UNIQUE NOT NULL,
+    previous_token_hash VARCHAR(64) NULL,
+    user_agent VARCHAR(255) NULL,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP NULL,
+    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+)
+"""
+
+# Idempotency keys table (stored responses for retried create requests)
+IDEMPOTENCY_KEYS_TABLE = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    id VARCHAR(64) PRIMARY KEY,
+    fingerprint VARCHAR(64) NOT NULL,
+    status ENUM('in_progress', 'completed') NOT NULL DEFAULT 'in_progress',
+    status_code INT NULL,
+    content_type VARCHAR(255) NULL,
+    response_body MEDIUMBLOB NULL,
+    locked_until TIMESTAMP(6) NULL,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Jobs table (durable background job queue, see app/core/jobs.py)
+JOBS_TABLE = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    payload JSON NOT NULL,
+    status ENUM('pending', 'running', 'dead') NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL,
+    run_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    locked_by VARCHAR(255) NULL,
+    locked_at TIMESTAMP(6) NULL,
+    last_error TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Table name -> CREATE TABLE statement, in creation order (foreign keys first)
+TABLE_SCHEMAS = {
+    "users": USERS_TABLE,
+    "donors": DONORS_TABLE,
+    "blood_receivers": BLOOD_RECEIVERS_TABLE,
+    "donation_events": DONATION_EVENTS_TABLE,
+    "donation_records": DONATION_RECORDS_TABLE,
+    "blood_inventory": BLOOD_INVENTORY_TABLE,
+    "idempotency_keys": IDEMPOTENCY_KEYS_TABLE,
+    "sessions": SESSIONS_TABLE,
+    "jobs": JOBS_TABLE,
+}
+
+
+def _parse_columns(schema: str) -> List[str]:
+    """Extract column names from a CREATE TABLE statement"""
+    columns = []
+    for line in schema.splitlines():
+        # Column definitions are the lowercase identifiers followed by an uppercase type
+        match = re.match(r"\s*([a-z_][a-z0-9_]*)\s+[A-Z]", line)
+        if match:
+            columns.append(match.group(1))
+    return columns
+
+
+# Table name -> column whitelist, used to validate dynamic SQL identifiers
+TABLE_COLUMNS = {table: _parse_columns(schema) for table, schema in TABLE_SCHEMAS.items()}
+
 
 # Global database instance
 db = Database()
 
+
+def _pool_stats():
+    for pool in [db.primary, *db.replicas]:
+        idle = pool._pool.qsize()
+        yield (pool.name, "open"), pool._opened
+        yield (pool.name, "idle"), idle
+        yield (pool.name, "in_use"), max(pool._opened - idle, 0)
+
+
+metrics.gauge("db_pool_connections", "Pooled connections by state", ("pool", "state"), _pool_stats)
+metrics.gauge(
+    "db_pool_size", "Maximum connections per pool", ("pool",),
+    lambda: [((pool.name,), pool.pool_size) for pool in [db.primary, *db.replicas]]
+)
+
 def get_db():
     """Dependency to get database instance"""
     return db
 
+def get_uow():
+    """Dependency for a request-scoped unit of work; the endpoint calls uow.commit()
+
+    Declare it after the auth dependencies: they look the user up through
+    get_db(), and doing that while the unit of work holds a connection needs
+    two connections per request, which can exhaust the pool.
+    """
+    with db.unit_of_work() as uow:
+        yield uow
+
 def init_db():
     """Initialize database tables"""
     try:
         # Test database connection
-        connection = db.get_connection()
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-            print("Database connection successful!")
+        with db.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                print("Database connection successful!")
         
         # Create all tables
         create_tables()
@@ -100,133 +726,52 @@ def init_db():
 
 def create_tables():
     """Create all database tables"""
-    connection = db.get_connection()
-    
-    # Users table
-    users_table = """
-    CREATE TABLE IF NOT EXISTS users (
-        id VARCHAR(36) PRIMARY KEY,
-        email VARCHAR(255) UNIQUE NOT NULL,
-        password VARCHAR(255) NOT NULL,
-        role ENUM('admin', 'donor', 'recv') NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-    )
-    """
-    
-    # Donors table
-    donors_table = """
-    CREATE TABLE IF NOT EXISTS donors (
-        id VARCHAR(36) PRIMARY KEY,
-        user_id VARCHAR(36) UNIQUE NOT NULL,
-        name VARCHAR(255) NOT NULL,
-        email VARCHAR(255) NOT NULL,
-        phone VARCHAR(20) NOT NULL,
-        blood_type ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
-        age INT NOT NULL,
-        weight INT NOT NULL,
-        address TEXT NOT NULL,
-        medical_history TEXT,
-        donation_units INT DEFAULT 1,
-        last_donation_date TIMESTAMP NULL,
-        is_eligible BOOLEAN DEFAULT TRUE,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-    )
-    """
-    
-    # Blood receivers table (unified table for receiver profiles and requests)
-    blood_receivers_table = """
-    CREATE TABLE IF NOT EXISTS blood_receivers (
-        id VARCHAR(36) PRIMARY KEY,
-        user_id VARCHAR(36) UNIQUE NOT NULL,
-        name VARCHAR(255) NOT NULL,
-        email VARCHAR(255) NOT NULL,
-        phone VARCHAR(20) NOT NULL,
-        blood_type ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
-        address TEXT NOT NULL,
-        emergency_contact VARCHAR(255),
-        medical_conditions TEXT,
-        urgency_level ENUM('low', 'medium', 'high', 'critical') DEFAULT 'medium',
-        units_needed INT DEFAULT 1,
-        hospital_name VARCHAR(255),
-        doctor_name VARCHAR(255),
-        medical_condition TEXT,
-        request_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        status ENUM('pending', 'fulfilled', 'cancelled') DEFAULT 'pending',
-        notes TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-    )
-    """
-    
-    # Donation events table
-    donation_events_table = """
-    CREATE TABLE IF NOT EXISTS donation_events (
-        id VARCHAR(36) PRIMARY KEY,
-        title VARCHAR(255) NOT NULL,
-        description TEXT NOT NULL,
-        date TIMESTAMP NOT NULL,
-        time VARCHAR(10) NOT NULL,
-        location VARCHAR(255) NOT NULL,
-        address TEXT NOT NULL,
-        capacity INT NOT NULL,
-        registered_donors JSON,
-        organizer VARCHAR(255) NOT NULL,
-        status ENUM('upcoming', 'ongoing', 'completed', 'cancelled') DEFAULT 'upcoming',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-    )
-    """
-    
-    # Donation records table
-    donation_records_table = """
-    CREATE TABLE IF NOT EXISTS donation_records (
-        id VARCHAR(36) PRIMARY KEY,
-        donor_id VARCHAR(36) NOT NULL,
-        event_id VARCHAR(36) NULL,
-        donation_date TIMESTAMP NOT NULL,
-        blood_type ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
-        units_collected INT NOT NULL,
-        hiv_test BOOLEAN DEFAULT FALSE,
-        hepatitis_b_test BOOLEAN DEFAULT FALSE,
-        hepatitis_c_test BOOLEAN DEFAULT FALSE,
-        syphilis_test BOOLEAN DEFAULT FALSE,
-        status ENUM('collected', 'tested', 'approved', 'rejected') DEFAULT 'collected',
-        notes TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-        FOREIGN KEY (donor_id) REFERENCES donors(id) ON DELETE CASCADE,
-        FOREIGN KEY (event_id) REFERENCES donation_events(id) ON DELETE SET NULL
-    )
-    """
-    
-    # Blood inventory table
-    blood_inventory_table = """
-    CREATE TABLE IF NOT EXISTS blood_inventory (
-        id VARCHAR(36) PRIMARY KEY,
-        blood_type ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') UNIQUE NOT NULL,
-        units_available INT NOT NULL DEFAULT 0,
-        expiry_date TIMESTAMP NOT NULL,
-        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-    )
-    """
+    with db.connection() as connection:
+        with connection.cursor() as cursor:
+            for table in TABLE_SCHEMAS.values():
+                cursor.execute(table)
+        
+        connection.commit()
     
-    tables = [
-        users_table,
-        donors_table,
-        blood_receivers_table,
-        donation_events_table,
-        donation_records_table,
-        blood_inventory_table
+    create_indexes()
+
+
+def create_indexes():
+    """Create secondary indexes used by the list endpoints"""
+    indexes = [
+        # Blood request listing: filter by status/urgency, sort by urgency then request_date
+        "CREATE INDEX idx_receivers_status_urgency ON blood_receivers (status, urgency_level, request_date)",
+        "CREATE INDEX idx_receivers_urgency_date ON blood_receivers (urgency_level, request_date)",
+        "CREATE INDEX idx_receivers_blood_type ON blood_receivers (blood_type)",
+        "CREATE INDEX idx_receivers_hospital ON blood_receivers (hospital_name)",
+        # Covering indexes for common fields= projections on list endpoints
+        # (InnoDB secondary indexes carry the primary key, so id is covered too)
+        "CREATE INDEX idx_donors_list ON donors (created_at, name, blood_type)",
+        "CREATE INDEX idx_receivers_list ON blood_receivers (created_at, name, blood_type, urgency_level, status)",
+        "CREATE INDEX idx_events_list ON donation_events (date, status, title, location)",
+        "CREATE INDEX idx_records_list ON donation_records (donation_date, donor_id, blood_type, status)",
+        # Search: FULLTEXT for ranked word matches, B-tree for email/phone prefix lookups
+        "CREATE FULLTEXT INDEX ft_donors_search ON donors (name, email, phone, address)",
+        "CREATE FULLTEXT INDEX ft_receivers_search ON blood_receivers (name, hospital_name, doctor_name)",
+        "CREATE FULLTEXT INDEX ft_events_search ON donation_events (title, location)",
+        "CREATE INDEX idx_donors_email ON donors (email)",
+        "CREATE INDEX idx_donors_phone ON donors (phone)",
+        "CREATE INDEX idx_idempotency_expires ON idempotency_keys (expires_at)",
+        "CREATE INDEX idx_sessions_previous_token ON sessions (previous_token_hash)",
+        "CREATE INDEX idx_sessions_revoked ON sessions (revoked_at)",
+        # Job claiming scans due pending jobs; stale-lock recovery scans running ones
+        "CREATE INDEX idx_jobs_claim ON jobs (status, run_at)",
+        "CREATE INDEX idx_jobs_locked ON jobs (status, locked_at)",
     ]
     
-    with connection.cursor() as cursor:
-        for table in tables:
-            cursor.execute(table)
-    
-    connection.commit()
+    with db.connection() as connection:
+        with connection.cursor() as cursor:
+            for index in indexes:
+                try:
+                    cursor.execute(index)
+                except pymysql.err.OperationalError as e:
+                    # 1061: duplicate key name, the index already exists
+                    if e.args[0] != 1061:
+                        raise e
+        
+        connection.commit()
@@ -1,9 +1,148 @@
 from typing import Dict, List, Any, Optional, Union
-from app.core.database import get_db
+from app.core.database import get_db, TABLE_COLUMNS
+from app.core.config import settings
+from app.core.security import create_refresh_token, hash_refresh_token
+from app.core.metrics import metrics
+from app.core.tracing import span
+from functools import lru_cache
 import uuid
+import time
+import re
 from datetime import datetime
 
 
+# Cached COUNT(*) results: (query, params) -> (expires_at, count)
+_count_cache: Dict[tuple, tuple] = {}
+_COUNT_CACHE_MAX_ENTRIES = 1024
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input only matches literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Filter operators that compare a column against a single value
+_COMPARISON_OPERATORS = {
+    "eq": "{column} = %s",
+    "gt": "{column} > %s",
+    "gte": "{column} >= %s",
+    "lt": "{column} < %s",
+    "lte": "{column} <= %s",
+    "prefix": "{column} LIKE %s",
+}
+
+
+def check_columns(table: str, columns) -> None:
+    """Raise ValueError unless the table and all columns are in the schema whitelist"""
+    allowed = TABLE_COLUMNS.get(table)
+    if allowed is None:
+        raise ValueError(f"Unknown table: {table}")
+    for column in columns:
+        if column not in allowed:
+            raise ValueError(f"Unknown column for {table}: {column}")
+
+
+def _filter_shape(table: str, filters: Dict[str, Any], params: list) -> tuple:
+    """Reduce a filter dict to a hashable shape, appending its params in order.
+
+    Filters map a column to a value (equality) or to a dict of operators:
+    eq, gt, gte, lt, lte, prefix, in, is_null. The "$or" key takes a list of
+    filter dicts, any of which may match. None values are ignored.
+    """
+    shape = []
+    for column, value in filters.items():
+        if column == "$or":
+            groups = []
+            group_params = []
+            for group in value:
+                group_shape = _filter_shape(table, group, group_params)
+                if not group_shape:
+                    # An empty group matches everything, so the OR is a no-op
+                    break
+                groups.append(group_shape)
+            else:
+                if groups:
+                    shape.append(("$or", tuple(groups)))
+                    params.extend(group_params)
+            continue
+        
+        check_columns(table, (column,))
+        if not isinstance(value, dict):
+            value = {"eq": value}
+        
+        for op, operand in value.items():
+            if operand is None:
+                continue
+            if op == "in":
+                operand = list(operand)
+                shape.append((column, "in", len(operand)))
+                params.extend(operand)
+            elif op == "is_null":
+                shape.append((column, "is_null", bool(operand)))
+            elif op == "prefix":
+                shape.append((column, "prefix"))
+                params.append(escape_like(operand) + "%")
+            elif op in _COMPARISON_OPERATORS:
+                shape.append((column, op))
+                params.append(operand)
+            else:
+                raise ValueError(f"Unknown filter operator: {op}")
+    return tuple(shape)
+
+
+@lru_cache(maxsize=512)
+def _compile_where(shape: tuple) -> str:
+    """Compile a filter shape into a parameterized WHERE expression"""
+    clauses = []
+    for term in shape:
+        if term[0] == "$or":
+            clauses.append("(" + " OR ".join(f"({_compile_where(group)})" for group in term[1]) + ")")
+            continue
+        
+        column, op = term[0], term[1]
+        if op == "in":
+            clauses.append(f"{column} IN ({', '.join(['%s'] * term[2])})" if term[2] else "1 = 0")
+        elif op == "is_null":
+            clauses.append(f"{column} IS NULL" if term[2] else f"{column} IS NOT NULL")
+        else:
+            clauses.append(_COMPARISON_OPERATORS[op].format(column=column))
+    return " AND ".join(clauses)
+
+
+def _order_terms(table: str, order_by: Union[str, List[tuple]], order_dir: str) -> tuple:
+    """Validate ORDER BY columns and directions"""
+    if isinstance(order_by, str):
+        order_by = [(order_by, order_dir)]
+    
+    terms = []
+    for column, direction in order_by:
+        check_columns(table, (column,))
+        direction = direction.upper()
+        if direction not in ("ASC", "DESC"):
+            raise ValueError(f"Invalid order direction: {direction}")
+        terms.append((column, direction))
+    return tuple(terms)
+
+
+@lru_cache(maxsize=512)
+def _compile_select(table: str, shape: tuple, order: tuple, columns: tuple = ()) -> str:
+    """Compile the SELECT template for a table, filter shape, ordering and projection"""
+    query = f"SELECT {', '.join(columns) if columns else '*'} FROM {table}"
+    if shape:
+        query += " WHERE " + _compile_where(shape)
+    query += " ORDER BY " + ", ".join(f"{column} {direction}" for column, direction in order)
+    return query + " LIMIT %s OFFSET %s"
+
+
+@lru_cache(maxsize=512)
+def _compile_count(table: str, shape: tuple) -> str:
+    """Compile the COUNT(*) template for a table and filter shape"""
+    query = f"SELECT COUNT(*) as count FROM {table}"
+    if shape:
+        query += " WHERE " + _compile_where(shape)
+    return query
+
+
 class DynamicDBOperations:
     """Dynamic database operations for all tables"""
     
@@ -18,6 +157,7 @@ class DynamicDBOperations:
             
         # Prepare columns and values
         columns = list(data.keys())
+        check_columns(table, columns)
         placeholders = ', '.join(['%s'] * len(columns))
         column_names = ', '.join(columns)
         values = tuple(data.values())
@@ -28,30 +168,44 @@ class DynamicDBOperations:
         # Return the created record
         return self.get_record_by_id(table, data['id'])
     
+    def insert_record(self, table: str, data: Dict[str, Any]) -> str:
+        """Insert a record without reading it back; deferred inside a unit of work.
+
+        Returns the record id.
+        """
+        if 'id' not in data:
+            data['id'] = str(uuid.uuid4())
+        
+        columns = list(data.keys())
+        check_columns(table, columns)
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        execute = getattr(self.db, "defer", self.db.execute_update)
+        execute(query, tuple(data.values()))
+        return data['id']
+    
     def get_record_by_id(self, table: str, record_id: str) -> Optional[Dict[str, Any]]:
         """Get a single record by ID"""
+        check_columns(table, ())
         query = f"SELECT * FROM {table} WHERE id = %s"
         results = self.db.execute_query(query, (record_id,))
         return results[0] if results else None
     
     def get_records(self, table: str, filters: Dict[str, Any] = None, 
                    limit: int = 100, offset: int = 0, 
-                   order_by: str = "created_at", order_dir: str = "DESC") -> List[Dict[str, Any]]:
-        """Get multiple records with optional filtering"""
-        query = f"SELECT * FROM {table}"
+                   order_by: Union[str, List[tuple]] = "created_at",
+                   order_dir: str = "DESC",
+                   fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get multiple records with optional filtering.
+
+        order_by is a column name, or a list of (column, direction) pairs.
+        fields limits the selected columns (all columns when omitted).
+        See _filter_shape for the filter format.
+        """
         params = []
-        
-        if filters:
-            where_clauses = []
-            for key, value in filters.items():
-                if value is not None:
-                    where_clauses.append(f"{key} = %s")
-                    params.append(value)
-            
-            if where_clauses:
-                query += " WHERE " + " AND ".join(where_clauses)
-        
-        query += f" ORDER BY {order_by} {order_dir} LIMIT %s OFFSET %s"
+        shape = _filter_shape(table, filters or {}, params)
+        columns = tuple(fields or ())
+        check_columns(table, columns)
+        query = _compile_select(table, shape, _order_terms(table, order_by, order_dir), columns)
         params.extend([limit, offset])
         
         return self.db.execute_query(query, tuple(params))
@@ -68,6 +222,7 @@ class DynamicDBOperations:
             raise ValueError("No valid fields to update")
         
         # Build update query
+        check_columns(table, update_data)
         set_clauses = []
         values = []
         
@@ -85,34 +240,51 @@ class DynamicDBOperations:
     
     def delete_record(self, table: str, record_id: str) -> bool:
         """Delete a record by ID"""
+        check_columns(table, ())
         query = f"DELETE FROM {table} WHERE id = %s"
         affected_rows = self.db.execute_update(query, (record_id,))
         return affected_rows > 0
     
-    def count_records(self, table: str, filters: Dict[str, Any] = None) -> int:
+    def count_records(self, table: str, filters: Dict[str, Any] = None, cached: bool = False) -> int:
         """Count records in a table with optional filtering"""
-        query = f"SELECT COUNT(*) as count FROM {table}"
         params = []
+        shape = _filter_shape(table, filters or {}, params)
+        query = _compile_count(table, shape)
         
-        if filters:
-            where_clauses = []
-            for key, value in filters.items():
-                if value is not None:
-                    where_clauses.append(f"{key} = %s")
-                    params.append(value)
-            
-            if where_clauses:
-                query += " WHERE " + " AND ".join(where_clauses)
+        if cached:
+            return self.cached_count(query, tuple(params))
         
         result = self.db.execute_query(query, tuple(params))
         return result[0]['count'] if result else 0
     
+    def cached_count(self, query: str, params: tuple = ()) -> int:
+        """Run a COUNT(*) query, reusing the result for COUNT_CACHE_TTL_SECONDS"""
+        key = (query, params)
+        now = time.monotonic()
+        with span("cache.get", cache="count") as lookup:
+            cached = _count_cache.get(key)
+            fresh = bool(cached) and cached[0] > now
+            lookup.set("cache.hit", fresh)
+        if fresh:
+            metrics.inc("cache_requests_total", "count", "hit")
+            return cached[1]
+        
+        metrics.inc("cache_requests_total", "count", "miss")
+        result = self.db.execute_query(query, params)
+        count = result[0]['count'] if result else 0
+        
+        if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.clear()
+        _count_cache[key] = (now + settings.COUNT_CACHE_TTL_SECONDS, count)
+        return count
+    
     def record_exists(self, table: str, filters: Dict[str, Any]) -> bool:
         """Check if a record exists with given filters"""
         return self.count_records(table, filters) > 0
     
     def get_records_by_field(self, table: str, field: str, value: Any) -> List[Dict[str, Any]]:
         """Get records by a specific field value"""
+        check_columns(table, (field,))
         query = f"SELECT * FROM {table} WHERE {field} = %s"
         return self.db.execute_query(query, (value,))
     
@@ -129,6 +301,7 @@ class DynamicDBOperations:
             raise ValueError("No valid fields to update")
         
         # Build update query
+        check_columns(table, [field, *update_data])
         set_clauses = []
         values = []
         
@@ -144,9 +317,9 @@ class DynamicDBOperations:
         # Return updated records
         return self.get_records_by_field(table, field, field_value)
     
-    def execute_custom_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
-        """Execute a custom SELECT query"""
-        return self.db.execute_query(query, params)
+    def execute_custom_query(self, query: str, params: tuple = None, primary: bool = False) -> List[Dict[str, Any]]:
+        """Execute a custom SELECT query (primary=True skips read replicas)"""
+        return self.db.execute_query(query, params, primary=primary)
     
     def execute_custom_update(self, query: str, params: tuple = None) -> int:
         """Execute a custom UPDATE/DELETE query"""
@@ -181,6 +354,81 @@ class UserOperations:
         return self.db_ops.get_record_by_id(self.table, user_id)
 
 
+class SessionOperations:
+    """Device sessions holding hashed, rotating refresh tokens"""
+    
+    def __init__(self, db_ops: DynamicDBOperations):
+        self.db_ops = db_ops
+        self.table = "sessions"
+    
+    def create_session(self, user_id: str, user_agent: Optional[str] = None) -> tuple:
+        """Create a session; returns (session_id, refresh_token)"""
+        session_id = str(uuid.uuid4())
+        refresh_token = create_refresh_token()
+        self.db_ops.execute_custom_update(
+            """INSERT INTO sessions (id, user_id, token_hash, user_agent, expires_at)
+               VALUES (%s, %s, %s, %s, DATE_ADD(CURRENT_TIMESTAMP, INTERVAL %s DAY))""",
+            (session_id, user_id, hash_refresh_token(refresh_token),
+             (user_agent or "")[:255] or None, settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+        return session_id, refresh_token
+    
+    def rotate_session(self, refresh_token: str) -> Optional[tuple]:
+        """Exchange a refresh token for a new one.
+
+        Returns (session, new_refresh_token), or None if the token is unknown,
+        expired or revoked. Presenting an already-rotated token revokes the
+        session, since it means the token was copied.
+        """
+        token_hash = hash_refresh_token(refresh_token)
+        results = self.db_ops.execute_custom_query(
+            """SELECT *, expires_at < CURRENT_TIMESTAMP AS expired FROM sessions
+               WHERE token_hash = %s OR previous_token_hash = %s""",
+            (token_hash, token_hash),
+            primary=True
+        )
+        if not results:
+            return None
+        
+        session = results[0]
+        if session['revoked_at'] or session['expired']:
+            return None
+        if session['token_hash'] != token_hash:
+            self.revoke_session(session['id'])
+            return None
+        
+        new_token = create_refresh_token()
+        updated = self.db_ops.execute_custom_update(
+            """UPDATE sessions SET token_hash = %s, previous_token_hash = %s,
+               last_used_at = CURRENT_TIMESTAMP
+               WHERE id = %s AND token_hash = %s AND revoked_at IS NULL""",
+            (hash_refresh_token(new_token), token_hash, session['id'], token_hash)
+        )
+        # Lost a race with a concurrent refresh of the same token
+        if not updated:
+            return None
+        return session, new_token
+    
+    def revoke_session(self, session_id: str) -> bool:
+        return self.db_ops.execute_custom_update(
+            "UPDATE sessions SET revoked_at = CURRENT_TIMESTAMP WHERE id = %s AND revoked_at IS NULL",
+            (session_id,)
+        ) > 0
+    
+    def get_session_by_token(self, refresh_token: str) -> Optional[Dict[str, Any]]:
+        results = self.db_ops.get_records_by_field(self.table, "token_hash", hash_refresh_token(refresh_token))
+        return results[0] if results else None
+    
+    def get_recently_revoked_ids(self, minutes: int) -> List[str]:
+        """Sessions revoked within the access token lifetime"""
+        results = self.db_ops.execute_custom_query(
+            "SELECT id FROM sessions WHERE revoked_at >= DATE_SUB(CURRENT_TIMESTAMP, INTERVAL %s MINUTE)",
+            (minutes,),
+            primary=True
+        )
+        return [row['id'] for row in results]
+
+
 class DonorOperations:
     def __init__(self, db_ops: DynamicDBOperations):
         self.db_ops = db_ops
@@ -194,8 +442,9 @@ class DonorOperations:
         results = self.db_ops.get_records_by_field(self.table, "user_id", user_id)
         return results[0] if results else None
     
-    def get_all_donors(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
-        return self.db_ops.get_records(self.table, limit=limit, offset=offset)
+    def get_all_donors(self, limit: int = 100, offset: int = 0,
+                       fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self.db_ops.get_records(self.table, limit=limit, offset=offset, fields=fields)
     
     def update_donor_eligibility(self, donor_id: str, is_eligible: bool) -> Dict[str, Any]:
         return self.db_ops.update_record(self.table, donor_id, {"is_eligible": is_eligible})
@@ -220,8 +469,35 @@ class ReceiverOperations:
         results = self.db_ops.get_records_by_field(self.table, "user_id", user_id)
         return results[0] if results else None
     
-    def get_all_receivers(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
-        return self.db_ops.get_records(self.table, limit=limit, offset=offset)
+    def get_all_receivers(self, limit: int = 100, offset: int = 0,
+                          fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self.db_ops.get_records(self.table, limit=limit, offset=offset, fields=fields)
+    
+    def _request_filters(self, status: Optional[str] = None, urgency_level: Optional[str] = None,
+                         blood_type: Optional[str] = None, hospital_name: Optional[str] = None,
+                         date_from: Optional[datetime] = None,
+                         date_to: Optional[datetime] = None) -> Dict[str, Any]:
+        """Build the filter dict for blood request listings"""
+        return {
+            "status": status,
+            "urgency_level": urgency_level,
+            "blood_type": blood_type,
+            # Prefix match so the hospital_name index can be used
+            "hospital_name": {"prefix": hospital_name},
+            "request_date": {"gte": date_from, "lte": date_to},
+        }
+    
+    def search_requests(self, limit: int = 100, offset: int = 0, **filters) -> List[Dict[str, Any]]:
+        """Get blood requests matching filters, most urgent and oldest first"""
+        # urgency_level is ENUM('low', 'medium', 'high', 'critical'), so DESC sorts by urgency rank
+        return self.db_ops.get_records(
+            self.table, filters=self._request_filters(**filters), limit=limit, offset=offset,
+            order_by=[("urgency_level", "DESC"), ("request_date", "ASC")]
+        )
+    
+    def count_requests(self, **filters) -> int:
+        """Count blood requests matching filters (cached briefly)"""
+        return self.db_ops.count_records(self.table, self._request_filters(**filters), cached=True)
 
 
 class BloodRequestOperations:
@@ -299,3 +575,63 @@ class BloodInventoryOperations:
                 "units_available": units_available,
                 "expiry_date": expiry_date
             })
+
+
+class SearchOperations:
+    """Ranked search over donors, receivers and events using FULLTEXT indexes"""
+    
+    # Score given to email/phone prefix hits so they rank above word matches
+    PREFIX_MATCH_SCORE = 1000.0
+    
+    def __init__(self, db_ops: DynamicDBOperations):
+        self.db_ops = db_ops
+    
+    @staticmethod
+    def _boolean_query(q: str) -> str:
+        """Turn free text into a BOOLEAN MODE query requiring every word as a prefix"""
+        return " ".join(f"+{word}*" for word in re.findall(r"\w+", q))
+    
+    def _fulltext(self, table: str, columns: str, match: str, q: str, limit: int) -> List[Dict[str, Any]]:
+        boolean_query = self._boolean_query(q)
+        if not boolean_query:
+            return []
+        query = (f"SELECT {columns}, MATCH({match}) AGAINST (%s IN BOOLEAN MODE) AS score "
+                 f"FROM {table} WHERE MATCH({match}) AGAINST (%s IN BOOLEAN MODE) "
+                 f"ORDER BY score DESC LIMIT %s")
+        return self.db_ops.execute_custom_query(query, (boolean_query, boolean_query, limit))
+    
+    def _prefix(self, table: str, columns: str, field: str, q: str, limit: int) -> List[Dict[str, Any]]:
+        query = (f"SELECT {columns}, {self.PREFIX_MATCH_SCORE} AS score FROM {table} "
+                 f"WHERE {field} LIKE %s LIMIT %s")
+        return self.db_ops.execute_custom_query(query, (escape_like(q) + "%", limit))
+    
+    @staticmethod
+    def _merge(hit_lists: List[List[Dict[str, Any]]], limit: int) -> List[Dict[str, Any]]:
+        """Merge hits by id keeping the best score, highest score first"""
+        best = {}
+        for hits in hit_lists:
+            for hit in hits:
+                hit['score'] = float(hit['score'])
+                if hit['id'] not in best or hit['score'] > best[hit['id']]['score']:
+                    best[hit['id']] = hit
+        return sorted(best.values(), key=lambda hit: hit['score'], reverse=True)[:limit]
+    
+    def search_donors(self, q: str, limit: int = 20) -> List[Dict[str, Any]]:
+        columns = "id, name, email, phone, blood_type, is_eligible"
+        hit_lists = [self._fulltext("donors", columns, "name, email, phone, address", q, limit)]
+        
+        term = q.strip()
+        if term and " " not in term:
+            hit_lists.append(self._prefix("donors", columns, "email", term, limit))
+            if re.fullmatch(r"[\d+\-() ]+", term):
+                hit_lists.append(self._prefix("donors", columns, "phone", term, limit))
+        
+        return self._merge(hit_lists, limit)
+    
+    def search_receivers(self, q: str, limit: int = 20) -> List[Dict[str, Any]]:
+        columns = "id, name, hospital_name, doctor_name, blood_type, urgency_level, status"
+        return self._fulltext("blood_receivers", columns, "name, hospital_name, doctor_name", q, limit)
+    
+    def search_events(self, q: str, limit: int = 20) -> List[Dict[str, Any]]:
+        columns = "id, title, location, date, status"
+        return self._fulltext("donation_events", columns, "title, location", q, limit)
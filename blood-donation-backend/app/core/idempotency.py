@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import logging
+import re
+from typing import Any, Dict, Optional
+import pymysql
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.rate_limit import client_key
+
+logger = logging.getLogger(__name__)
+
+# Create endpoints that honour the Idempotency-Key header
+IDEMPOTENT_ROUTES = [
+    re.compile(rf"^{settings.API_V1_STR}/donors/?$"),
+    re.compile(rf"^{settings.API_V1_STR}/donation-records/?$"),
+    re.compile(rf"^{settings.API_V1_STR}/events/[^/]+/register/?$"),
+]
+
+# Delete expired keys once every this many claims
+PURGE_EVERY_CLAIMS = 100
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class IdempotencyStore:
+    """Stored responses keyed by idempotency key, in the idempotency_keys table"""
+
+    _claims = 0
+
+    def __init__(self, db):
+        self.db = db
+
+    def claim(self, key_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Claim a key for a new request.
+
+        Returns None when the caller now owns the key, otherwise the existing row.
+        A claim is a lease of IDEMPOTENCY_LEASE_SECONDS: an in-progress key
+        whose lease has passed (its request died without releasing it) is
+        taken over by the next request with the same body.
+        """
+        IdempotencyStore._claims += 1
+        if IdempotencyStore._claims % PURGE_EVERY_CLAIMS == 0:
+            self.purge_expired()
+
+        for _ in range(2):
+            try:
+                self.db.execute_insert(
+                    """INSERT INTO idempotency_keys (id, fingerprint, locked_until, expires_at)
+                       VALUES (%s, %s, DATE_ADD(CURRENT_TIMESTAMP(6), INTERVAL %s SECOND),
+                               DATE_ADD(CURRENT_TIMESTAMP, INTERVAL %s HOUR))""",
+                    (key_id, fingerprint, settings.IDEMPOTENCY_LEASE_SECONDS, settings.IDEMPOTENCY_TTL_HOURS)
+                )
+                return None
+            except pymysql.err.IntegrityError:
+                pass
+
+            existing = self.get(key_id)
+            if existing and not existing['expired']:
+                if (existing['status'] == 'in_progress' and existing['lease_expired']
+                        and existing['fingerprint'] == fingerprint and self._take_over(key_id)):
+                    return None
+                return existing
+            # Expired (or just released): drop it and claim again
+            self.release(key_id)
+        return self.get(key_id)
+
+    def _take_over(self, key_id: str) -> bool:
+        """Renew the lease of an abandoned in-progress key; False if another request got there first"""
+        return self.db.execute_update(
+            """UPDATE idempotency_keys SET locked_until = DATE_ADD(CURRENT_TIMESTAMP(6), INTERVAL %s SECOND)
+               WHERE id = %s AND status = 'in_progress' AND locked_until < CURRENT_TIMESTAMP(6)""",
+            (settings.IDEMPOTENCY_LEASE_SECONDS, key_id)
+        ) == 1
+
+    def get(self, key_id: str) -> Optional[Dict[str, Any]]:
+        rows = self.db.execute_query(
+            """SELECT id, fingerprint, status, status_code, content_type, response_body,
+               expires_at < CURRENT_TIMESTAMP AS expired,
+               COALESCE(locked_until < CURRENT_TIMESTAMP(6), TRUE) AS lease_expired
+               FROM idempotency_keys WHERE id = %s""",
+            (key_id,),
+            primary=True
+        )
+        return rows[0] if rows else None
+
+    def complete(self, key_id: str, status_code: int, content_type: Optional[str], body: bytes):
+        self.db.execute_update(
+            """UPDATE idempotency_keys SET status = 'completed', status_code = %s,
+               content_type = %s, response_body = %s WHERE id = %s""",
+            (status_code, content_type, body, key_id)
+        )
+
+    def release(self, key_id: str):
+        self.db.execute_update("DELETE FROM idempotency_keys WHERE id = %s", (key_id,))
+
+    def purge_expired(self):
+        self.db.execute_update(
+            "DELETE FROM idempotency_keys WHERE expires_at < CURRENT_TIMESTAMP LIMIT 1000"
+        )
+
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    """Replay stored responses for retried create requests carrying an Idempotency-Key.
+
+    The first request with a key runs normally and its response is stored.
+    Retries with the same key and body get the stored response without
+    re-running the endpoint; a concurrent duplicate waits for the first to
+    finish. Keys are scoped to the caller (the user of a valid bearer token,
+    so a retry after a token refresh still matches, else the client IP) and
+    the path.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        key = request.headers.get("Idempotency-Key")
+        if (not key or request.method != "POST"
+                or not any(route.match(request.url.path) for route in IDEMPOTENT_ROUTES)):
+            return await call_next(request)
+
+        if len(key) > 255:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"detail": "Idempotency-Key must be at most 255 characters"}
+            )
+
+        body = await request.body()
+        scope = f"{client_key(request.scope)}\n{request.url.path}\n{key}"
+        key_id = _sha256(scope.encode())
+        fingerprint = _sha256(body)
+        store = IdempotencyStore(get_db())
+
+        deadline = asyncio.get_running_loop().time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        existing = await run_in_threadpool(store.claim, key_id, fingerprint)
+        while existing is not None:
+            if existing['fingerprint'] != fingerprint:
+                return JSONResponse(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    content={"detail": "Idempotency-Key was already used with a different request"}
+                )
+            if existing['status'] == 'completed':
+                return Response(
+                    content=existing['response_body'],
+                    status_code=existing['status_code'],
+                    media_type=existing['content_type'],
+                    headers={"Idempotent-Replayed": "true"}
+                )
+            if asyncio.get_running_loop().time() > deadline:
+                return JSONResponse(
+                    status_code=status.HTTP_409_CONFLICT,
+                    content={"detail": "A request with this Idempotency-Key is still in progress"}
+                )
+
+            await asyncio.sleep(0.1)
+            existing = await run_in_threadpool(store.get, key_id)
+            if existing is None or existing['status'] == 'in_progress' and existing['lease_expired']:
+                # The original request failed (released the key) or died (its lease ran out), so run this one
+                existing = await run_in_threadpool(store.claim, key_id, fingerprint)
+
+        try:
+            response = await call_next(request)
+            if response.status_code >= 500:
+                # Let the client retry server errors for real
+                _release_soon(store, key_id)
+                return response
+            content = b"".join([chunk async for chunk in response.body_iterator])
+        except BaseException:
+            # Also on cancellation (CancelledError is a BaseException)
+            _release_soon(store, key_id)
+            raise
+
+        try:
+            await run_in_threadpool(
+                store.complete, key_id, response.status_code, response.headers.get("content-type"), content
+            )
+        except Exception as e:
+            # The endpoint's work is done, so answer; retries wait for the lease to run out
+            logger.warning("Storing idempotent response failed", exc_info=e)
+        return Response(content=content, status_code=response.status_code, headers=dict(response.headers))
+
+
+def _release_soon(store: IdempotencyStore, key_id: str):
+    """Release a key on a worker thread without awaiting it, so it happens even if this task is cancelled"""
+    def release():
+        try:
+            store.release(key_id)
+        except Exception as e:
+            logger.warning("Releasing idempotency key failed", exc_info=e)
+
+    asyncio.get_running_loop().run_in_executor(None, release)
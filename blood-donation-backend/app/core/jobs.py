@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List
+from app.core.config import settings
+from app.core.database import get_db
+
+logger = logging.getLogger(__name__)
+
+# Job name -> handler(payload, cursor), registered with @job_handler. A handler may
+# return a callable, run only once the job's transaction has committed (e.g. to publish events)
+JOB_HANDLERS: Dict[str, Callable] = {}
+
+
+def job_handler(name: str):
+    """Register a function as the handler for jobs with this name"""
+    def register(handler: Callable) -> Callable:
+        JOB_HANDLERS[name] = handler
+        return handler
+    return register
+
+
+class JobQueue:
+    """Durable job queue stored in the jobs table.
+
+    Workers claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any
+    number of threads and processes can poll without blocking each other.
+    A handler runs in the same transaction that deletes its job, so its
+    database writes apply exactly once. Failed jobs are retried with
+    exponential backoff and marked dead after max_attempts.
+    """
+
+    def __init__(self):
+        # Set on enqueue so idle workers in this process pick the job up immediately
+        self.wakeup = threading.Event()
+
+    def enqueue(self, name: str, payload: Dict[str, Any], delay_seconds: float = 0,
+                max_attempts: int = None, db=None) -> int:
+        """Add a job; returns its id.
+
+        Pass a unit of work as db to enqueue atomically with the request's writes.
+        """
+        job_id = (db or get_db()).execute_insert(
+            """INSERT INTO jobs (name, payload, max_attempts, run_at)
+               VALUES (%s, %s, %s, DATE_ADD(CURRENT_TIMESTAMP(6), INTERVAL %s MICROSECOND))""",
+            (name, json.dumps(payload, default=str), max_attempts or settings.JOB_MAX_ATTEMPTS,
+             int(delay_seconds * 1e6))
+        )
+        if not delay_seconds:
+            self.wakeup.set()
+        return job_id
+
+    def enqueue_many(self, name: str, payloads: List[Dict[str, Any]], max_attempts: int = None) -> int:
+        """Add many jobs with one multi-row INSERT; returns the number added"""
+        if not payloads:
+            return 0
+        attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        params = []
+        for payload in payloads:
+            params.extend([name, json.dumps(payload, default=str), attempts])
+        added = get_db().execute_update(
+            "INSERT INTO jobs (name, payload, max_attempts) VALUES "
+            + ", ".join(["(%s, %s, %s)"] * len(payloads)),
+            tuple(params)
+        )
+        self.wakeup.set()
+        return added
+
+    def claim(self, worker_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Lock up to limit due jobs for this worker and mark them running"""
+        with get_db().connection() as connection:
+            try:
+                connection.begin()
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        """SELECT id, name, payload, attempts, max_attempts FROM jobs
+                           WHERE status = 'pending' AND run_at <= CURRENT_TIMESTAMP(6)
+                           ORDER BY run_at LIMIT %s FOR UPDATE SKIP LOCKED""",
+                        (limit,)
+                    )
+                    jobs = cursor.fetchall()
+                    if jobs:
+                        ids = [job['id'] for job in jobs]
+                        cursor.execute(
+                            f"""UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                                locked_by = %s, locked_at = CURRENT_TIMESTAMP(6)
+                                WHERE id IN ({', '.join(['%s'] * len(ids))})""",
+                            (worker_id, *ids)
+                        )
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+
+        for job in jobs:
+            job['attempts'] += 1
+            job['payload'] = json.loads(job['payload'])
+        return jobs
+
+    def run(self, job: Dict[str, Any]) -> bool:
+        """Run a claimed job; returns True if it succeeded"""
+        handler = JOB_HANDLERS.get(job['name'])
+        with get_db().connection() as connection:
+            try:
+                if handler is None:
+                    raise LookupError(f"No handler registered for job {job['name']}")
+                connection.begin()
+                with connection.cursor() as cursor:
+                    after_commit = handler(job['payload'], cursor)
+                    cursor.execute("DELETE FROM jobs WHERE id = %s", (job['id'],))
+                connection.commit()
+            except Exception as e:
+                connection.rollback()
+                error = e
+            else:
+                if after_commit is not None:
+                    try:
+                        after_commit()
+                    except Exception as e:
+                        logger.warning("Job %s (%s) after-commit action failed", job['id'], job['name'], exc_info=e)
+                return True
+
+        self.fail(job, error)
+        return False
+
+    def fail(self, job: Dict[str, Any], error: Exception):
+        """Schedule a retry with backoff, or dead-letter the job once out of attempts"""
+        logger.warning("Job %s (%s) failed on attempt %s", job['id'], job['name'], job['attempts'], exc_info=error)
+        if job['attempts'] >= job['max_attempts']:
+            get_db().execute_update(
+                "UPDATE jobs SET status = 'dead', locked_by = NULL, last_error = %s WHERE id = %s",
+                (repr(error), job['id'])
+            )
+            return
+
+        delay = min(settings.JOB_BACKOFF_MAX_SECONDS,
+                    settings.JOB_BACKOFF_BASE_SECONDS * 2 ** (job['attempts'] - 1))
+        # Jitter so jobs that failed together don't retry together
+        delay *= random.uniform(0.5, 1.0)
+        get_db().execute_update(
+            """UPDATE jobs SET status = 'pending', locked_by = NULL, last_error = %s,
+               run_at = DATE_ADD(CURRENT_TIMESTAMP(6), INTERVAL %s MICROSECOND) WHERE id = %s""",
+            (repr(error), int(delay * 1e6), job['id'])
+        )
+
+    def release(self, jobs: List[Dict[str, Any]]):
+        """Hand claimed but unstarted jobs back without using up an attempt"""
+        if jobs:
+            ids = [job['id'] for job in jobs]
+            get_db().execute_update(
+                f"""UPDATE jobs SET status = 'pending', attempts = attempts - 1, locked_by = NULL
+                    WHERE id IN ({', '.join(['%s'] * len(ids))})""",
+                tuple(ids)
+            )
+
+    def recover_stale(self) -> int:
+        """Retry (or dead-letter) jobs whose worker died while running them"""
+        return get_db().execute_update(
+            """UPDATE jobs SET status = IF(attempts >= max_attempts, 'dead', 'pending'),
+               locked_by = NULL, last_error = 'Lock timed out'
+               WHERE status = 'running'
+               AND locked_at < DATE_SUB(CURRENT_TIMESTAMP(6), INTERVAL %s SECOND)""",
+            (settings.JOB_LOCK_TIMEOUT_SECONDS,)
+        )
+
+    def get_dead_jobs(self, limit: int = 100) -> List[Dict[str, Any]]:
+        return get_db().execute_query(
+            "SELECT * FROM jobs WHERE status = 'dead' ORDER BY id DESC LIMIT %s",
+            (limit,),
+            primary=True
+        )
+
+    def retry_dead_job(self, job_id: int) -> bool:
+        """Move a dead job back to the queue with fresh attempts"""
+        return get_db().execute_update(
+            """UPDATE jobs SET status = 'pending', attempts = 0, run_at = CURRENT_TIMESTAMP(6)
+               WHERE id = %s AND status = 'dead'""",
+            (job_id,)
+        ) > 0
+
+
+class JobWorker:
+    """Background threads that claim and run jobs from a JobQueue"""
+
+    def __init__(self, queue: JobQueue, threads: int = None):
+        self.queue = queue
+        self.threads = settings.JOB_WORKER_THREADS if threads is None else threads
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        self._stopping.clear()
+        for index in range(self.threads):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+            thread = threading.Thread(
+                target=self._loop, args=(worker_id,), name=f"job-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = None):
+        """Let running jobs finish and hand back claimed ones that haven't started"""
+        self._stopping.set()
+        self.queue.wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _loop(self, worker_id: str):
+        next_recovery = 0.0
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() >= next_recovery:
+                    self.queue.recover_stale()
+                    next_recovery = time.monotonic() + settings.JOB_LOCK_TIMEOUT_SECONDS / 2
+                jobs = self.queue.claim(worker_id, settings.JOB_BATCH_SIZE)
+                for index, job in enumerate(jobs):
+                    if self._stopping.is_set():
+                        self.queue.release(jobs[index:])
+                        break
+                    self.queue.run(job)
+            except Exception as e:
+                logger.error("Job worker %s error", worker_id, exc_info=e)
+                jobs = []
+
+            if not jobs:
+                self.queue.wakeup.wait(settings.JOB_POLL_SECONDS)
+                self.queue.wakeup.clear()
+
+
+# Global job queue and this process's workers
+job_queue = JobQueue()
+job_worker = JobWorker(job_queue)
+
+
+def enqueue(name: str, payload: Dict[str, Any], **kwargs) -> int:
+    """Add a job to the global queue"""
+    return job_queue.enqueue(name, payload, **kwargs)
@@ -0,0 +1,203 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.profiling import current_profile, route_name
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request", "error", "suppressed"}
+
+metrics.counter("log_records_dropped_total", "Log records not written, by reason (queue_full or rate_limited)",
+                ("reason",))
+
+
+class RequestContext:
+    """What log records written while handling a request say about it"""
+
+    __slots__ = ("request_id", "scope", "user_id")
+
+    def __init__(self, request_id: str, scope):
+        self.request_id = request_id
+        self.scope = scope
+        self.user_id: Optional[str] = None
+
+
+# Request being handled, set by RequestLogMiddleware
+current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+
+def set_user(user_id: str):
+    """Attach the authenticated user to the current request's log records"""
+    context = current_request.get()
+    if context is not None:
+        context.user_id = user_id
+
+
+class RateLimitFilter(logging.Filter):
+    """Let at most LOG_RATE_LIMIT_BURST records per message template through every LOG_RATE_LIMIT_SECONDS.
+
+    Only warnings and errors are limited, so a database outage logging the
+    same failure from every request becomes a few records per window. The
+    first record let through after a suppressed stretch carries the number
+    of records dropped in between.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # (logger, template) -> [window start, records in window, suppressed since last record]
+        self._windows: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or not settings.LOG_RATE_LIMIT_BURST:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= settings.LOG_RATE_LIMIT_SECONDS:
+                if len(self._windows) >= 1024:
+                    self._windows.clear()
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, suppressed]
+            if window[1] >= settings.LOG_RATE_LIMIT_BURST:
+                window[2] += 1
+                metrics.inc("log_records_dropped_total", "rate_limited")
+                return False
+            window[1] += 1
+            if window[2]:
+                record.suppressed = window[2]
+                window[2] = 0
+        return True
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the writer thread without blocking; drops them (and counts) when the queue is full.
+
+    The request context and database timings are captured here, in the
+    thread that logs; JSON encoding and the write happen on the writer thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            error = record.exc_info[1]
+            record.error = {"type": type(error).__name__, "message": str(error)}
+            if settings.LOG_TRACEBACKS:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        context = current_request.get()
+        if context is not None:
+            request = {"id": context.request_id, "route": route_name(context.scope)}
+            if context.user_id:
+                request["user_id"] = context.user_id
+            profile = current_profile.get()
+            if profile is not None:
+                request["db_statements"] = len(profile.statements)
+                request["db_ms"] = round(profile.db_seconds * 1000, 2)
+            record.request = request
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc("log_records_dropped_total", "queue_full")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request, error and any extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in ("request", "error", "suppressed"):
+            if hasattr(record, name):
+                entry[name] = getattr(record, name)
+        if record.exc_text:
+            entry["traceback"] = record.exc_text
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        return json.dumps(entry, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging():
+    """Send the app's loggers through the queue to a writer thread (stdout, or LOG_FILE when set)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    if settings.LOG_FILE:
+        output = logging.handlers.WatchedFileHandler(settings.LOG_FILE, encoding="utf-8")
+    else:
+        output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    records: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = ContextQueueHandler(records)
+    handler.addFilter(RateLimitFilter())
+    logger = logging.getLogger("app")
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Write out the queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestLogMiddleware:
+    """Give each request an id (X-Request-ID, or a new one) for its log records, echoed in the response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        context = RequestContext(request_id or uuid.uuid4().hex, scope)
+        token = current_request.set(context)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", context.request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            current_request.reset(token)
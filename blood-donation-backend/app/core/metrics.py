@@ -0,0 +1,208 @@
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+import anyio.to_thread
+from app.core.profiling import route_template
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else f"{bound:g}"
+
+
+class Metrics:
+    """Counters, histograms and gauges served in Prometheus text format.
+
+    Counters and histograms are kept in one shard per thread, so recording
+    takes no lock and request threads never contend with each other; the
+    shards are merged when /metrics is scraped. Gauges are read from
+    callbacks at scrape time.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[Dict[tuple, Any]] = []
+        self._lock = threading.Lock()
+        # name -> (type, help, label names, buckets or gauge callback)
+        self._definitions: Dict[str, tuple] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self._definitions[name] = ("counter", help, labelnames, None)
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=REQUEST_BUCKETS):
+        self._definitions[name] = ("histogram", help, labelnames, tuple(buckets))
+        self._buckets[name] = tuple(buckets)
+
+    def gauge(self, name: str, help: str, labelnames: Tuple[str, ...], callback: Callable[[], Iterable[Tuple[tuple, float]]]):
+        """Register a gauge; callback returns (label values, value) pairs when scraped"""
+        self._definitions[name] = ("gauge", help, labelnames, callback)
+
+    def _shard(self) -> Dict[tuple, Any]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def inc(self, name: str, *labels, value: float = 1):
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name: str, value: float, *labels):
+        shard = self._shard()
+        key = (name, labels)
+        series = shard.get(key)
+        buckets = self._buckets[name]
+        if series is None:
+            # [sum, count, one counter per bucket plus +Inf]
+            series = shard[key] = [0.0, 0] + [0] * (len(buckets) + 1)
+        series[0] += value
+        series[1] += 1
+        series[2 + bisect.bisect_left(buckets, value)] += 1
+
+    def merge(self) -> Dict[tuple, Any]:
+        """Sum every thread's counters and histograms"""
+        with self._lock:
+            shards = list(self._shards)
+        merged: Dict[tuple, Any] = {}
+        for shard in shards:
+            for key, value in list(shard.items()):
+                if isinstance(value, list):
+                    total = merged.get(key)
+                    if total is None:
+                        merged[key] = list(value)
+                    else:
+                        for index, part in enumerate(value):
+                            total[index] += part
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        series: Dict[str, list] = {}
+        for (name, labels), value in self.merge().items():
+            series.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, help, labelnames, extra) in self._definitions.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "gauge":
+                try:
+                    samples = list(extra())
+                except Exception as e:
+                    logger.warning("Metric %s unavailable", name, exc_info=e)
+                    continue
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labelnames, labels)} {value}")
+            elif kind == "counter":
+                for labels, value in sorted(series.get(name, [])):
+                    lines.append(f"{name}{_format_labels(labelnames, labels)} {value}")
+            else:
+                for labels, (total, count, *buckets) in sorted(series.get(name, [])):
+                    cumulative = 0
+                    for bound, hits in zip(extra + (float("inf"),), buckets):
+                        cumulative += hits
+                        le = 'le="' + _format_bound(bound) + '"'
+                        lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {total}")
+                    lines.append(f"{name}_count{_format_labels(labelnames, labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics for this worker process
+metrics = Metrics()
+
+metrics.histogram(
+    "http_request_duration_seconds", "Request latency by route template and status",
+    ("method", "route", "status"), REQUEST_BUCKETS
+)
+metrics.histogram(
+    "db_query_duration_seconds", "SQL statement latency by normalized statement",
+    ("statement",), QUERY_BUCKETS
+)
+metrics.histogram(
+    "db_pool_wait_seconds", "Time spent waiting to borrow a pooled connection",
+    ("pool",), POOL_WAIT_BUCKETS
+)
+metrics.counter("cache_requests_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result"))
+
+
+def _cache_hit_ratios():
+    totals: Dict[str, List[float]] = {}
+    for (name, labels), value in metrics.merge().items():
+        if name == "cache_requests_total":
+            cache, result = labels
+            counts = totals.setdefault(cache, [0, 0])
+            counts[0 if result == "hit" else 1] += value
+    return [((cache,), round(hits / (hits + misses), 4)) for cache, (hits, misses) in sorted(totals.items())]
+
+
+metrics.gauge("cache_hit_ratio", "Cache hits / lookups since the worker started", ("cache",), _cache_hit_ratios)
+
+
+def _threadpool(attribute: str):
+    """Stats of the threadpool running sync endpoints (only readable on the event loop)"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    if attribute == "waiting":
+        return [((), limiter.statistics().tasks_waiting)]
+    return [((), getattr(limiter, attribute))]
+
+
+metrics.gauge("threadpool_busy_threads", "Threads running sync endpoints", (), lambda: _threadpool("borrowed_tokens"))
+metrics.gauge("threadpool_max_threads", "Threadpool capacity", (), lambda: _threadpool("total_tokens"))
+metrics.gauge("threadpool_waiting_tasks", "Sync endpoints queued for a free thread", (), lambda: _threadpool("waiting"))
+
+
+class MetricsMiddleware:
+    """Record latency per route template and status, and count requests in flight"""
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+        metrics.gauge("http_requests_in_flight", "Requests being handled", (), lambda: [((), self.in_flight)])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        response_status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                response_status[0] = message["status"]
+            await send(message)
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight -= 1
+            metrics.observe(
+                "http_request_duration_seconds", time.perf_counter() - started,
+                scope["method"], route_template(scope), str(response_status[0])
+            )
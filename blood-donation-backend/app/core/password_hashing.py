@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Tuple
+from app.core.config import settings
+from app.core import security
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many password hashes are already queued"""
+
+
+def _hash(password: str) -> str:
+    return security.get_password_hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return security.verify_password(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated, bounded process pool.
+
+    bcrypt costs ~100-300 ms of CPU per call; running it on the request
+    threadpool lets a login burst starve every other endpoint. Here at most
+    PASSWORD_HASH_MAX_PENDING hashes are queued or running, and callers
+    beyond that get PasswordHasherBusy (served as 503) instead of waiting.
+    A caller whose hash isn't done within PASSWORD_HASH_TIMEOUT_SECONDS gets
+    PasswordHasherBusy too; the hash counts as pending until a worker is
+    actually done with it.
+
+    Endpoints await hash_async/verify_async so a queued hash doesn't hold
+    one of the request threadpool's threads; hash/verify block, for scripts.
+    A pool broken by a dead worker process is replaced on the next call.
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = None):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+        self.max_pending = max_pending or settings.PASSWORD_HASH_MAX_PENDING
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn, not fork: the server process has threads running
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def _discard(self, executor):
+        """Drop a broken pool so the next call starts a new one"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        logger.warning("Password hashing worker died, restarting the pool")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args) -> Tuple[ProcessPoolExecutor, Future]:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy("Too many password hashing requests queued")
+            self._pending += 1
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._discard(executor)
+                executor = self._get_executor()
+                future = executor.submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return executor, future
+
+    def _run(self, fn, *args):
+        executor, future = self._submit(fn, *args)
+        try:
+            return future.result(timeout=settings.PASSWORD_HASH_TIMEOUT_SECONDS)
+        except TimeoutError:
+            future.cancel()  # only succeeds if no worker has started it
+            raise PasswordHasherBusy("Password hashing timed out")
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise PasswordHasherBusy("Password hashing worker died")
+
+    async def _run_async(self, fn, *args):
+        executor, future = self._submit(fn, *args)
+        try:
+            # Cancelling the wrapper (on timeout or a dropped request) cancels the
+            # hash if no worker has started it
+            return await asyncio.wait_for(asyncio.wrap_future(future), settings.PASSWORD_HASH_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise PasswordHasherBusy("Password hashing timed out")
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise PasswordHasherBusy("Password hashing worker died")
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    @property
+    def queue_depth(self) -> int:
+        """Hashes currently queued or running"""
+        return self._pending
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(_verify, plain_password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(_hash, password)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(_verify, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
+
+metrics.gauge(
+    "password_hash_queue_depth", "bcrypt hashes queued or running", (),
+    lambda: [((), password_hasher.queue_depth)]
+)
@@ -0,0 +1,215 @@
+import re
+import threading
+from collections import deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def query_shape(query: str) -> str:
+    """Normalize a statement so calls differing only in values group together.
+
+    Literals and placeholders become ?, IN lists and multi-row VALUES
+    collapse to a single entry, and whitespace is squeezed.
+    """
+    shape = _STRING.sub("?", query)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    shape = _VALUES_ROWS.sub(r"\1, ...", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0 for an empty one)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class RequestProfile:
+    """Statements run while handling one request"""
+
+    __slots__ = ("statements",)
+
+    def __init__(self):
+        # (query, seconds) in execution order
+        self.statements: List[Tuple[str, float]] = []
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.statements)
+
+    @property
+    def slowest(self) -> Optional[Tuple[str, float]]:
+        return max(self.statements, key=lambda statement: statement[1], default=None)
+
+
+# Profile of the request being handled, set by QueryProfilerMiddleware
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+def record_statement(query: str, seconds: float):
+    """Called by the database layer for every statement it runs"""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.statements.append((query, seconds))
+
+
+class QueryProfiler:
+    """Per-route and per-query-shape timings across recent requests.
+
+    Each series keeps its last QUERY_PROFILER_SAMPLES values, so percentiles
+    describe recent traffic and memory stays bounded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: Dict[str, Dict[str, Any]] = {}
+
+    def _samples(self) -> deque:
+        return deque(maxlen=settings.QUERY_PROFILER_SAMPLES)
+
+    def add(self, route: str, profile: RequestProfile):
+        calls: Dict[str, List[float]] = {}
+        for query, seconds in profile.statements:
+            calls.setdefault(query_shape(query), []).append(seconds)
+
+        with self._lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = {
+                    "requests": 0,
+                    "statements": self._samples(),
+                    "db_seconds": self._samples(),
+                    "shapes": {},
+                }
+            stats["requests"] += 1
+            stats["statements"].append(len(profile.statements))
+            stats["db_seconds"].append(profile.db_seconds)
+            for shape, durations in calls.items():
+                shape_stats = stats["shapes"].get(shape)
+                if shape_stats is None:
+                    shape_stats = stats["shapes"][shape] = {"calls": 0, "seconds": self._samples()}
+                shape_stats["calls"] += len(durations)
+                shape_stats["seconds"].extend(durations)
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Routes by total recent DB time, each with its query shapes by total time"""
+        with self._lock:
+            snapshot = [
+                (route, stats["requests"], list(stats["statements"]), list(stats["db_seconds"]),
+                 [(shape, s["calls"], list(s["seconds"])) for shape, s in stats["shapes"].items()])
+                for route, stats in self.routes.items()
+            ]
+
+        report = []
+        for route, requests, statements, db_seconds, shapes in snapshot:
+            queries = [
+                {
+                    "shape": shape,
+                    "calls": calls,
+                    "calls_per_request": round(calls / requests, 2),
+                    "p50_ms": round(percentile(seconds, 0.50) * 1000, 3),
+                    "p95_ms": round(percentile(seconds, 0.95) * 1000, 3),
+                    "p99_ms": round(percentile(seconds, 0.99) * 1000, 3),
+                    "total_ms": round(sum(seconds) * 1000, 3),
+                }
+                for shape, calls, seconds in shapes
+            ]
+            queries.sort(key=lambda query: query["total_ms"], reverse=True)
+            report.append({
+                "route": route,
+                "requests": requests,
+                "statements_per_request": {
+                    "p50": percentile(statements, 0.50),
+                    "p95": percentile(statements, 0.95),
+                    "p99": percentile(statements, 0.99),
+                    "max": max(statements, default=0),
+                },
+                "db_ms": {
+                    "p50": round(percentile(db_seconds, 0.50) * 1000, 3),
+                    "p95": round(percentile(db_seconds, 0.95) * 1000, 3),
+                    "p99": round(percentile(db_seconds, 0.99) * 1000, 3),
+                },
+                "total_db_ms": round(sum(db_seconds) * 1000, 3),
+                "queries": queries,
+            })
+        report.sort(key=lambda route: route["total_db_ms"], reverse=True)
+        return report
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+
+# Global profiler for this worker process
+query_profiler = QueryProfiler()
+
+
+def route_template(scope) -> str:
+    """/route/{template} of a handled request, or "unmatched" (the raw path is unbounded).
+
+    The template is the matched route's own path. Newer FastAPI versions
+    give routes of an included router their path relative to that router,
+    so the (literal) router prefix is the request path's segments before
+    the ones the route's path covers.
+    """
+    route_path = getattr(scope.get("route"), "path", None)
+    if route_path is None:
+        return "unmatched"
+    covered = route_path.count("/") + sum(
+        str(value).count("/") for name, value in (scope.get("path_params") or {}).items()
+        if f"{{{name}:path}}" in route_path
+    )
+    segments = scope["path"].split("/")
+    return "/".join(segments[:max(len(segments) - covered, 1)]) + route_path
+
+
+def route_name(scope) -> str:
+    return f"{scope['method']} {route_template(scope)}"
+
+
+class QueryProfilerMiddleware:
+    """Collect the statements each request runs.
+
+    Adds a Server-Timing header with the statement count, total DB time
+    and slowest statement, and feeds the per-route report served at
+    /api/v1/admin/query-profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.QUERY_PROFILER_ENABLED:
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and profile.statements:
+                slowest = profile.slowest[1]
+                timing = (
+                    f'db;dur={profile.db_seconds * 1000:.2f};desc="{len(profile.statements)} queries", '
+                    f"db-slowest;dur={slowest * 1000:.2f}"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+            query_profiler.add(route_name(scope), profile)
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+from app.core.config import settings
+
+# Low bits of an event id that tell worker processes apart
+_WORKER_BITS = 10
+
+
+class Subscription:
+    """A subscriber's queue of pending events, read from its event loop"""
+
+    def __init__(self, topics: Iterable[str], loop: asyncio.AbstractEventLoop):
+        self.topics = set(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=settings.LIVE_SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event: Dict[str, Any]):
+        """Queue an event (runs on the subscriber's event loop)"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: drop it, the client reconnects with Last-Event-ID
+            self.overflowed = True
+
+
+class EventBus:
+    """In-process pub/sub for change events.
+
+    Publishers may run on any thread (sync route handlers run in the
+    threadpool); events are handed to each subscriber's event loop, so idle
+    subscribers cost a queue, not a thread. Recent events are kept in a ring
+    buffer so clients can resume from their last event id.
+
+    Event ids are the publish time in milliseconds with the worker in the
+    low bits, so ids from different worker processes are ordered too and a
+    client reconnecting to another worker resumes from the right point.
+    """
+
+    def __init__(self, buffer_size: int = None, worker_id: int = None):
+        self._worker = (os.getpid() if worker_id is None else worker_id) % (1 << _WORKER_BITS)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._subscribers: List[Subscription] = []
+        self._recent = deque(maxlen=buffer_size or settings.LIVE_REPLAY_BUFFER_SIZE)
+
+    def _next_id(self) -> int:
+        # Strictly increasing within the worker, even if the clock steps back
+        event_id = max(time.time_ns() // 1_000_000 << _WORKER_BITS | self._worker,
+                       self._last_id + (1 << _WORKER_BITS))
+        self._last_id = event_id
+        return event_id
+
+    def publish(self, topic: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Publish an event to every subscriber of topic"""
+        with self._lock:
+            event = {"id": self._next_id(), "topic": topic, "data": data}
+            self._recent.append(event)
+            subscribers = [s for s in self._subscribers if topic in s.topics]
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Event loop already closed
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, topics: Iterable[str],
+                  last_event_id: Optional[int] = None) -> tuple:
+        """Register a subscriber on the running loop.
+
+        Returns the subscription and the buffered events after last_event_id.
+        """
+        subscription = Subscription(topics, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.append(subscription)
+            missed = []
+            if last_event_id is not None:
+                missed = [e for e in self._recent
+                          if e["id"] > last_event_id and e["topic"] in subscription.topics]
+        return subscription, missed
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Serialize an event in text/event-stream format"""
+    data = json.dumps(event["data"], default=str)
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {data}\n\n"
+
+
+# Global event bus instance
+event_bus = EventBus()
+
+
+def publish(topic: str, data: Dict[str, Any]):
+    """Publish a change event on the global bus"""
+    return event_bus.publish(topic, data)
+
+
+# Blood request fields that are broadcast (no contact or medical details)
+REQUEST_EVENT_FIELDS = [
+    "id", "blood_type", "urgency_level", "units_needed", "hospital_name", "status", "request_date"
+]
+
+# Donation event fields that are broadcast
+EVENT_EVENT_FIELDS = ["id", "title", "date", "time", "location", "capacity", "status"]
+
+
+def publish_request_change(action: str, receiver: Dict[str, Any]):
+    """Publish a blood request change, also on the critical topic when urgent"""
+    data = {"action": action, "request": {k: receiver.get(k) for k in REQUEST_EVENT_FIELDS}}
+    publish("requests", data)
+    if receiver.get("urgency_level") == "critical":
+        publish("critical", data)
+
+
+def publish_event_change(action: str, event: Dict[str, Any]):
+    """Publish a donation event change with its registration count"""
+    summary = {k: event.get(k) for k in EVENT_EVENT_FIELDS}
+    registered = event.get("registered_donors")
+    if isinstance(registered, list):
+        summary["registered_count"] = len(registered)
+    publish("events", {"action": action, "event": summary})
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import re
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.core.profiling import query_shape, route_name
+
+# SELECT ... FROM table WHERE column = ?: a lookup a loop could batch into one IN query
+_SINGLE_LOOKUP = re.compile(
+    r"^SELECT (?P<columns>.+?) FROM (?P<table>\w+) WHERE (?P<column>\w+) = \?(?: LIMIT \?)?$", re.IGNORECASE
+)
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_APP = os.path.join(_ROOT, "app") + os.sep
+# Frames that are the database layer itself rather than the code issuing the statement
+_INTERNAL = tuple(os.path.join(_ROOT, "app", "core", name) for name in ("database.py", "query_audit.py"))
+
+logger = logging.getLogger(__name__)
+
+
+class QueryAuditError(AssertionError):
+    """Statements that should have been batched or reused (QUERY_AUDIT_MODE=raise)"""
+
+
+def _hashable(params) -> Any:
+    try:
+        hash(params)
+        return params
+    except TypeError:
+        return repr(params)
+
+
+def _call_stack() -> List[str]:
+    """Application frames (outermost first) that led to the current statement"""
+    return [
+        f"{os.path.relpath(frame.filename, _ROOT)}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(_APP) and not frame.filename.startswith(_INTERNAL)
+        and frame.name != "__call__"  # ASGI middleware
+    ]
+
+
+class QueryAudit:
+    """Statements of one request (or audited block), checked for N+1 patterns as they run.
+
+    - repeated: a statement shape runs more than QUERY_AUDIT_MAX_REPEATS times
+    - duplicate: the same statement with the same parameters runs more than
+      QUERY_AUDIT_MAX_DUPLICATES times
+    - lookup_loop: QUERY_AUDIT_LOOKUP_LOOP or more single-row lookups by one
+      column with different values, which one IN query could replace
+
+    Each finding keeps the call stack of the statement that triggered it.
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.shapes: Dict[str, int] = {}
+        self.statements: Dict[tuple, int] = {}
+        # Lookup shape -> distinct parameters it was called with
+        self.lookups: Dict[str, set] = {}
+        # (kind, shape) -> finding
+        self.findings: Dict[tuple, Dict[str, Any]] = {}
+
+    def _find(self, kind: str, shape: str, count: int, suggestion: str):
+        finding = self.findings.get((kind, shape))
+        if finding is None:
+            self.findings[(kind, shape)] = {
+                "kind": kind, "shape": shape, "count": count, "suggestion": suggestion, "stack": _call_stack()
+            }
+        else:
+            finding["count"] = count
+
+    def record(self, query: str, params, many: bool, rows: int):
+        shape = query_shape(query)
+        count = self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        if many:
+            if count > settings.QUERY_AUDIT_MAX_REPEATS:
+                self._find("repeated", shape, count, "run the batches as one statement")
+            return
+
+        key = (query, _hashable(params))
+        duplicates = self.statements[key] = self.statements.get(key, 0) + 1
+        if duplicates > settings.QUERY_AUDIT_MAX_DUPLICATES:
+            self._find("duplicate", shape, duplicates, "reuse the result of the earlier identical statement")
+
+        lookup = _SINGLE_LOOKUP.match(shape)
+        if lookup and rows <= 1:
+            values = self.lookups.setdefault(shape, set())
+            values.add(key[1])
+            if len(values) >= settings.QUERY_AUDIT_LOOKUP_LOOP:
+                self._find("lookup_loop", shape, len(values),
+                           f"fetch them at once: SELECT {lookup['columns']} FROM {lookup['table']} "
+                           f"WHERE {lookup['column']} IN (...)")
+                return
+        if count > settings.QUERY_AUDIT_MAX_REPEATS and ("lookup_loop", shape) not in self.findings:
+            self._find("repeated", shape, count, "load the rows once (JOIN or IN) instead of per item")
+
+    def report(self) -> List[Dict[str, Any]]:
+        return list(self.findings.values())
+
+    def describe(self) -> str:
+        lines = [f"Query audit: {len(self.findings)} finding(s) in {self.name or 'audited block'}"]
+        for finding in self.findings.values():
+            lines.append(f"  {finding['kind']} x{finding['count']}: {finding['shape']}")
+            lines.append(f"    {finding['suggestion']}")
+            lines.extend(f"    at {frame}" for frame in finding["stack"])
+        return "\n".join(lines)
+
+    def check(self, mode: str = None):
+        """Log the findings (warn) or raise QueryAuditError (raise)"""
+        mode = mode or settings.QUERY_AUDIT_MODE
+        if not self.findings or mode == "off":
+            return
+        if mode == "raise":
+            raise QueryAuditError(self.describe())
+        logger.warning(self.describe())
+
+
+# Audit of the request being handled, set by QueryAuditMiddleware or audit_queries()
+current_audit: ContextVar[Optional[QueryAudit]] = ContextVar("current_audit", default=None)
+
+
+def audit_statement(query: str, params, many: bool, rows: int):
+    """Called by the database layer for every statement it runs"""
+    audit = current_audit.get()
+    if audit is not None:
+        audit.record(query, params, many, rows)
+
+
+@contextmanager
+def audit_queries(name: str = "", mode: str = "raise"):
+    """Audit the statements run inside a with block (for tests); checks them on a clean exit"""
+    audit = QueryAudit(name)
+    token = current_audit.set(audit)
+    try:
+        yield audit
+    finally:
+        current_audit.reset(token)
+    audit.check(mode)
+
+
+class QueryAuditMiddleware:
+    """Audit each request's statements (QUERY_AUDIT_MODE warn or raise).
+
+    In raise mode a request with findings gets a 500 response listing them
+    instead of its own, so the test that sent it fails; findings made after
+    the response started (streaming) are printed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or settings.QUERY_AUDIT_MODE == "off":
+            return await self.app(scope, receive, send)
+
+        audit = QueryAudit()
+        token = current_audit.set(audit)
+        replaced = [False]
+
+        async def send_checked(message):
+            if message["type"] == "http.response.start":
+                audit.name = route_name(scope)
+                if audit.findings and settings.QUERY_AUDIT_MODE == "raise":
+                    replaced[0] = True
+                    body = json.dumps({"detail": audit.describe(), "findings": audit.report()}).encode()
+                    await send({"type": "http.response.start", "status": 500, "headers": [
+                        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())
+                    ]})
+                    await send({"type": "http.response.body", "body": body})
+                    logger.warning(audit.describe())
+                    return
+            if not replaced[0]:
+                await send(message)
+
+        try:
+            await self.app(scope, receive, send_checked)
+        finally:
+            current_audit.reset(token)
+        if not replaced[0]:
+            audit.name = audit.name or route_name(scope)
+            audit.check("warn")
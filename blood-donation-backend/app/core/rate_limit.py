@@ -0,0 +1,196 @@
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from typing import Dict, Tuple
+from fastapi import status
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.core.security import decode_token
+
+
+class MemoryRateLimitBackend:
+    """In-process token buckets (per worker process)"""
+
+    # Drop buckets idle this long when pruning; they would be full again anyway
+    IDLE_SECONDS = 600
+    PRUNE_EVERY_CALLS = 10000
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    async def acquire(self, key: str, rate: float, burst: float) -> float:
+        """Take one token; returns 0 if allowed, else seconds until a token is available"""
+        now = time.monotonic()
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY_CALLS == 0:
+                self._prune(now)
+
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def _prune(self, now: float):
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket[1] < self.IDLE_SECONDS
+        }
+
+
+class RedisRateLimitBackend:
+    """Token buckets shared by all workers through Redis (requires the redis package)"""
+
+    SCRIPT = """
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the redis package") from e
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def acquire(self, key: str, rate: float, burst: float) -> float:
+        wait = await self._script(keys=[f"ratelimit:{key}"], args=[rate, burst, time.time()])
+        return float(wait)
+
+
+def client_key(scope) -> str:
+    """The user id from a bearer token, else the client IP, for an ASGI request"""
+    headers = dict(scope.get("headers") or [])
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if authorization.lower().startswith("bearer "):
+        claims = decode_token(authorization[7:])
+        if claims and claims.get("sub"):
+            return f"user:{claims['sub']}"
+
+    forwarded = headers.get(b"x-forwarded-for")
+    if settings.RATE_LIMIT_TRUSTED_PROXIES > 0 and forwarded:
+        # Each trusted proxy appends the address it got the request from, so the
+        # client is that many from the right; anything further left can be forged
+        addresses = [address.strip() for address in forwarded.decode("latin-1").split(",") if address.strip()]
+        if addresses:
+            return "ip:" + addresses[max(len(addresses) - settings.RATE_LIMIT_TRUSTED_PROXIES, 0)]
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+async def _read_body(receive, limit: int):
+    """Up to limit bytes of the request body, and a receive that replays what was read"""
+    messages = []
+    body = b""
+    while len(body) <= limit:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+
+    async def replay():
+        if messages:
+            return messages.pop(0)
+        return await receive()
+
+    return body, replay
+
+
+def _credential(body: bytes) -> str:
+    """The email (or a hash of the refresh token) an auth request submits, or "" """
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return ""
+    if not isinstance(data, dict):
+        return ""
+    if isinstance(data.get("email"), str):
+        return "email:" + data["email"].strip().lower()
+    if isinstance(data.get("refresh_token"), str):
+        return "refresh:" + hashlib.sha256(data["refresh_token"].encode()).hexdigest()[:32]
+    return ""
+
+
+def create_backend():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+    return MemoryRateLimitBackend()
+
+
+class RateLimitMiddleware:
+    """Per-client token bucket rate limiting by route class.
+
+    Requests are classified by RATE_LIMIT_ROUTES (method, path regex, class),
+    falling back to "read" for GET/HEAD and "write" otherwise. Each class has
+    a (rate per second, burst) in RATE_LIMIT_CLASSES. Authenticated requests
+    are limited per user, anonymous ones per client IP.
+
+    Login, register and refresh are anonymous, so keying "auth" on the IP
+    alone would let one user lock out everyone behind the same NAT. Instead
+    "auth" is limited per client and submitted email (or refresh token),
+    and "auth_client" caps all auth requests from one client.
+    """
+
+    # Larger auth bodies aren't parsed; they are limited per client only
+    MAX_AUTH_BODY = 4096
+
+    def __init__(self, app, backend=None):
+        self.app = app
+        self.backend = backend or create_backend()
+        self.routes = [
+            (method.upper(), re.compile(pattern), rate_class)
+            for method, pattern, rate_class in settings.RATE_LIMIT_ROUTES
+        ]
+
+    def route_class(self, method: str, path: str) -> str:
+        for route_method, pattern, rate_class in self.routes:
+            if route_method in ("*", method) and pattern.search(path):
+                return rate_class
+        return "read" if method in ("GET", "HEAD", "OPTIONS") else "write"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+
+        rate_class = self.route_class(scope["method"], scope["path"])
+        client = client_key(scope)
+        buckets = [(rate_class, client)]
+        if rate_class == "auth":
+            body, receive = await _read_body(receive, self.MAX_AUTH_BODY)
+            buckets = [("auth_client", client), ("auth", f"{client}:{_credential(body)}")]
+
+        for bucket_class, key in buckets:
+            limits = settings.RATE_LIMIT_CLASSES.get(bucket_class)
+            if not limits:
+                continue
+            rate, burst = limits
+            wait = await self.backend.acquire(f"{bucket_class}:{key}", rate, burst)
+            if wait > 0:
+                response = JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"detail": "Too many requests"},
+                    headers={"Retry-After": str(math.ceil(wait))}
+                )
+                return await response(scope, receive, send)
+
+        await self.app(scope, receive, send)
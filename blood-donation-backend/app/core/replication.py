@@ -0,0 +1,20 @@
+from app.core.database import db, read_session
+from app.core.rate_limit import client_key
+
+
+class ReadYourWritesMiddleware:
+    """Tag each request with its user (or client IP) so the database can send
+    that client's reads to the primary for a while after it writes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not db.replicas:
+            return await self.app(scope, receive, send)
+
+        token = read_session.set(client_key(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            read_session.reset(token)
@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+import pymysql
+from fastapi import status
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# MySQL client/server error codes meaning the connection (or server) is gone
+CONNECTION_ERRORS = {
+    1040,  # too many connections
+    1053,  # server shutdown in progress
+    2003,  # can't connect
+    2006,  # server has gone away
+    2013,  # lost connection during query
+    2055,  # lost connection at handshake/reading
+}
+
+# Errors after which re-running a read is safe and likely to succeed
+RETRYABLE_READ_ERRORS = CONNECTION_ERRORS | {
+    1205,  # lock wait timeout
+    1213,  # deadlock
+}
+
+
+class DatabaseUnavailable(Exception):
+    """Raised when the database can't be reached (or its circuit breaker is open)"""
+
+
+def error_code(error: Exception):
+    return error.args[0] if error.args and isinstance(error.args[0], int) else None
+
+
+def is_connection_error(error: Exception) -> bool:
+    # InterfaceError: pymysql refused to use an already-closed connection
+    return isinstance(error, pymysql.err.InterfaceError) or (
+        isinstance(error, pymysql.err.OperationalError) and error_code(error) in CONNECTION_ERRORS
+    )
+
+
+def is_retryable_read_error(error: Exception) -> bool:
+    return is_connection_error(error) or (
+        isinstance(error, pymysql.err.OperationalError) and error_code(error) in RETRYABLE_READ_ERRORS
+    )
+
+
+class CircuitBreaker:
+    """Fails fast instead of queueing requests behind a database that is down.
+
+    After DB_CIRCUIT_FAILURE_THRESHOLD consecutive connection failures the
+    circuit opens and check() raises DatabaseUnavailable immediately. After
+    DB_CIRCUIT_RESET_SECONDS one caller is let through as a trial: success
+    closes the circuit, failure opens it for another period.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < settings.DB_CIRCUIT_RESET_SECONDS:
+            return "open"
+        return "half_open"
+
+    def check(self):
+        if self.opened_at is None:
+            return
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half_open" and self._trial):
+                raise DatabaseUnavailable(f"Database {self.name} is unavailable (circuit open)")
+            if state == "half_open":
+                self._trial = True
+
+    def record_success(self):
+        if self.failures or self.opened_at is not None:
+            with self._lock:
+                if self.opened_at is not None:
+                    logger.warning("Database %s circuit closed", self.name)
+                self.failures = 0
+                self.opened_at = None
+                self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.opened_at is not None or self.failures >= settings.DB_CIRCUIT_FAILURE_THRESHOLD:
+                if self.opened_at is None:
+                    logger.error("Database %s circuit opened after %s failures", self.name, self.failures)
+                self.opened_at = time.monotonic()
+
+
+class DegradedReadMiddleware:
+    """Serve the last good response to GET requests while the database is unavailable.
+
+    Successful, complete GET responses up to DEGRADED_CACHE_MAX_BYTES are
+    kept in a bounded LRU keyed by path, query string and Authorization
+    header. When a request fails with DatabaseUnavailable, a cached copy
+    younger than DEGRADED_CACHE_MAX_AGE_SECONDS is returned with a Warning
+    header; otherwise the client gets 503 with Retry-After.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cache: OrderedDict = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        cacheable = scope["method"] == "GET"
+        headers = dict(scope.get("headers") or [])
+        key = (scope["path"], scope.get("query_string", b""), headers.get(b"authorization", b""))
+        response = {"started": False, "status": None, "headers": None, "body": [], "size": 0, "complete": False}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["started"] = True
+                response["status"] = message["status"]
+                response["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body" and cacheable and response["status"] == 200:
+                response["size"] += len(message.get("body", b""))
+                if response["size"] <= settings.DEGRADED_CACHE_MAX_BYTES:
+                    response["body"].append(message.get("body", b""))
+                response["complete"] = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except DatabaseUnavailable:
+            if response["started"]:
+                raise
+            return await self._degraded(key if cacheable else None, scope, receive, send)
+
+        if (cacheable and response["status"] == 200 and response["complete"]
+                and response["size"] <= settings.DEGRADED_CACHE_MAX_BYTES):
+            self.cache[key] = (time.monotonic(), response["headers"], b"".join(response["body"]))
+            self.cache.move_to_end(key)
+            while len(self.cache) > settings.DEGRADED_CACHE_ENTRIES:
+                self.cache.popitem(last=False)
+
+    async def _degraded(self, key, scope, receive, send):
+        with span("cache.get", cache="degraded") as lookup:
+            cached = self.cache.get(key) if key else None
+            fresh = bool(cached) and time.monotonic() - cached[0] <= settings.DEGRADED_CACHE_MAX_AGE_SECONDS
+            lookup.set("cache.hit", fresh)
+        if fresh:
+            metrics.inc("cache_requests_total", "degraded", "hit")
+            stored_at, headers, body = cached
+            age = int(time.monotonic() - stored_at)
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": list(headers) + [
+                    (b"age", str(age).encode()),
+                    (b"warning", b'110 - "Response is Stale"'),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        metrics.inc("cache_requests_total", "degraded", "miss")
+        response = JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Database is temporarily unavailable, please retry shortly"},
+            headers={"Retry-After": str(settings.DB_CIRCUIT_RESET_SECONDS)}
+        )
+        await response(scope, receive, send)
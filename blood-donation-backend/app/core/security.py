@@ -1,14 +1,26 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Dict, Optional, Union
 from jose import jwt
+import hashlib
+import secrets
+import threading
+import time
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.tracing import span
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# Recently verified tokens: sha256(token) -> decoded claims, kept until exp (LRU bounded)
+_verified_tokens: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+_verified_tokens_lock = threading.Lock()
 
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None
+    subject: Union[str, Any], expires_delta: timedelta = None,
+    session_id: Optional[str] = None, claims: Optional[Dict[str, Any]] = None
 ) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -17,6 +29,10 @@ def create_access_token(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     to_encode = {"exp": expire, "sub": str(subject)}
+    if session_id:
+        to_encode["sid"] = session_id
+    if claims:
+        to_encode.update({k: v for k, v in claims.items() if v is not None})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
@@ -29,11 +45,47 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def verify_token(token: str) -> Union[str, None]:
+def create_refresh_token() -> str:
+    """Opaque random refresh token; only its hash is stored"""
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    # Refresh tokens are high-entropy, so a fast hash is enough (no bcrypt)
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verify a token and return its claims (shared, do not mutate)"""
+    key = hashlib.sha256(token.encode()).digest()
+    with span("cache.get", cache="token") as lookup, _verified_tokens_lock:
+        claims = _verified_tokens.get(key)
+        if claims is not None:
+            if claims["exp"] > time.time():
+                _verified_tokens.move_to_end(key)
+                metrics.inc("cache_requests_total", "token", "hit")
+                lookup.set("cache.hit", True)
+                return claims
+            del _verified_tokens[key]
+        lookup.set("cache.hit", False)
+    
+    metrics.inc("cache_requests_total", "token", "miss")
     try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
-        )
-        return payload.get("sub")
+        with span("jwt.decode"):
+            claims = jwt.decode(
+                token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
+            )
     except jwt.JWTError:
         return None
+    
+    if "exp" in claims:
+        with _verified_tokens_lock:
+            _verified_tokens[key] = claims
+            if len(_verified_tokens) > settings.TOKEN_CACHE_SIZE:
+                _verified_tokens.popitem(last=False)
+    return claims
+
+
+def verify_token(token: str) -> Union[str, None]:
+    payload = decode_token(token)
+    return payload.get("sub") if payload else None
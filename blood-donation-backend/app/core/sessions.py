@@ -0,0 +1,66 @@
+import logging
+import threading
+import time
+from typing import Dict, Set
+from app.core.config import settings
+from app.core.db_operations import get_db_ops, SessionOperations
+
+logger = logging.getLogger(__name__)
+
+
+class SessionDenylist:
+    """Cached set of revoked session ids, checked on every authenticated request.
+
+    Access tokens carry their session id (sid). Rather than reading the
+    sessions table per request, recently revoked ids are reloaded at most
+    every SESSION_DENYLIST_SYNC_SECONDS; revocations in this process apply
+    immediately. Only revocations within the access token lifetime matter,
+    since older tokens have expired anyway.
+
+    One thread reloads at a time while the others keep checking the current
+    set. A failed reload keeps the current set until the next interval.
+    """
+
+    def __init__(self):
+        self._revoked: Set[str] = set()
+        self._added: Dict[str, float] = {}
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def add(self, session_id: str):
+        with self._lock:
+            self._revoked = self._revoked | {session_id}
+            self._added[session_id] = time.monotonic()
+
+    def sync(self):
+        started = time.monotonic()
+        session_ops = SessionOperations(get_db_ops())
+        revoked = set(session_ops.get_recently_revoked_ids(settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+        with self._lock:
+            # Keep local revocations the query may have raced with
+            self._added = {sid: at for sid, at in self._added.items() if at >= started}
+            self._revoked = revoked | set(self._added)
+            self._synced_at = started
+
+    def _maybe_sync(self):
+        if time.monotonic() - self._synced_at <= settings.SESSION_DENYLIST_SYNC_SECONDS:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            # Back off for a full interval if this fails, rather than retrying on every request
+            self._synced_at = time.monotonic()
+            self.sync()
+        except Exception as e:
+            logger.warning("Session denylist reload failed, keeping the current one: %s", e)
+        finally:
+            self._sync_lock.release()
+
+    def is_revoked(self, session_id: str) -> bool:
+        self._maybe_sync()
+        return session_id in self._revoked
+
+
+# Global session denylist instance
+session_denylist = SessionDenylist()
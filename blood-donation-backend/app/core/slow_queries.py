@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.core.profiling import query_shape
+
+# Statements MySQL can EXPLAIN
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE")
+
+logger = logging.getLogger(__name__)
+
+
+def params_fingerprint(params) -> Optional[str]:
+    """Short stable hash of the parameter values (the values themselves aren't kept)"""
+    if params is None:
+        return None
+    return hashlib.sha256(repr(params).encode()).hexdigest()[:12]
+
+
+class SlowQueryLog:
+    """Statements slower than SLOW_QUERY_THRESHOLD_MS, with their query plans.
+
+    The last SLOW_QUERY_LOG_SIZE entries are kept in a ring buffer. A
+    background thread runs EXPLAIN FORMAT=JSON once per query shape (with
+    the parameters of the first slow call) and appends entries to
+    SLOW_QUERY_LOG_FILE when set, so the request that was slow pays only
+    for an append to a queue.
+    """
+
+    def __init__(self):
+        self.entries: deque = deque(maxlen=settings.SLOW_QUERY_LOG_SIZE)
+        # Query shape -> EXPLAIN FORMAT=JSON output (or the error explaining it)
+        self.plans: Dict[str, Any] = {}
+        self._queue: queue.Queue = queue.Queue(maxsize=1000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._file_logger: Optional[logging.Logger] = None
+
+    def record(self, query: str, params, seconds: float, rows: int):
+        """Called by the database layer for statements over the threshold"""
+        shape = query_shape(query)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "shape": shape,
+            "params_fingerprint": params_fingerprint(params),
+            "duration_ms": round(seconds * 1000, 3),
+            "rows": rows,
+        }
+        self.entries.append(entry)
+
+        explain = shape not in self.plans and shape.upper().startswith(_EXPLAINABLE)
+        if explain:
+            # Claim the shape so concurrent slow calls don't queue it again
+            self.plans[shape] = None
+        self._start()
+        try:
+            self._queue.put_nowait((entry, query if explain else None, params))
+        except queue.Full:
+            if explain:
+                self.plans.pop(shape, None)
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name="slow-query-log", daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            entry, query, params = self._queue.get()
+            if query is not None:
+                self.plans[entry["shape"]] = self._explain(query, params)
+            if settings.SLOW_QUERY_LOG_FILE:
+                self._write(entry)
+
+    def _explain(self, query: str, params) -> Any:
+        from app.core.database import get_db
+
+        if len(self.plans) > settings.SLOW_QUERY_LOG_SIZE:
+            # Bound memory if shapes keep changing (ad hoc queries); plans are re-captured
+            self.plans = {shape: plan for shape, plan in self.plans.items() if plan is None}
+        try:
+            rows = get_db().execute_query(f"EXPLAIN FORMAT=JSON {query}", params, primary=True)
+            return json.loads(next(iter(rows[0].values()))) if rows else None
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _write(self, entry: Dict[str, Any]):
+        if self._file_logger is None:
+            handler = logging.handlers.RotatingFileHandler(
+                settings.SLOW_QUERY_LOG_FILE,
+                maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=settings.SLOW_QUERY_LOG_BACKUPS
+            )
+            self._file_logger = logging.getLogger("slow_queries")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.addHandler(handler)
+        try:
+            self._file_logger.info(json.dumps({**entry, "plan": self.plans.get(entry["shape"])}, default=str))
+        except Exception as e:
+            logger.warning("Slow query log write failed", exc_info=e)
+
+    def recent(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest entries first, each with its shape's query plan"""
+        entries = list(self.entries)[-limit:] if limit > 0 else []
+        return [{**entry, "plan": self.plans.get(entry["shape"])} for entry in reversed(entries)]
+
+    def clear(self):
+        self.entries.clear()
+        self.plans = {}
+
+
+# Global slow query log for this worker process
+slow_query_log = SlowQueryLog()
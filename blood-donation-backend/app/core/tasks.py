@@ -0,0 +1,85 @@
+import logging
+import uuid
+from typing import Any, Dict
+from app.core.config import settings
+from app.core.jobs import job_handler, enqueue
+from app.core.pubsub import publish
+
+APPLY_TEST_RESULTS = "apply_test_results"
+SEND_REGISTRATION_NOTIFICATION = "send_registration_notification"
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_test_results(record_id: str, previous_status: str, new_status: str, db=None):
+    """Queue inventory and eligibility updates for a donation whose test results changed"""
+    if previous_status != new_status:
+        enqueue(APPLY_TEST_RESULTS, {
+            "record_id": record_id,
+            "previous_status": previous_status,
+            "status": new_status,
+        }, db=db)
+
+
+def enqueue_registration_notification(event_id: str, donor_id: str, db=None):
+    enqueue(SEND_REGISTRATION_NOTIFICATION, {"event_id": event_id, "donor_id": donor_id}, db=db)
+
+
+@job_handler(APPLY_TEST_RESULTS)
+def apply_test_results(payload: Dict[str, Any], cursor):
+    """Add approved units to inventory (or take back units that were approved before)
+    and update the donor's eligibility; the inventory change is published after commit"""
+    cursor.execute(
+        "SELECT donor_id, blood_type, units_collected, donation_date FROM donation_records WHERE id = %s",
+        (payload['record_id'],)
+    )
+    record = cursor.fetchone()
+    if not record:
+        return  # deleted since the job was queued
+
+    if payload['status'] == "approved":
+        cursor.execute(
+            """INSERT INTO blood_inventory (id, blood_type, units_available, expiry_date)
+               VALUES (%s, %s, %s, DATE_ADD(CURRENT_TIMESTAMP, INTERVAL %s DAY))
+               ON DUPLICATE KEY UPDATE units_available = units_available + %s""",
+            (str(uuid.uuid4()), record['blood_type'], record['units_collected'],
+             settings.BLOOD_SHELF_LIFE_DAYS, record['units_collected'])
+        )
+        cursor.execute(
+            "UPDATE donors SET last_donation_date = %s WHERE id = %s",
+            (record['donation_date'], record['donor_id'])
+        )
+    else:
+        if payload['previous_status'] == "approved":
+            cursor.execute(
+                """UPDATE blood_inventory SET units_available = GREATEST(units_available - %s, 0)
+                   WHERE blood_type = %s""",
+                (record['units_collected'], record['blood_type'])
+            )
+        # A failed screening test makes the donor ineligible until reviewed
+        cursor.execute("UPDATE donors SET is_eligible = FALSE WHERE id = %s", (record['donor_id'],))
+
+    cursor.execute("SELECT * FROM blood_inventory WHERE blood_type = %s", (record['blood_type'],))
+    item = cursor.fetchone()
+    if item:
+        return lambda: publish("inventory", {"action": "updated", "item": item})
+
+
+@job_handler(SEND_REGISTRATION_NOTIFICATION)
+def send_registration_notification(payload: Dict[str, Any], cursor):
+    """Confirm an event registration to the donor"""
+    cursor.execute("SELECT name, email FROM donors WHERE id = %s", (payload['donor_id'],))
+    donor = cursor.fetchone()
+    cursor.execute(
+        "SELECT title, date, time, location FROM donation_events WHERE id = %s",
+        (payload['event_id'],)
+    )
+    event = cursor.fetchone()
+    if not donor or not event:
+        return
+
+    # No mail provider is configured yet; the confirmation is logged instead (without the address)
+    logger.info(
+        "Registration confirmation for donor %s: %s on %s %s at %s",
+        payload['donor_id'], event['title'], event['date'], event['time'], event['location']
+    )
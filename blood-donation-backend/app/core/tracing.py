@@ -0,0 +1,341 @@
+import inspect
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, List, Optional
+from fastapi.routing import APIRoute
+from app.core.config import settings
+from app.core.profiling import route_name
+
+# version-trace_id-parent_id-flags (https://www.w3.org/TR/trace-context/)
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(?:-.*)?$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+logger = logging.getLogger(__name__)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Trace:
+    """The spans of one sampled request, exported together when its root span ends"""
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+
+
+class Span:
+    """A timed operation; use as a context manager to make it the parent of spans started inside"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error", "_token")
+
+    def __init__(self, trace: Trace, parent_id: Optional[str], name: str, attributes: Dict[str, Any],
+                 start_ns: int = None):
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self._token = None
+        trace.spans.append(self)
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace.trace_id}-{self.span_id}-01"
+
+    def __enter__(self) -> "Span":
+        self._token = current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns or self.start_ns,
+            "duration_ms": round(((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": "error" if self.error else "ok",
+            **({"error.type": self.error} if self.error else {}),
+        }
+
+
+class _NoSpan:
+    """Stands in for a span when the request isn't sampled, so tracing costs one ContextVar lookup"""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+# Innermost open span of the current (sampled) request
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def span(name: str, **attributes):
+    """Child span of the current span (a no-op unless the request is sampled)"""
+    parent = current_span.get()
+    if parent is None:
+        return NO_SPAN
+    return Span(parent.trace, parent.span_id, name, attributes)
+
+
+def record(name: str, seconds: float, **attributes):
+    """Record a child span that just ended after seconds (for code that already times itself)"""
+    parent = current_span.get()
+    if parent is None:
+        return
+    end_ns = time.time_ns()
+    finished = Span(parent.trace, parent.span_id, name, attributes, start_ns=end_ns - int(seconds * 1e9))
+    finished.end_ns = end_ns
+
+
+def traced(name: str):
+    """Decorator running a (sync or async) function in a span; FastAPI still sees its signature"""
+    def decorate(function):
+        if inspect.iscoroutinefunction(function):
+            @wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                if current_span.get() is None:
+                    return await function(*args, **kwargs)
+                with span(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if current_span.get() is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def traceparent() -> Optional[str]:
+    """traceparent header for an outgoing call made while handling a sampled request"""
+    parent = current_span.get()
+    return parent.traceparent() if parent is not None else None
+
+
+def parse_traceparent(header: Optional[str]):
+    """(trace_id, parent_span_id, sampled) from a traceparent header, or None if it's missing or invalid"""
+    match = _TRACEPARENT.match(header.strip().lower()) if header else None
+    if not match:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == _INVALID_TRACE_ID or parent_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class TraceExporter:
+    """Writes finished traces from a background thread, so requests only pay for a queue append.
+
+    TRACING_EXPORTER "file" appends one JSON span per line to TRACING_FILE
+    (rotated at TRACING_FILE_MAX_BYTES); "collector" POSTs {"spans": [...]} batches to TRACING_COLLECTOR_URL.
+    Traces are dropped (and counted) when the queue is full.
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=1000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._file_logger: Optional[logging.Logger] = None
+        self.dropped = 0
+
+    def export(self, trace: Trace):
+        self._start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            traces = [self._queue.get()]
+            while len(traces) < 100:
+                try:
+                    traces.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            spans = [span.to_dict() for trace in traces for span in trace.spans]
+            try:
+                if settings.TRACING_EXPORTER == "collector":
+                    self._post(spans)
+                else:
+                    self._write(spans)
+            except Exception as e:
+                logger.warning("Trace export failed", exc_info=e)
+
+    def _write(self, spans: List[Dict[str, Any]]):
+        if self._file_logger is None:
+            handler = logging.handlers.RotatingFileHandler(
+                settings.TRACING_FILE,
+                maxBytes=settings.TRACING_FILE_MAX_BYTES,
+                backupCount=settings.TRACING_FILE_BACKUPS,
+                encoding="utf-8"
+            )
+            self._file_logger = logging.getLogger("traces")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.addHandler(handler)
+        self._file_logger.info("\n".join(json.dumps(span, default=str) for span in spans))
+
+    def _post(self, spans: List[Dict[str, Any]]):
+        request = urllib.request.Request(
+            settings.TRACING_COLLECTOR_URL, data=json.dumps({"spans": spans}, default=str).encode(),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            response.read()
+
+
+# Global exporter for this worker process
+trace_exporter = TraceExporter()
+
+
+class TracingMiddleware:
+    """Start a trace for sampled requests and export it when the response is done.
+
+    A request is sampled with probability TRACING_SAMPLE_RATE or, when
+    TRACING_FOLLOW_PARENT is on, when its traceparent header says so. Only
+    turn that on behind a gateway that sets or strips the header, since any
+    client can send it. Sampled responses carry a traceresponse header
+    with the trace id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                incoming = parse_traceparent(value.decode("latin-1"))
+                break
+        if incoming and settings.TRACING_FOLLOW_PARENT:
+            sampled = incoming[2]
+        else:
+            sampled = settings.TRACING_SAMPLE_RATE > 0 and random.random() < settings.TRACING_SAMPLE_RATE
+        if not sampled:
+            return await self.app(scope, receive, send)
+
+        trace = Trace(incoming[0] if incoming else _new_id(128))
+        root = Span(trace, incoming[1] if incoming else None, f"{scope['method']} request", {
+            "http.method": scope["method"], "http.target": scope["path"],
+        })
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                root.set("http.status_code", message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"traceresponse", root.traceparent().encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            with root:
+                await self.app(scope, receive, send_traced)
+        finally:
+            root.name = route_name(scope)
+            root.set("http.route", root.name.split(" ", 1)[1])
+            trace_exporter.export(trace)
+
+
+def traced_middleware(middleware_class):
+    """Subclass of an ASGI middleware class that runs each of its calls in a span"""
+    name = f"middleware {middleware_class.__name__}"
+
+    async def __call__(self, scope, receive, send):
+        if current_span.get() is None:
+            return await middleware_class.__call__(self, scope, receive, send)
+        with span(name):
+            return await middleware_class.__call__(self, scope, receive, send)
+
+    return type(f"Traced{middleware_class.__name__}", (middleware_class,), {"__call__": __call__})
+
+
+class TracedRoute(APIRoute):
+    """APIRoute that traces dependency resolution, the endpoint and response encoding.
+
+    The endpoint runs in an "endpoint" span. The time before it (resolving
+    and running dependencies, reading the body) is recorded as a
+    "dependencies" span, the time after it (response model validation and
+    JSON encoding) as a "response.encode" span.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # include_router builds a new route from the (already wrapped) endpoint
+        if not getattr(endpoint, "_traced", False):
+            endpoint = traced("endpoint")(endpoint)
+            endpoint._traced = True
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        function = f"{self.endpoint.__module__}.{self.endpoint.__qualname__}"
+
+        async def traced_handler(request):
+            if current_span.get() is None:
+                return await handler(request)
+            route = span("route", **{"code.function": function})
+            try:
+                with route:
+                    return await handler(request)
+            finally:
+                endpoint = next((child for child in reversed(route.trace.spans)
+                                 if child.name == "endpoint" and child.parent_id == route.span_id), None)
+                before = Span(route.trace, route.span_id, "dependencies", {}, start_ns=route.start_ns)
+                before.end_ns = endpoint.start_ns if endpoint else route.end_ns
+                if endpoint and endpoint.end_ns:
+                    after = Span(route.trace, route.span_id, "response.encode", {}, start_ns=endpoint.end_ns)
+                    after.end_ns = route.end_ns
+
+        return traced_handler
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Seed the load-test dataset
+Loads the benchmark dataset into the database from .env with the
+synthetic data generator (generate_data.py): donors with their donation
+history, receivers, blood drives and inventory, all on the bench.example
+email domain. Every benchmark account uses the password bench123 and the
+admin is admin@bench.example. Seeding is skipped when the requested
+number of benchmark donors is already there; otherwise the generated
+tables are emptied and reloaded, which is refused when they hold anything
+but benchmark data.
+
+Usage: python benchmarks/dataset.py [--dataset 10k|1m|10m] [--seed 42] [--jobs N]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import db, init_db
+from generate_data import generate
+
+DATASETS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+DOMAIN = "bench.example"
+PASSWORD = "bench123"
+ADMIN_EMAIL = f"admin@{DOMAIN}"
+
+
+def seeded_donors() -> int:
+    return db.execute_query(
+        "SELECT COUNT(*) as count FROM donors WHERE email LIKE %s", (f"%@{DOMAIN}",), primary=True
+    )[0]['count']
+
+
+def other_users() -> int:
+    return db.execute_query(
+        "SELECT COUNT(*) as count FROM users WHERE email NOT LIKE %s", (f"%@{DOMAIN}",), primary=True
+    )[0]['count']
+
+
+def seed(donors: int, seed: int = 42, jobs: int = None) -> dict:
+    """Make sure the benchmark dataset with donors donors is loaded; returns what was loaded"""
+    init_db()
+    existing = seeded_donors()
+    if existing == donors:
+        return {"donors": existing, "loaded": 0}
+    if other_users():
+        raise RuntimeError("The database holds users outside the benchmark dataset; "
+                           "load the benchmark dataset into a separate database")
+
+    generated = generate(donors, seed=seed, domain=DOMAIN, password=PASSWORD, truncate=True, jobs=jobs,
+                         progress=False)
+    return {"donors": donors, "loaded": sum(generated["rows"].values()), "method": generated["method"],
+            "seconds": generated["seconds"], "rows_per_second": generated["rows_per_second"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", choices=DATASETS, default="10k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jobs", type=int, help="generator processes (default: one per CPU)")
+    args = parser.parse_args()
+    print(json.dumps({"dataset": args.dataset, **seed(DATASETS[args.dataset], args.seed, args.jobs)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
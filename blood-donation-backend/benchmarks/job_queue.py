@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark the MySQL job queue
+Measures enqueue throughput (one INSERT per job and multi-row batches) and
+claim + run throughput with several worker threads competing through
+SELECT ... FOR UPDATE SKIP LOCKED. Needs the database from .env; the
+benchmark jobs are removed afterwards.
+
+Usage: python benchmarks/job_queue.py [--jobs 5000] [--batch 100] [--threads 4] [--claim-size 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import db, init_db
+from app.core.jobs import JobQueue, job_handler
+
+BENCHMARK_JOB = "benchmark_noop"
+
+
+@job_handler(BENCHMARK_JOB)
+def noop(payload, cursor):
+    pass
+
+
+def drain(queue, threads, claim_size):
+    """Claim and run jobs from several threads until the queue is empty"""
+    done = [0] * threads
+
+    def worker(index):
+        while True:
+            jobs = queue.claim(f"benchmark:{index}", claim_size)
+            if not jobs:
+                return
+            for job in jobs:
+                queue.run(job)
+            done[index] += len(jobs)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=100, help="jobs per multi-row INSERT")
+    parser.add_argument("--threads", type=int, default=4, help="claiming worker threads")
+    parser.add_argument("--claim-size", type=int, default=10, help="jobs claimed per SKIP LOCKED query")
+    args = parser.parse_args()
+
+    db.primary.pool_size = max(db.primary.pool_size, args.threads + 1)
+    init_db()
+    queue = JobQueue()
+    payload = {"record_id": "00000000-0000-0000-0000-000000000000"}
+    results = {}
+
+    try:
+        start = time.perf_counter()
+        for _ in range(args.jobs):
+            queue.enqueue(BENCHMARK_JOB, payload)
+        results["enqueue_single_per_second"] = round(args.jobs / (time.perf_counter() - start), 1)
+
+        start = time.perf_counter()
+        claimed = drain(queue, args.threads, args.claim_size)
+        results["claim_run_per_second"] = round(claimed / (time.perf_counter() - start), 1)
+
+        start = time.perf_counter()
+        for offset in range(0, args.jobs, args.batch):
+            queue.enqueue_many(BENCHMARK_JOB, [payload] * min(args.batch, args.jobs - offset))
+        results["enqueue_batched_per_second"] = round(args.jobs / (time.perf_counter() - start), 1)
+
+        start = time.perf_counter()
+        claimed = drain(queue, 1, args.claim_size)
+        results["claim_run_single_thread_per_second"] = round(claimed / (time.perf_counter() - start), 1)
+    finally:
+        db.execute_update("DELETE FROM jobs WHERE name = %s", (BENCHMARK_JOB,))
+
+    print(json.dumps({
+        "jobs": args.jobs, "batch": args.batch, "threads": args.threads,
+        "claim_size": args.claim_size, "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Load-test a running server with realistic scenarios
+Each scenario runs for --duration seconds with --concurrency async clients
+against --base-url, after seeding the benchmark dataset (see
+benchmarks/dataset.py) into the database from .env. Results (throughput,
+latency percentiles, status counts) are printed as JSON and written to
+--output; pass --compare with an earlier result file to see the change
+per scenario.
+
+Scenarios:
+  browse_events     list a page of events, then open one
+  register_event    register a donor for an event and unregister again
+  admin_dashboard   admin dashboard statistics
+  login_burst       donor logins (bcrypt verification)
+  donor_import      create donor profiles with new emails
+  donor_export      page through all donors, 500 per request
+
+Start the server with RATE_LIMIT_ENABLED=false, otherwise login and
+import traffic from one IP is throttled.
+
+Usage: python benchmarks/load_test.py [--dataset 10k|1m|10m] [--concurrency 50] [--duration 30]
+                                      [--scenarios browse_events,login_burst] [--output result.json]
+                                      [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dataset import ADMIN_EMAIL, DATASETS, PASSWORD, seed
+
+API = "/api/v1"
+EXPORT_PAGE_SIZE = 500
+IMPORT_DOMAIN = "import.bench.example"
+# Donors sampled for logins (each login_burst request picks one)
+LOGIN_SAMPLE = 1000
+BENCH_EVENT = "Load Test Blood Drive"
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Register an async scenario step: step(context, rng) -> list of response statuses"""
+    def register(step):
+        SCENARIOS[name] = step
+        return step
+    return register
+
+
+class Context:
+    """Shared state for scenario steps: the client, logged-in users and dataset facts"""
+
+    def __init__(self, client: httpx.AsyncClient, donors: int, run_id: str):
+        self.client = client
+        self.donors = donors
+        self.run_id = run_id
+        self.admin_headers = {}
+        self.donor_sessions = []  # (donor_id, headers)
+        self.donor_emails = []
+        self.event_ids = []
+        self.imported = itertools.count()
+        self.export_pages = itertools.count()
+
+
+@scenario("browse_events")
+async def browse_events(context, rng):
+    listing = await context.client.get(f"{API}/events/", params={"skip": rng.randrange(0, 20), "limit": 20})
+    statuses = [listing.status_code]
+    events = listing.json() if listing.status_code == 200 else []
+    if events:
+        detail = await context.client.get(f"{API}/events/{rng.choice(events)['id']}")
+        statuses.append(detail.status_code)
+    return statuses
+
+
+@scenario("register_event")
+async def register_event(context, rng):
+    donor_id, headers = rng.choice(context.donor_sessions)
+    event_id = rng.choice(context.event_ids)
+    body = {"donor_id": donor_id}
+    registered = await context.client.post(f"{API}/events/{event_id}/register", json=body, headers=headers)
+    unregistered = await context.client.request(
+        "DELETE", f"{API}/events/{event_id}/unregister", json=body, headers=headers
+    )
+    return [registered.status_code, unregistered.status_code]
+
+
+@scenario("admin_dashboard")
+async def admin_dashboard(context, rng):
+    response = await context.client.get(f"{API}/dashboard/stats", headers=context.admin_headers)
+    return [response.status_code]
+
+
+@scenario("login_burst")
+async def login_burst(context, rng):
+    response = await context.client.post(f"{API}/auth/login", json={
+        "email": rng.choice(context.donor_emails), "password": PASSWORD
+    })
+    return [response.status_code]
+
+
+@scenario("donor_import")
+async def donor_import(context, rng):
+    index = next(context.imported)
+    response = await context.client.post(f"{API}/donors/", json={
+        "name": f"Imported Donor {index}",
+        "email": f"{context.run_id}-{index}@{IMPORT_DOMAIN}",
+        "phone": f"+1-555-{index % 10000:04d}",
+        "blood_type": rng.choice(["O+", "A+", "B+", "AB+", "O-", "A-", "B-", "AB-"]),
+        "age": rng.randint(18, 65),
+        "weight": rng.randint(50, 110),
+        "address": f"{rng.randint(1, 9999)} Import St"
+    })
+    return [response.status_code]
+
+
+@scenario("donor_export")
+async def donor_export(context, rng):
+    pages = max(1, -(-context.donors // EXPORT_PAGE_SIZE))
+    skip = next(context.export_pages) % pages * EXPORT_PAGE_SIZE
+    response = await context.client.get(
+        f"{API}/donors/", params={"skip": skip, "limit": EXPORT_PAGE_SIZE}, headers=context.admin_headers
+    )
+    return [response.status_code]
+
+
+async def login(client, email):
+    response = await client.post(f"{API}/auth/login", json={"email": email, "password": PASSWORD})
+    if response.status_code == 429:
+        sys.exit("Logins are rate limited; restart the server with RATE_LIMIT_ENABLED=false")
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def prepare(context, sessions, concurrency, seed_value):
+    """Log in the admin and a fixed sample of donors, and pick upcoming events with room for every client"""
+    context.admin_headers = await login(context.client, ADMIN_EMAIL)
+    rng = random.Random(f"{seed_value}:sessions")
+    donors = await context.client.get(
+        f"{API}/donors/", params={"skip": rng.randrange(max(context.donors - LOGIN_SAMPLE, 1)),
+                                 "limit": LOGIN_SAMPLE, "fields": "id,email"},
+        headers=context.admin_headers
+    )
+    donors.raise_for_status()
+    sample = donors.json()
+    context.donor_emails = [donor['email'] for donor in sample]
+    for donor in rng.sample(sample, min(sessions, len(sample))):
+        context.donor_sessions.append((donor['id'], await login(context.client, donor['email'])))
+
+    events = await context.client.get(f"{API}/events/", params={"status": "upcoming", "limit": 1000})
+    events.raise_for_status()
+    session_ids = {donor_id for donor_id, _ in context.donor_sessions}
+    context.event_ids = [
+        event['id'] for event in events.json()
+        if event['capacity'] - len(event['registered_donors']) >= concurrency
+        and not session_ids & set(event['registered_donors'])
+    ]
+    if not context.event_ids:
+        # Generated blood drives are small; add one the clients can't fill
+        created = await context.client.post(f"{API}/events/", headers=context.admin_headers, json={
+            "title": BENCH_EVENT, "description": "Load test event",
+            "date": (datetime.now(timezone.utc) + timedelta(days=30)).isoformat(), "time": "09:00",
+            "location": "Bench Center", "address": "1 Bench Ave", "capacity": 100_000,
+            "organizer": "Bench Blood Bank"
+        })
+        created.raise_for_status()
+        context.event_ids = [created.json()['id']]
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+
+def summarize(latencies, statuses, requests, seconds):
+    ordered = sorted(latency * 1000 for latency in latencies)
+    errors = sum(count for status, count in statuses.items() if not str(status).startswith("2"))
+    return {
+        "operations": len(ordered),
+        "requests": requests,
+        "operations_per_second": round(len(ordered) / seconds, 2),
+        "requests_per_second": round(requests / seconds, 2),
+        "error_rate": round(errors / requests, 4) if requests else 0,
+        "latency_ms": {
+            "mean": round(sum(ordered) / len(ordered), 3) if ordered else None,
+            "p50": percentile(ordered, 0.50),
+            "p90": percentile(ordered, 0.90),
+            "p95": percentile(ordered, 0.95),
+            "p99": percentile(ordered, 0.99),
+            "max": round(ordered[-1], 3) if ordered else None,
+        },
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+async def run_scenario(name, context, concurrency, duration, warmup, seed_value):
+    """Run one scenario with concurrency clients; operations started during warmup aren't counted"""
+    step = SCENARIOS[name]
+    latencies, statuses, requests = [], Counter(), [0]
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def client_loop(index):
+        rng = random.Random(f"{seed_value}:{name}:{index}")
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                codes = await step(context, rng)
+            except httpx.HTTPError as e:
+                codes = [type(e).__name__]
+            if started >= measure_from:
+                latencies.append(time.perf_counter() - started)
+                statuses.update(codes)
+                requests[0] += len(codes)
+
+    await asyncio.gather(*(client_loop(index) for index in range(concurrency)))
+    return summarize(latencies, statuses, requests[0], duration)
+
+
+def compare(baseline, result):
+    """Change in throughput and latency per scenario against an earlier run"""
+    changes = {}
+    for name, after in result["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        change = {}
+        for metric, old, new in [
+            ("operations_per_second", before["operations_per_second"], after["operations_per_second"]),
+            ("p50_ms", before["latency_ms"]["p50"], after["latency_ms"]["p50"]),
+            ("p95_ms", before["latency_ms"]["p95"], after["latency_ms"]["p95"]),
+            ("p99_ms", before["latency_ms"]["p99"], after["latency_ms"]["p99"]),
+        ]:
+            change[metric] = {
+                "before": old, "after": new,
+                "change_pct": round((new - old) / old * 100, 1) if old and new is not None else None,
+            }
+        changes[name] = change
+    return {"baseline": baseline.get("label"), "scenarios": changes}
+
+
+def git_label():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def cleanup_imports():
+    """Remove donors created by donor_import (deleting the user cascades to the profile)"""
+    from app.core.database import db
+    try:
+        db.execute_update("DELETE FROM users WHERE email LIKE %s", (f"%@{IMPORT_DOMAIN}",))
+    except Exception as e:
+        print(f"Could not remove imported donors: {e}", file=sys.stderr)
+
+
+async def run(args):
+    donors = DATASETS[args.dataset]
+    if not args.skip_seed:
+        print(json.dumps({"seeded": seed(donors, args.seed)}), file=sys.stderr)
+
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)}")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        context = Context(client, donors, f"{git_label()}-{int(time.time())}")
+        await prepare(context, min(args.concurrency, 100), args.concurrency, args.seed)
+
+        scenarios = {}
+        for name in names:
+            print(f"Running {name}...", file=sys.stderr)
+            scenarios[name] = await run_scenario(
+                name, context, args.concurrency, args.duration, args.warmup, args.seed
+            )
+
+    if "donor_import" in names:
+        cleanup_imports()
+
+    return {
+        "label": args.label or git_label(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "base_url": args.base_url,
+        "dataset": args.dataset,
+        "donors": donors,
+        "seed": args.seed,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--dataset", choices=DATASETS, default="10k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="the dataset is already loaded")
+    parser.add_argument("--scenarios", help="comma-separated subset (default: all)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before each scenario")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--label", help="name of this run (default: current git commit)")
+    parser.add_argument("--output", help="write the result JSON here")
+    parser.add_argument("--compare", help="earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as baseline:
+            result["comparison"] = compare(json.load(baseline), result)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
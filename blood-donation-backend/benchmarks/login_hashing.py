@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark login password verification throughput
+Compares bcrypt verification on the request threadpool (before) with the
+dedicated password hashing process pool (after), and measures how long a
+cheap request would wait while the login burst is running.
+
+Usage: python benchmarks/login_hashing.py [--rounds 12] [--threads 40] [--seconds 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_burst(verify, hashed, threads, seconds):
+    """Call verify from many threads for a fixed time; return (calls, probe latencies)"""
+    stop = time.monotonic() + seconds
+    calls = [0] * threads
+    probe_latencies = []
+
+    def worker(index):
+        while time.monotonic() < stop:
+            verify("donor123", hashed)
+            calls[index] += 1
+
+    def probe():
+        # Stands in for a cheap endpoint competing with the login burst
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            json.dumps({"status": "healthy", "items": list(range(100))})
+            time.sleep(0.01)
+            probe_latencies.append(time.perf_counter() - start - 0.01)
+
+    probe_thread = threading.Thread(target=probe)
+    probe_thread.start()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, range(threads)))
+    probe_thread.join()
+    return sum(calls), probe_latencies
+
+
+def summarize(name, calls, seconds, cores, probe_latencies):
+    probe_ms = sorted(latency * 1000 for latency in probe_latencies)
+    return {
+        "mode": name,
+        "logins_per_second": round(calls / seconds, 2),
+        "logins_per_second_per_core": round(calls / seconds / cores, 2),
+        "cores": cores,
+        "probe_p50_ms": round(statistics.median(probe_ms), 3) if probe_ms else None,
+        "probe_p99_ms": round(probe_ms[int(len(probe_ms) * 0.99) - 1], 3) if probe_ms else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--threads", type=int, default=40, help="concurrent login requests (threadpool size)")
+    parser.add_argument("--workers", type=int, default=0, help="hashing processes (0 = one per CPU)")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each run")
+    args = parser.parse_args()
+
+    # Settings are read at import time, and the spawned hashing workers inherit the environment
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ["PASSWORD_HASH_MAX_PENDING"] = str(args.threads)
+
+    from app.core import security
+    from app.core.password_hashing import password_hasher
+
+    hashed = security.get_password_hash("donor123")
+    cpus = os.cpu_count() or 1
+
+    calls, probes = run_burst(security.verify_password, hashed, args.threads, args.seconds)
+    before = summarize("threadpool", calls, args.seconds, min(args.threads, cpus), probes)
+
+    password_hasher.verify("donor123", hashed)  # start the worker processes
+    calls, probes = run_burst(password_hasher.verify, hashed, args.threads, args.seconds)
+    after = summarize("process_pool", calls, args.seconds, password_hasher.workers, probes)
+    password_hasher.shutdown()
+
+    print(json.dumps({"rounds": args.rounds, "threads": args.threads, "results": [before, after]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark the data-access and serialization hot paths
+Runs each path on fixed inputs against an in-memory stand-in for
+pymysql.connect (no MySQL server needed), so the numbers are the Python
+overhead of a request, not the database:
+
+  sql.get_records            DynamicDBOperations.get_records: filter/ORDER BY SQL building, 50 rows back
+  sql.update_record          DynamicDBOperations.update_record: SET clause building plus the read back
+  sql.create_record          DynamicDBOperations.create_record: INSERT building plus the read back
+  records.test_results       GET /donation-records/ handler: per-row test_results dicts, 100 rows
+  events.registered_donors   GET /events/ handler: json.loads of registered_donors, 100 events
+  pydantic.donors            response_model validation and JSON serialization, 100 donors
+  pydantic.donation_records  the same for 100 donation records
+  pydantic.events            the same for 100 events
+
+Each benchmark is timed --samples times, relative to a fixed reference
+workload timed alongside it. --save-baseline stores the samples; later
+runs compare against them with a one-sided Mann-Whitney U test and exit
+with status 1 when a benchmark is slower with p < --alpha and its median
+is more than --threshold slower. The reference cancels out most of the
+machine's speed, but save the baseline on the kind of machine (or CI
+runner) that runs the check.
+
+Usage: python benchmarks/microbench.py [--samples 20] [--filter sql.] [--save-baseline]
+                                       [--baseline benchmarks/microbench_baseline.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import re
+import statistics
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+from pydantic import TypeAdapter
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbench_baseline.json")
+# Time per sample; the number of calls per sample is calibrated to it
+SAMPLE_SECONDS = 0.01
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark factory: factory() -> zero-argument callable to time"""
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+def _id(kind: str, index: int) -> str:
+    return f"00000000-{kind}-4000-8000-{index:012d}"
+
+
+CREATED_AT = datetime(2024, 1, 15, 9, 30)
+
+
+def _donor(index: int) -> dict:
+    return {
+        "id": _id("0001", index), "user_id": _id("0002", index), "name": f"Donor {index}",
+        "email": f"donor{index}@example.com", "phone": "+1-555-0100", "blood_type": "O+", "age": 35,
+        "weight": 70, "address": f"{index} Main St", "medical_history": None, "donation_units": 1,
+        "last_donation_date": CREATED_AT - timedelta(days=90), "is_eligible": 1,
+        "created_at": CREATED_AT, "updated_at": None,
+    }
+
+
+def _record(index: int) -> dict:
+    return {
+        "id": _id("0003", index), "donor_id": _id("0001", index), "event_id": None,
+        "donation_date": CREATED_AT, "blood_type": "A+", "units_collected": 1, "hiv_test": 1,
+        "hepatitis_b_test": 1, "hepatitis_c_test": 1, "syphilis_test": 1, "status": "approved",
+        "notes": None, "created_at": CREATED_AT, "updated_at": None,
+    }
+
+
+def _event(index: int) -> dict:
+    return {
+        "id": _id("0004", index), "title": f"Blood Drive {index}", "description": "Community blood drive",
+        "date": CREATED_AT + timedelta(days=30), "time": "09:00", "location": "Community Center",
+        "address": "1 Main St", "capacity": 100,
+        "registered_donors": json.dumps([_id("0001", donor) for donor in range(50)]),
+        "organizer": "City Blood Bank", "status": "upcoming", "created_at": CREATED_AT, "updated_at": None,
+    }
+
+
+# Rows the stand-in server returns per table (before LIMIT)
+TABLE_ROWS = {
+    "donors": [_donor(index) for index in range(100)],
+    "donation_records": [_record(index) for index in range(100)],
+    "donation_events": [_event(index) for index in range(100)],
+}
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+
+class FakeCursor:
+    """DictCursor stand-in answering from TABLE_ROWS"""
+
+    def __init__(self):
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params=None):
+        if not query.lstrip().upper().startswith("SELECT"):
+            self.rows, self.rowcount = [], 1
+            return 1
+        table = _TABLE.search(query)
+        rows = TABLE_ROWS.get(table.group(1), []) if table else []
+        if "WHERE id = %s" in query:
+            rows = rows[:1]
+        elif "LIMIT" in query.upper() and params:
+            rows = rows[:params[-2]]
+        # Callers modify the dicts they get back, like pymysql's fresh ones
+        self.rows = [dict(row) for row in rows]
+        self.rowcount = len(self.rows)
+        return self.rowcount
+
+    def executemany(self, query, params):
+        self.rows, self.rowcount = [], len(params)
+        return self.rowcount
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeConnection:
+    open = True
+
+    def cursor(self):
+        return FakeCursor()
+
+    def ping(self, reconnect=False):
+        pass
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def fake_database():
+    """A Database (pool, routing, statement hooks and all) whose connections are FakeConnections"""
+    from app.core import database
+    pymysql.connect = lambda **kwargs: FakeConnection()
+    database.settings.DB_REPLICA_HOSTS = []
+    return database.Database(pool_size=1)
+
+
+@benchmark("sql.get_records")
+def bench_get_records():
+    from app.core.db_operations import DynamicDBOperations
+    ops = DynamicDBOperations(fake_database())
+    filters = {"blood_type": "O+", "is_eligible": True, "age": {"gte": 18, "lte": 65},
+               "$or": [{"name": {"prefix": "Don"}}, {"email": {"prefix": "don"}}]}
+    order = [("created_at", "DESC"), ("id", "ASC")]
+    return lambda: ops.get_records("donors", filters, limit=50, offset=0, order_by=order)
+
+
+@benchmark("sql.update_record")
+def bench_update_record():
+    from app.core.db_operations import DynamicDBOperations
+    ops = DynamicDBOperations(fake_database())
+    data = {"name": "Donor 1", "phone": "+1-555-0101", "age": 36, "weight": 72, "address": "2 Main St",
+            "medical_history": None, "id": _id("0001", 1)}
+    return lambda: ops.update_record("donors", _id("0001", 1), data)
+
+
+@benchmark("sql.create_record")
+def bench_create_record():
+    from app.core.db_operations import DynamicDBOperations
+    ops = DynamicDBOperations(fake_database())
+    data = {key: value for key, value in _record(0).items() if key not in ("created_at", "updated_at")}
+    return lambda: ops.create_record("donation_records", dict(data))
+
+
+@benchmark("records.test_results")
+def bench_test_results():
+    from app.api.v1.donation_records import get_donation_records
+    db = fake_database()
+    return lambda: get_donation_records(skip=0, limit=100, donor_id=None, fields=None, db=db)
+
+
+@benchmark("events.registered_donors")
+def bench_registered_donors():
+    from app.api.v1.events import get_events
+    db = fake_database()
+    return lambda: get_events(skip=0, limit=100, status=None, fields=None, db=db)
+
+
+def _response_model(schema, rows):
+    """What FastAPI does with a response_model: validate, then serialize to JSON-compatible data"""
+    adapter = TypeAdapter(List[schema])
+    return lambda: adapter.dump_python(adapter.validate_python(rows), mode="json")
+
+
+@benchmark("pydantic.donors")
+def bench_pydantic_donors():
+    from app.schemas.donor import Donor
+    return _response_model(Donor, TABLE_ROWS["donors"])
+
+
+@benchmark("pydantic.donation_records")
+def bench_pydantic_records():
+    from app.api.v1.donation_records import get_donation_records
+    from app.schemas.donation_record import DonationRecord
+    rows = get_donation_records(skip=0, limit=100, donor_id=None, fields=None, db=fake_database())
+    return _response_model(DonationRecord, rows)
+
+
+@benchmark("pydantic.events")
+def bench_pydantic_events():
+    from app.api.v1.events import get_events
+    from app.schemas.donation_event import DonationEvent
+    rows = get_events(skip=0, limit=100, status=None, fields=None, db=fake_database())
+    return _response_model(DonationEvent, rows)
+
+
+def reference():
+    """Fixed pure-Python workload timed next to every sample; the stand-in for machine speed"""
+    rows = [{"id": index, "name": "x" * (index % 7), "value": index * 2} for index in range(50)]
+    return [row["name"] + str(row["value"]) for row in rows if row["id"] % 3]
+
+
+def calibrate(timer: timeit.Timer) -> int:
+    calls, seconds = timer.autorange()
+    return max(1, int(calls / seconds * SAMPLE_SECONDS))
+
+
+def measure(functions: dict, samples: int, numbers: dict) -> dict:
+    """Time every function samples times, in interleaved rounds.
+
+    Each sample is number calls (calibrated unless given in numbers) and is
+    divided by a reference() sample taken right before it, so a machine
+    that is busier or clocked lower during part of the run (or the whole of
+    it) shifts both alike. Comparisons use these relative samples.
+    """
+    reference_timer = timeit.Timer(reference)
+    reference_number = calibrate(reference_timer)
+    timers = {name: timeit.Timer(fn) for name, fn in functions.items()}
+    numbers = {name: numbers.get(name) or calibrate(timer) for name, timer in timers.items()}
+    raw = {name: [] for name in timers}
+    relative = {name: [] for name in timers}
+    for name, timer in timers.items():
+        timer.timeit(numbers[name])  # warm up caches (lru_cache'd SQL, pydantic validators)
+    for _ in range(samples):
+        for name, timer in timers.items():
+            baseline_call = reference_timer.timeit(reference_number) / reference_number
+            call = timer.timeit(numbers[name]) / numbers[name]
+            raw[name].append(call * 1e6)
+            relative[name].append(round(call / baseline_call, 5))
+    return {
+        name: {
+            "number": numbers[name],
+            "median_us": round(statistics.median(raw[name]), 3),
+            "median_relative": round(statistics.median(relative[name]), 4),
+            "samples": relative[name],
+        }
+        for name in timers
+    }
+
+
+def mann_whitney_greater(current: list, baseline: list) -> float:
+    """One-sided p-value that current tends to be larger than baseline (normal approximation, ties corrected)"""
+    combined = sorted([(value, 0) for value in current] + [(value, 1) for value in baseline])
+    n1, n2, n = len(current), len(baseline), len(current) + len(baseline)
+    rank_sum, ties, position = 0.0, 0.0, 0
+    while position < n:
+        end = position
+        while end + 1 < n and combined[end + 1][0] == combined[position][0]:
+            end += 1
+        average_rank = (position + end) / 2 + 1
+        rank_sum += average_rank * sum(1 for _, group in combined[position:end + 1] if group == 0)
+        tied = end - position + 1
+        ties += tied ** 3 - tied
+        position = end + 1
+    u = rank_sum - n1 * (n1 + 1) / 2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+    if sigma == 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / sigma
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(result: dict, baseline: dict, alpha: float, threshold: float) -> dict:
+    """Verdict per benchmark: regression, improvement or unchanged"""
+    verdicts = {}
+    for name, current in result["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if not before:
+            verdicts[name] = {"verdict": "new"}
+            continue
+        change = current["median_relative"] / before["median_relative"] - 1
+        slower = mann_whitney_greater(current["samples"], before["samples"])
+        faster = mann_whitney_greater(before["samples"], current["samples"])
+        if slower < alpha and change > threshold:
+            verdict = "regression"
+        elif faster < alpha and change < -threshold:
+            verdict = "improvement"
+        else:
+            verdict = "unchanged"
+        verdicts[name] = {
+            "verdict": verdict, "baseline_median_us": before["median_us"], "median_us": current["median_us"],
+            "change_pct": round(change * 100, 1), "p_slower": round(slower, 6),
+        }
+    return verdicts
+
+
+def machine() -> dict:
+    """What decides how comparable two runs are (the kernel or core count hardly matters here)"""
+    return {"python": f"{platform.python_implementation()} {platform.python_version()}",
+            "processor": platform.processor() or platform.machine()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=20, help="timings per benchmark")
+    parser.add_argument("--filter", default="", help="only benchmarks whose name starts with this")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--alpha", type=float, default=0.01, help="significance level of the regression test")
+    parser.add_argument("--threshold", type=float, default=0.1, help="smallest median slowdown that fails")
+    args = parser.parse_args()
+
+    # The stand-in statements are never slow; keep the slow query log out of the timings
+    from app.core.config import settings
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("machine") != machine():
+            print("Baseline was recorded on a different machine; re-record it with --save-baseline "
+                  "if the comparison looks off", file=sys.stderr)
+
+    functions = {name: factory() for name, factory in BENCHMARKS.items() if name.startswith(args.filter)}
+    # Time the same number of calls per sample as the baseline, so both see the same warm-up effects
+    numbers = {name: value["number"] for name, value in baseline["benchmarks"].items()} if baseline else {}
+    result = {"machine": machine(), "benchmarks": measure(functions, args.samples, numbers)}
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(result, baseline_file, indent=2)
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+
+    summary = {name: {key: value[key] for key in ("median_us", "median_relative", "number")}
+               for name, value in result["benchmarks"].items()}
+    if baseline is None:
+        print(json.dumps({"benchmarks": summary}, indent=2))
+        return
+
+    verdicts = compare(result, baseline, args.alpha, args.threshold)
+    print(json.dumps({"benchmarks": summary, "comparison": verdicts}, indent=2))
+    regressions = [name for name, verdict in verdicts.items() if verdict["verdict"] == "regression"]
+    if regressions:
+        sys.exit(f"Regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for Blood Donation System
+Generates realistic, referentially consistent users, donors, blood
+receivers, donation events, donation records and blood inventory, and
+bulk-loads them with LOAD DATA LOCAL INFILE (falling back to multi-row
+INSERTs when the server doesn't allow local infile). Chunks of 50k donors
+or receivers are generated by --jobs worker processes while the main
+process loads finished chunks; each process generates about 50k rows/s,
+so loading is usually bound by the database at a few worker processes.
+
+- Blood types follow population frequencies (O+ 37%, A+ 36%, ... AB- 0.6%)
+- Donors are regular, occasional or one-off donors; their donations are
+  spread over --years with a summer and holiday dip, at least 56 days
+  apart, and about a third happen at a blood drive
+- Eligibility, last donation dates and inventory levels follow from the
+  generated donations
+- Every account uses --password (hashed once, there is no per-row bcrypt)
+
+The same --seed and --as-of always produce the same rows.
+
+Usage: python generate_data.py --donors 1000000 [--receivers N] [--events N] [--seed 42]
+                               [--years 3] [--as-of 2024-06-01] [--email-domain example.com]
+                               [--method load-data|insert] [--truncate] [--dir DIR] [--jobs N]
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pymysql
+from app.core.config import settings
+from app.core.database import init_db
+
+# US population frequencies, in percent
+BLOOD_TYPES = ["O+", "A+", "B+", "AB+", "O-", "A-", "B-", "AB-"]
+BLOOD_TYPE_WEIGHTS = [37.4, 35.7, 8.5, 3.4, 6.6, 6.3, 1.5, 0.6]
+BLOOD_TYPE_CUM_WEIGHTS = list(itertools.accumulate(BLOOD_TYPE_WEIGHTS))
+
+# Donor profiles: (share of donors, donations per year)
+DONOR_PROFILES = [(0.2, 3.0), (0.45, 0.8), (0.35, 0.0)]
+MIN_DONATION_INTERVAL = timedelta(days=56)
+# Relative donation volume per month (fewer donations over summer and the holidays)
+MONTH_WEIGHTS = [0.95, 1.0, 1.0, 1.0, 0.95, 0.85, 0.75, 0.75, 0.9, 1.0, 0.95, 0.8]
+EVENT_DONATION_SHARE = 0.35
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Karen",
+    "Daniel", "Lisa", "Matthew", "Nancy", "Anthony", "Sandra", "Mark", "Ashley", "Priya", "Emily",
+    "Wei", "Fatima", "Luis", "Aisha", "Kenji", "Olga", "Ahmed", "Maria", "Juan", "Mei",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Clark", "Lewis", "Patel", "Nguyen", "Kim",
+    "Chen", "Singh", "Khan", "Ali", "Tanaka", "Ivanova", "Silva", "Cohen", "Walker", "Young",
+]
+STREETS = ["Main St", "Oak Ave", "Maple Dr", "Cedar Ln", "Pine St", "Elm St", "Washington Ave", "Lake Rd", "Hill St", "Park Blvd"]
+CITIES = ["Springfield", "Riverside", "Franklin", "Greenville", "Fairview", "Madison", "Georgetown", "Clinton", "Salem", "Bristol"]
+MEDICAL_HISTORY = ["Seasonal allergies", "Controlled hypertension", "Asthma (mild)", "Previous surgery (appendectomy)", "Iron supplements"]
+HOSPITALS = ["City General Hospital", "St. Mary's Medical Center", "Riverside Community Hospital", "University Hospital", "Mercy Health Center", "Children's Hospital"]
+CONDITIONS = ["Surgery preparation", "Anemia", "Trauma", "Cancer treatment", "Childbirth complications", "Sickle cell disease", "Kidney dialysis"]
+URGENCY_LEVELS = ["low", "medium", "high", "critical"]
+URGENCY_WEIGHTS = [30, 40, 20, 10]
+VENUES = ["Community Center", "Public Library", "High School Gym", "City Hall", "University Campus", "Shopping Mall", "Church Hall", "Fire Station"]
+ORGANIZERS = ["City Blood Bank", "Red Cross Chapter", "Rotary Club", "University Health Services", "Regional Blood Center"]
+
+CHUNK = 50_000
+INSERT_BATCH = 1000
+
+USER_COLUMNS = ["id", "email", "password", "role", "created_at"]
+DONOR_COLUMNS = ["id", "user_id", "name", "email", "phone", "blood_type", "age", "weight", "address",
+                 "medical_history", "donation_units", "last_donation_date", "is_eligible", "created_at"]
+RECEIVER_COLUMNS = ["id", "user_id", "name", "email", "phone", "blood_type", "address", "emergency_contact",
+                    "medical_conditions", "urgency_level", "units_needed", "hospital_name", "doctor_name",
+                    "medical_condition", "request_date", "status", "created_at"]
+EVENT_COLUMNS = ["id", "title", "description", "date", "time", "location", "address", "capacity",
+                 "registered_donors", "organizer", "status", "created_at"]
+RECORD_COLUMNS = ["id", "donor_id", "event_id", "donation_date", "blood_type", "units_collected", "hiv_test",
+                  "hepatitis_b_test", "hepatitis_c_test", "syphilis_test", "status", "notes", "created_at"]
+INVENTORY_COLUMNS = ["id", "blood_type", "units_available", "expiry_date"]
+
+GENERATED_TABLES = ["donation_records", "donation_events", "blood_receivers", "donors", "blood_inventory", "sessions", "users"]
+
+
+# Id prefix per kind of row, see Generator.id
+ID_KINDS = {"admin": 1, "event": 2, "donor-user": 3, "donor": 4, "record": 5, "receiver-user": 6, "receiver": 7, "inventory": 8}
+# Donation records per donor that get distinct ids (56 days apart, that's over 15 years of history)
+MAX_DONATIONS = 100
+
+
+class Random(random.Random):
+    """random.Random with float-based integer sampling: slightly less uniform, several times faster"""
+
+    def randint(self, a: int, b: int) -> int:
+        return a + int(self.random() * (b - a + 1))
+
+    def randrange(self, start: int, stop: int = None, step: int = 1) -> int:
+        if stop is None:
+            start, stop = 0, start
+        return start + step * int(self.random() * ((stop - start + step - 1) // step))
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+
+class Generator:
+    """Deterministic row generator; every chunk has its own random stream"""
+
+    def __init__(self, seed: int, as_of: datetime, years: float, domain: str, password_hash: str):
+        self.seed = seed
+        self.as_of = as_of
+        self.start = as_of - timedelta(days=365 * years)
+        self.domain = domain
+        self.password_hash = password_hash
+        self.completed_events = []  # sorted (date, event_id)
+
+    def id(self, kind: str, index: int) -> str:
+        """UUID-formatted id of the index-th row of a kind, so rows can reference each other.
+
+        Ids increase with the index, so bulk loads append to the primary key
+        instead of splitting pages all over it.
+        """
+        return f"{self.seed & 0xffffffff:08x}-{ID_KINDS[kind]:04x}-4000-8000-{index:012x}"
+
+    def rng(self, kind: str, chunk: int) -> Random:
+        return Random(f"{self.seed}:{kind}:{chunk}")
+
+    def moment(self, rng: random.Random, start: datetime, end: datetime) -> datetime:
+        """Random daytime moment between start and end, thinned by month to follow seasonality"""
+        span = max((end - start).total_seconds(), 1)
+        while True:
+            moment = start + timedelta(seconds=rng.random() * span)
+            if rng.random() < MONTH_WEIGHTS[moment.month - 1]:
+                return moment.replace(hour=rng.randint(8, 18), minute=rng.randrange(0, 60, 5), second=0, microsecond=0)
+
+    def person(self, rng: random.Random, kind: str, index: int):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        email = f"{first}.{last}.{kind[0]}{index}@{self.domain}".lower()
+        phone = f"+1-{rng.randint(201, 989)}-{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}"
+        address = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}"
+        return f"{first} {last}", email, phone, address
+
+    def admins(self, count: int):
+        for index in range(count):
+            email = f"admin@{self.domain}" if index == 0 else f"admin{index}@{self.domain}"
+            yield "users", (self.id("admin", index), email, self.password_hash, "admin", self.start)
+
+    def events(self, count: int, donors: int):
+        """Blood drives from the start of the window to 90 days ahead"""
+        rng = self.rng("events", 0)
+        completed = []
+        for index in range(count):
+            event_id = self.id("event", index)
+            when = self.moment(rng, self.start, self.as_of + timedelta(days=90)).replace(hour=rng.choice([8, 9, 10, 12]), minute=0)
+            if when < self.as_of - timedelta(days=1):
+                status = "cancelled" if rng.random() < 0.05 else "completed"
+            elif when < self.as_of + timedelta(days=1):
+                status = "ongoing"
+            else:
+                status = "upcoming"
+            capacity = rng.choice([25, 50, 75, 100, 150, 200])
+            filled = int(capacity * (rng.uniform(0.6, 1.0) if status == "completed" else rng.uniform(0.0, 0.7)))
+            registered = [self.id("donor", rng.randrange(donors)) for _ in range(filled)] if donors else []
+            venue, city = rng.choice(VENUES), rng.choice(CITIES)
+            if status == "completed":
+                completed.append((when, event_id))
+            yield "donation_events", (
+                event_id, f"{city} Blood Drive", f"Blood drive at the {city} {venue}. Walk-ins welcome.",
+                when, when.strftime("%H:%M"), f"{city} {venue}", f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {city}",
+                capacity, json.dumps(sorted(set(registered))), rng.choice(ORGANIZERS), status,
+                when - timedelta(days=rng.randint(14, 60))
+            )
+        completed.sort()
+        self.completed_events = completed
+
+    def nearest_event(self, moment: datetime, not_before: datetime = None):
+        """Completed blood drive closest to a moment (and not before not_before), or None"""
+        first = bisect.bisect_left(self.completed_events, (not_before, "")) if not_before else 0
+        position = max(bisect.bisect_left(self.completed_events, (moment, "")), first)
+        candidates = self.completed_events[max(position - 1, first):position + 1]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda event: abs(event[0] - moment))
+
+    def donations(self, rng: random.Random, joined: datetime, per_year: float):
+        """(moment, event_id) donations from joining until as_of, at least MIN_DONATION_INTERVAL apart
+
+        A share of them are moved to a blood drive within 30 days, when there
+        is one that keeps MIN_DONATION_INTERVAL from the previous donation.
+        """
+        if not per_year:
+            return []
+        donations = []
+        mean_gap = timedelta(days=365 / per_year)
+        moment = joined + timedelta(days=rng.expovariate(1.0) * mean_gap.days / 2)
+        while moment < self.as_of:
+            if rng.random() < MONTH_WEIGHTS[moment.month - 1]:
+                earliest = donations[-1][0] + MIN_DONATION_INTERVAL if donations else None
+                donation = moment.replace(hour=rng.randint(8, 18), minute=rng.randrange(0, 60, 5), second=0, microsecond=0)
+                if earliest and donation < earliest:
+                    donation += timedelta(days=1)
+                event_id = None
+                if rng.random() < EVENT_DONATION_SHARE:
+                    event = self.nearest_event(donation, earliest)
+                    if event and abs(event[0] - donation) < timedelta(days=30):
+                        at_event = event[0] + timedelta(minutes=rng.randrange(0, 360, 5))
+                        if at_event < self.as_of:
+                            donation, event_id = at_event, event[1]
+                donations.append((donation, event_id))
+                moment = donation + max(MIN_DONATION_INTERVAL, timedelta(days=rng.expovariate(1.0) * mean_gap.days))
+            else:
+                moment += timedelta(days=rng.randint(7, 30))
+        return donations
+
+    def donor_chunk(self, chunk: int, start: int, end: int, stock: dict):
+        """Users, donors and their donation records for donor indexes [start, end)
+
+        Adds approved units still within shelf life to stock (per blood type).
+        """
+        rng = self.rng("donors", chunk)
+        shelf_life_start = self.as_of - timedelta(days=settings.BLOOD_SHELF_LIFE_DAYS)
+        profile_weights = list(itertools.accumulate(share for share, _ in DONOR_PROFILES))
+        for index in range(start, end):
+            user_id, donor_id = self.id("donor-user", index), self.id("donor", index)
+            name, email, phone, address = self.person(rng, "donor", index)
+            blood_type = rng.choices(BLOOD_TYPES, cum_weights=BLOOD_TYPE_CUM_WEIGHTS)[0]
+            joined = self.moment(rng, self.start, self.as_of)
+            yield "users", (user_id, email, self.password_hash, "donor", joined)
+
+            per_year = rng.choices(DONOR_PROFILES, cum_weights=profile_weights)[0][1]
+            last_donation, last_status = None, None
+            for number, (moment, event_id) in enumerate(self.donations(rng, joined, per_year)[:MAX_DONATIONS]):
+                age = self.as_of - moment
+                if age < timedelta(days=2):
+                    status, tests = "collected", (False, False, False, False)
+                elif age < timedelta(days=7) and rng.random() < 0.5:
+                    status, tests = "tested", (True, True, True, True)
+                elif rng.random() < 0.04:
+                    failed = rng.randrange(4)
+                    status, tests = "rejected", tuple(position != failed for position in range(4))
+                else:
+                    status, tests = "approved", (True, True, True, True)
+                units = 2 if rng.random() < 0.05 else 1
+                if status == "approved" and moment >= shelf_life_start:
+                    stock[blood_type] += units
+                last_donation, last_status = moment, status
+                yield "donation_records", (
+                    self.id("record", index * MAX_DONATIONS + number), donor_id, event_id, moment, blood_type, units,
+                    *tests, status, "Deferred: positive screening test" if status == "rejected" else None, moment
+                )
+
+            eligible = last_status != "rejected" and (
+                last_donation is None or self.as_of - last_donation >= MIN_DONATION_INTERVAL
+            )
+            yield "donors", (
+                donor_id, user_id, name, email, phone, blood_type, rng.randint(18, 65), rng.randint(50, 110), address,
+                rng.choice(MEDICAL_HISTORY) if rng.random() < 0.2 else None, 1, last_donation, eligible, joined
+            )
+
+    def receiver_chunk(self, chunk: int, start: int, end: int, stock: dict):
+        """Users and blood receivers for receiver indexes [start, end); takes fulfilled units out of stock"""
+        rng = self.rng("receivers", chunk)
+        shelf_life_start = self.as_of - timedelta(days=settings.BLOOD_SHELF_LIFE_DAYS)
+        for index in range(start, end):
+            user_id = self.id("receiver-user", index)
+            name, email, phone, address = self.person(rng, "receiver", index)
+            blood_type = rng.choices(BLOOD_TYPES, cum_weights=BLOOD_TYPE_CUM_WEIGHTS)[0]
+            # Requests cluster in the recent past
+            requested = self.as_of - timedelta(days=min(rng.expovariate(1 / 120), (self.as_of - self.start).days))
+            requested = requested.replace(microsecond=0)
+            if self.as_of - requested > timedelta(days=30):
+                status = rng.choices(["fulfilled", "cancelled", "pending"], [80, 10, 10])[0]
+            else:
+                status = rng.choices(["pending", "fulfilled", "cancelled"], [70, 25, 5])[0]
+            units = rng.choices([1, 2, 3, 4, 6], [35, 30, 15, 12, 8])[0]
+            if status == "fulfilled" and requested >= shelf_life_start:
+                stock[blood_type] -= units
+            condition = rng.choice(CONDITIONS)
+            yield "users", (user_id, email, self.password_hash, "recv", requested)
+            yield "blood_receivers", (
+                self.id("receiver", index), user_id, name, email, phone, blood_type, address,
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {phone[:-4]}{rng.randint(0, 9999):04d}",
+                condition, rng.choices(URGENCY_LEVELS, URGENCY_WEIGHTS)[0], units, rng.choice(HOSPITALS),
+                f"Dr. {rng.choice(LAST_NAMES)}", condition, requested, status, requested
+            )
+
+    def inventory(self, stock: dict):
+        rng = self.rng("inventory", 0)
+        for blood_type in BLOOD_TYPES:
+            yield "blood_inventory", (
+                self.id("inventory", BLOOD_TYPES.index(blood_type)), blood_type, max(stock[blood_type], 0),
+                self.as_of + timedelta(days=rng.randint(7, settings.BLOOD_SHELF_LIFE_DAYS))
+            )
+
+
+TABLE_COLUMNS = {
+    "users": USER_COLUMNS,
+    "donors": DONOR_COLUMNS,
+    "blood_receivers": RECEIVER_COLUMNS,
+    "donation_events": EVENT_COLUMNS,
+    "donation_records": RECORD_COLUMNS,
+    "blood_inventory": INVENTORY_COLUMNS,
+}
+
+
+def _tsv_value(value) -> str:
+    kind = type(value)
+    if kind is str:
+        if "\\" in value or "\t" in value or "\n" in value:
+            return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+        return value
+    if value is None:
+        return "\\N"
+    if kind is bool:
+        return "1" if value else "0"
+    # str() of a datetime is its ISO format with a space, which MySQL reads as DATETIME
+    return str(value)
+
+
+def _tsv(rows) -> str:
+    return "".join("\t".join(map(_tsv_value, row)) + "\n" for row in rows)
+
+
+def group_by_table(rows) -> dict:
+    """(table, row) pairs -> {table: [row, ...]}"""
+    by_table = {}
+    for table, row in rows:
+        by_table.setdefault(table, []).append(row)
+    return by_table
+
+
+# Generator of the worker process (set by _init_worker)
+_worker_generator = None
+
+
+def _init_worker(generator: Generator):
+    global _worker_generator
+    _worker_generator = generator
+
+
+def _generate_chunk(task) -> tuple:
+    """Rows of one donor or receiver chunk, as TSV text per table when serialize, and its stock changes"""
+    kind, chunk, start, end, serialize = task
+    stock = dict.fromkeys(BLOOD_TYPES, 0)
+    chunk_rows = _worker_generator.donor_chunk if kind == "donors" else _worker_generator.receiver_chunk
+    by_table = group_by_table(chunk_rows(chunk, start, end, stock))
+    if serialize:
+        by_table = {table: _tsv(rows) for table, rows in by_table.items()}
+    return by_table, stock
+
+
+class Loader:
+    """Bulk-loads generated rows table by table, one transaction per chunk"""
+
+    def __init__(self, method: str = "load-data", directory: str = None):
+        self.method = method
+        self.directory = directory
+        self.rows = dict.fromkeys(TABLE_COLUMNS, 0)
+        self.connection = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            return
+        self.connection = pymysql.connect(
+            host=settings.DB_HOST,
+            port=settings.DB_PORT,
+            user=settings.DB_USER,
+            password=settings.DB_PASSWORD,
+            database=settings.DB_NAME,
+            charset='utf8mb4',
+            local_infile=True,
+            autocommit=False
+        )
+        with self.connection.cursor() as cursor:
+            # Rows are generated consistent; skip per-row constraint checks while loading
+            cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+            if method == "load-data":
+                cursor.execute("SELECT @@GLOBAL.local_infile")
+                if not cursor.fetchone()[0]:
+                    print("LOAD DATA LOCAL INFILE is disabled on the server (local_infile=OFF), "
+                          "using multi-row INSERTs", file=sys.stderr)
+                    self.method = "insert"
+
+    @property
+    def serialize(self) -> bool:
+        """Whether load_tables takes TSV text (rather than row tuples)"""
+        return self.method == "load-data" or bool(self.directory)
+
+    def truncate(self):
+        with self.connection.cursor() as cursor:
+            for table in GENERATED_TABLES:
+                cursor.execute(f"TRUNCATE TABLE {table}")
+        self.connection.commit()
+
+    def load(self, rows):
+        """Load (table, row) pairs"""
+        by_table = group_by_table(rows)
+        if self.serialize:
+            by_table = {table: _tsv(table_rows) for table, table_rows in by_table.items()}
+        self.load_tables(by_table)
+
+    def load_tables(self, by_table: dict):
+        """Load {table: rows} in one transaction; rows are TSV text when self.serialize"""
+        for table, rows in by_table.items():
+            if self.directory:
+                self._write(table, rows)
+            elif self.method == "load-data":
+                self._load_data(table, rows)
+            else:
+                self._insert(table, rows)
+            self.rows[table] += rows.count("\n") if self.serialize else len(rows)
+        if self.connection:
+            self.connection.commit()
+
+    def _write(self, table: str, text: str, path: str = None):
+        with open(path or os.path.join(self.directory, f"{table}.tsv"), "a", encoding="utf-8") as output:
+            output.write(text)
+
+    def _load_data(self, table: str, text: str):
+        handle, path = tempfile.mkstemp(suffix=f"-{table}.tsv")
+        os.close(handle)
+        try:
+            self._write(table, text, path)
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                    f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(TABLE_COLUMNS[table])})",
+                    (path,)
+                )
+        finally:
+            os.remove(path)
+
+    def _insert(self, table: str, rows: list):
+        columns = TABLE_COLUMNS[table]
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        with self.connection.cursor() as cursor:
+            for offset in range(0, len(rows), INSERT_BATCH):
+                # pymysql sends an executemany INSERT as multi-row statements
+                cursor.executemany(query, rows[offset:offset + INSERT_BATCH])
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+
+
+def generate(donors: int, receivers: int = None, events: int = None, admins: int = 1, seed: int = 42,
+             years: float = 3, as_of: datetime = None, domain: str = "example.com", password: str = "password123",
+             method: str = "load-data", truncate: bool = False, directory: str = None, jobs: int = None,
+             progress: bool = True) -> dict:
+    """Generate and load a dataset; returns row counts and load rates.
+
+    Donor and receiver chunks are generated by jobs worker processes
+    (default: one per CPU) while this process loads finished chunks.
+    """
+    from app.core.security import get_password_hash
+
+    receivers = donors // 10 if receivers is None else receivers
+    events = max(20, donors // 500) if events is None else events
+    as_of = as_of or datetime.combine(date.today(), datetime.min.time())
+    jobs = jobs or os.cpu_count() or 1
+
+    if not directory:
+        init_db()
+    loader = Loader(method, directory)
+    generator = Generator(seed, as_of, years, domain, get_password_hash(password))
+    # Approved units still within shelf life, minus units given to receivers, per blood type
+    stock = dict.fromkeys(BLOOD_TYPES, 0)
+    tasks = [
+        (kind, chunk, start, min(total, start + CHUNK), loader.serialize)
+        for kind, total in [("donors", donors), ("receivers", receivers)]
+        for chunk, start in enumerate(range(0, total, CHUNK))
+    ]
+    pool = None
+    started = time.perf_counter()
+    try:
+        if truncate and not directory:
+            loader.truncate()
+        loader.load(generator.admins(admins))
+        # Also fills generator.completed_events, which the chunks need
+        loader.load(generator.events(events, donors))
+
+        if jobs > 1 and len(tasks) > 1:
+            pool = multiprocessing.Pool(min(jobs, len(tasks)), initializer=_init_worker, initargs=(generator,))
+            results = pool.imap(_generate_chunk, tasks)
+        else:
+            _init_worker(generator)
+            results = map(_generate_chunk, tasks)
+        for (kind, _, _, end, _), (by_table, chunk_stock) in zip(tasks, results):
+            loader.load_tables(by_table)
+            for blood_type, units in chunk_stock.items():
+                stock[blood_type] += units
+            if progress:
+                loaded = sum(loader.rows.values())
+                total = donors if kind == "donors" else receivers
+                print(f"{kind}: {end}/{total} ({loaded / (time.perf_counter() - started):,.0f} rows/s)",
+                      file=sys.stderr)
+        loader.load(generator.inventory(stock))
+    finally:
+        if pool:
+            pool.terminate()
+        loader.close()
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(loader.rows.values())
+    return {
+        "seed": seed,
+        "as_of": as_of.isoformat(),
+        "method": "files" if directory else loader.method,
+        "jobs": jobs,
+        "rows": loader.rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(total_rows / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--donors", type=int, required=True)
+    parser.add_argument("--receivers", type=int, help="default: donors / 10")
+    parser.add_argument("--events", type=int, help="default: donors / 500, at least 20")
+    parser.add_argument("--admins", type=int, default=1, help="admin@<domain>, admin1@<domain>, ...")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=float, default=3, help="span of donation history")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="the dataset's 'today' (default: today)")
+    parser.add_argument("--email-domain", default="example.com")
+    parser.add_argument("--password", default="password123", help="password of every generated account")
+    parser.add_argument("--method", choices=["load-data", "insert"], default="load-data")
+    parser.add_argument("--truncate", action="store_true", help="empty the generated tables (and sessions) first")
+    parser.add_argument("--dir", help="write <table>.tsv files here instead of loading the database")
+    parser.add_argument("--jobs", type=int, help="generator processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    result = generate(
+        args.donors, args.receivers, args.events, args.admins, args.seed, args.years,
+        datetime.combine(args.as_of, datetime.min.time()) if args.as_of else None,
+        args.email_domain, args.password, args.method, args.truncate, args.dir, args.jobs
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,28 @@
-from fastapi import FastAPI
+import os
+import secrets
+import sys
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.database import db, init_db
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.admission import AdmissionControlMiddleware
+from app.core.replication import ReadYourWritesMiddleware
+from app.core.resilience import DegradedReadMiddleware
+from app.core.profiling import QueryProfilerMiddleware
+from app.core.query_audit import QueryAuditMiddleware
+from app.core.metrics import MetricsMiddleware, metrics
+from app.core.tracing import TracingMiddleware, traced_middleware
+from app.core.logs import RequestLogMiddleware, setup_logging, shutdown_logging
+from app.core.password_hashing import password_hasher
+from app.core.jobs import job_worker
 from app.api.v1.api import api_router
 
+# JSON logs written by a background thread, so logging never waits on stdout
+setup_logging()
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -11,23 +30,72 @@ app = FastAPI(
     description="Blood Donation System Backend API"
 )
 
-# Set up CORS
+# Route a client's reads to the primary right after it writes (when replicas are configured)
+app.add_middleware(traced_middleware(ReadYourWritesMiddleware))
+
+# Replay stored responses for retried create requests
+app.add_middleware(traced_middleware(IdempotencyMiddleware))
+
+# Flag repeated and N+1 statements per request (development and tests)
+if settings.QUERY_AUDIT_MODE != "off":
+    app.add_middleware(traced_middleware(QueryAuditMiddleware))
+
+# Count and time each request's SQL statements (Server-Timing header, /admin/query-profile)
+app.add_middleware(traced_middleware(QueryProfilerMiddleware))
+
+# Serve the last good GET responses (or a 503) while the database is unreachable
+app.add_middleware(traced_middleware(DegradedReadMiddleware))
+
+# Per-client rate limits, then global load shedding (outer middleware runs first)
+app.add_middleware(traced_middleware(RateLimitMiddleware))
+app.add_middleware(traced_middleware(AdmissionControlMiddleware))
+
+# Request latency and in-flight count, including requests shed by the limits above
+if settings.METRICS_ENABLED:
+    app.add_middleware(traced_middleware(MetricsMiddleware))
+
+# Request id, route and user on every log record written while handling a request (X-Request-ID)
+app.add_middleware(traced_middleware(RequestLogMiddleware))
+
+# Set up CORS (outermost, so 429/503 responses carry CORS headers too)
 app.add_middleware(
-    CORSMiddleware,
+    traced_middleware(CORSMiddleware),
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "Retry-After", "Server-Timing", "traceresponse", "X-Request-ID", "Idempotent-Replayed"],
 )
 
+# Trace sampled requests (TRACING_SAMPLE_RATE, or TRACING_FOLLOW_PARENT and a sampled traceparent header); each middleware above gets a span
+app.add_middleware(TracingMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
+# Set once this worker's connection pool is warm; cleared while draining
+app.state.ready = False
+
+
 @app.on_event("startup")
-async def startup_event():
-    """Initialize database on startup"""
-    init_db()
+def startup_event():
+    """Initialize database and warm the connection pool on startup"""
+    if settings.DB_INIT_ON_STARTUP:
+        init_db()
+    db.warm()
+    job_worker.start()
+    app.state.ready = True
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Stop background jobs, close pooled connections, stop the password hashing worker processes and flush the logs"""
+    app.state.ready = False
+    job_worker.stop(timeout=settings.GRACEFUL_SHUTDOWN_SECONDS)
+    db.close()
+    password_hasher.shutdown()
+    shutdown_logging()
 
 
 @app.get("/")
@@ -44,11 +112,68 @@ def health_check():
     return {"status": "healthy"}
 
 
-if __name__ == "__main__":
+@app.get("/ready")
+def readiness_check():
+    if not app.state.ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "starting"})
+    return {"status": "ready"}
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint(request: Request):
+        # Internal only: the series name every normalized SQL statement
+        client = request.client.host if request.client else None
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if client not in settings.METRICS_ALLOWED_CLIENTS and not (
+            settings.METRICS_TOKEN and secrets.compare_digest(token, settings.METRICS_TOKEN)
+        ):
+            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not enough permissions"})
+        # async: threadpool gauges can only be read on the event loop
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def run_production():
+    """Run WORKERS uvicorn processes with warm pools, graceful drain and recycling.
+
+    Schema setup runs once here rather than in every worker. Workers are
+    spawned, so each builds its own connection pool and caches, and uvicorn
+    only accepts connections in a worker after its startup (pool warm-up)
+    finishes. SIGTERM stops accepting, lets in-flight requests finish for up
+    to GRACEFUL_SHUTDOWN_SECONDS and then closes the pool. Workers that exit
+    after WORKER_MAX_REQUESTS are restarted by the supervisor.
+    """
     import uvicorn
+    
+    workers = settings.WORKERS or os.cpu_count() or 1
+    init_db()
+    db.close()
+    
+    # Read by the spawned workers' settings
+    os.environ["DB_INIT_ON_STARTUP"] = "false"
+    if not settings.PASSWORD_HASH_WORKERS:
+        # Share the CPUs between the workers' bcrypt pools instead of N x CPU processes
+        os.environ["PASSWORD_HASH_WORKERS"] = str(max(1, (os.cpu_count() or 1) // workers))
+    
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=settings.ENVIRONMENT == "development"
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        limit_max_requests=settings.WORKER_MAX_REQUESTS or None,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True
     )
+
+
+if __name__ == "__main__":
+    if "--production" in sys.argv or settings.ENVIRONMENT == "production":
+        run_production()
+    else:
+        import uvicorn
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=settings.ENVIRONMENT == "development"
+        )
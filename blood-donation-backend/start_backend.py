@@ -2,6 +2,9 @@
 """
 Startup script for Blood Donation System Backend
 This script installs dependencies, initializes the database, and starts the server
+
+Usage: python start_backend.py [--production]
+  --production  skip setup and tests, run one worker per CPU (see main.run_production)
 """
 
 import subprocess
@@ -30,6 +33,14 @@ def main():
         print("✗ Please run this script from the blood-donation-backend directory")
         sys.exit(1)
     
+    if "--production" in sys.argv:
+        print("\n🌐 Starting production server...")
+        try:
+            subprocess.run([sys.executable, "main.py", "--production"])
+        except KeyboardInterrupt:
+            print("\n\n👋 Server stopped")
+        return
+    
     # Install dependencies
     if not run_command("pip install -r requirements.txt", "Installing dependencies"):
         print("✗ Failed to install dependencies. Please check your Python environment.")
@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+"""
+In-process API tests
+Covers every router of main.app through the test harness (test_harness.py):
+each scenario gets a fresh SQLite database behind get_db(), so scenarios
+are independent and run in parallel worker processes. Background jobs are
+run inline with run_jobs(). No server or MySQL is needed.
+
+Usage: python test_app.py [--jobs N] [-k name]
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pymysql
+from test_harness import SQLiteConnection, api_client, check, job_queue, login, register, run_jobs, run_tests, settings
+from app.core.database import get_db
+from app.core.db_operations import SessionOperations
+from app.core.idempotency import IdempotencyStore
+from app.core import password_hashing
+from app.core.password_hashing import password_hasher
+from app.core.pubsub import EventBus, event_bus
+from app.core.rate_limit import client_key
+from app.core.sessions import SessionDenylist
+
+API = "/api/v1"
+
+DONOR = {
+    "name": "Alice Donor",
+    "email": "alice@example.com",
+    "phone": "+1-555-0100",
+    "blood_type": "O+",
+    "age": 30,
+    "weight": 70,
+    "address": "1 Main St, Springfield",
+    "medical_history": "None",
+}
+
+RECEIVER = {
+    "name": "Bob Patient",
+    "email": "bob@example.com",
+    "phone": "+1-555-0200",
+    "blood_type": "A+",
+    "address": "2 Elm St, Springfield",
+    "urgency_level": "critical",
+    "units_needed": 2,
+    "hospital_name": "General Hospital",
+    "doctor_name": "Dr. Grey",
+    "medical_condition": "Surgery",
+}
+
+EVENT = {
+    "title": "Spring Blood Drive",
+    "description": "Community donation day",
+    "date": "2030-04-01T09:00:00",
+    "time": "09:00",
+    "location": "Town Hall",
+    "address": "3 Oak St, Springfield",
+    "capacity": 2,
+    "organizer": "Red Cross",
+}
+
+
+def create_donor(client, email="alice@example.com", **fields):
+    """Register and log in a donor with a profile; returns (headers, donor)"""
+    headers = login(client, email, role="donor")
+    response = client.post(f"{API}/donors/", json={**DONOR, "email": email, **fields}, headers=headers)
+    assert response.status_code == 200, response.text
+    return headers, response.json()
+
+
+def test_health():
+    with api_client() as client:
+        root = client.get("/")
+        health = client.get("/health")
+        ready = client.get("/ready")
+        return all([
+            check("Root describes the API", root.status_code == 200 and "version" in root.json()),
+            check("Health check", health.status_code == 200 and health.json() == {"status": "healthy"}),
+            # Startup (pool warm-up) doesn't run under the harness
+            check("Not ready before startup", ready.status_code == 503, str(ready.status_code)),
+            check("Responses carry a request id", bool(health.headers.get("x-request-id"))),
+        ])
+
+
+def test_auth():
+    with api_client() as client:
+        user = register(client, "carol@example.com")
+        duplicate = client.post(f"{API}/auth/register",
+                                json={"email": "carol@example.com", "password": "x", "role": "donor"})
+        wrong = client.post(f"{API}/auth/login", json={"email": "carol@example.com", "password": "wrong"})
+        tokens = client.post(f"{API}/auth/login", json={"email": "carol@example.com", "password": "secret123"}).json()
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        me = client.get(f"{API}/auth/me", headers=headers)
+        refreshed = client.post(f"{API}/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        new_tokens = refreshed.json()
+        logout = client.post(f"{API}/auth/logout", json={"refresh_token": new_tokens["refresh_token"]})
+        after_logout = client.post(f"{API}/auth/refresh", json={"refresh_token": new_tokens["refresh_token"]})
+        revoked = client.get(f"{API}/auth/me", headers={"Authorization": f"Bearer {new_tokens['access_token']}"})
+        anonymous = client.get(f"{API}/auth/me")
+        return all([
+            check("Register returns the user", user["email"] == "carol@example.com" and user["role"] == "donor"),
+            check("Duplicate email rejected", duplicate.status_code == 400, str(duplicate.status_code)),
+            check("Wrong password rejected", wrong.status_code == 401, str(wrong.status_code)),
+            check("Current user", me.status_code == 200 and me.json()["id"] == user["id"], me.text[:100]),
+            check("Refresh issues new tokens", refreshed.status_code == 200
+                  and new_tokens["refresh_token"] != tokens["refresh_token"], refreshed.text[:100]),
+            check("Logout", logout.status_code == 200),
+            check("Refresh token unusable after logout", after_logout.status_code == 401,
+                  str(after_logout.status_code)),
+            check("Access token of a logged-out session rejected", revoked.status_code == 401,
+                  str(revoked.status_code)),
+            check("No token rejected", anonymous.status_code in (401, 403), str(anonymous.status_code)),
+        ])
+
+
+def test_donors():
+    with api_client() as client:
+        headers, donor = create_donor(client)
+        again = client.post(f"{API}/donors/", json=DONOR, headers=headers)
+        me = client.get(f"{API}/donors/me", headers=headers)
+        updated = client.put(f"{API}/donors/me", json={"weight": 72}, headers=headers)
+        forbidden = client.get(f"{API}/donors/{donor['id']}", headers=headers)
+
+        admin = login(client, "admin@example.com", role="admin")
+        listed = client.get(f"{API}/donors/")
+        projected = client.get(f"{API}/donors/?fields=id,name")
+        by_id = client.get(f"{API}/donors/{donor['id']}", headers=admin)
+        missing = client.get(f"{API}/donors/unknown", headers=admin)
+        ineligible = client.put(f"{API}/donors/{donor['id']}/eligibility", json={"is_eligible": False}, headers=admin)
+        eligible_list = client.get(f"{API}/donors/eligible", headers=admin).json()
+        ineligible_list = client.get(f"{API}/donors/ineligible", headers=admin).json()
+        return all([
+            check("Donor profile created", donor["name"] == DONOR["name"] and donor["is_eligible"]),
+            check("Second profile rejected", again.status_code == 400, str(again.status_code)),
+            check("Own profile", me.status_code == 200 and me.json()["id"] == donor["id"]),
+            check("Own profile updated", updated.status_code == 200 and updated.json()["weight"] == 72, updated.text[:100]),
+            check("Donor can't read other profiles by id", forbidden.status_code == 403, str(forbidden.status_code)),
+            check("Donor list", listed.status_code == 200 and [d["id"] for d in listed.json()] == [donor["id"]]),
+            check("fields= projection", projected.json() == [{"id": donor["id"], "name": DONOR["name"]}],
+                  projected.text[:100]),
+            check("Admin reads donor by id", by_id.status_code == 200 and by_id.json()["email"] == DONOR["email"]),
+            check("Unknown donor is 404", missing.status_code == 404),
+            check("Eligibility updated", ineligible.status_code == 200 and not ineligible.json()["is_eligible"]),
+            check("Eligible and ineligible lists", eligible_list == [] and len(ineligible_list) == 1),
+        ])
+
+
+def test_receivers_and_requests():
+    with api_client() as client:
+        headers = login(client, "bob@example.com", role="recv")
+        created = client.post(f"{API}/receivers/", json=RECEIVER, headers=headers)
+        receiver = created.json()
+        again = client.post(f"{API}/receivers/", json=RECEIVER, headers=headers)
+        me = client.get(f"{API}/receivers/me", headers=headers)
+        updated = client.put(f"{API}/receivers/me", json={"units_needed": 3}, headers=headers)
+        other = login(client, "dan@example.com", role="recv")
+        client.post(f"{API}/receivers/", json={**RECEIVER, "email": "dan@example.com", "urgency_level": "low"},
+                    headers=other)
+
+        admin = login(client, "admin@example.com", role="admin")
+        listed = client.get(f"{API}/receivers/", headers=admin)
+        by_id = client.get(f"{API}/receivers/{receiver['id']}", headers=admin)
+        requests = client.get(f"{API}/blood-requests/")
+        critical = client.get(f"{API}/blood-requests/?urgency_level=critical")
+        status = client.put(f"{API}/blood-requests/{receiver['id']}/status", json={"new_status": "fulfilled"})
+        missing_status = client.put(f"{API}/blood-requests/{receiver['id']}/status", json={})
+        fulfilled = client.get(f"{API}/blood-requests/?status_filter=fulfilled")
+        return all([
+            check("Receiver profile created", created.status_code == 200 and receiver["urgency_level"] == "critical",
+                  created.text[:100]),
+            check("Second profile rejected", again.status_code == 400, str(again.status_code)),
+            check("Own profile", me.status_code == 200 and me.json()["id"] == receiver["id"]),
+            check("Own profile updated", updated.status_code == 200 and updated.json()["units_needed"] == 3),
+            check("Admin lists receivers", listed.status_code == 200 and len(listed.json()) == 2),
+            check("Admin reads receiver by id", by_id.status_code == 200 and by_id.json()["name"] == RECEIVER["name"]),
+            check("New requests are pending", {r["status"] for r in requests.json()} == {"pending"}),
+            check("Requests sorted by urgency, critical first",
+                  [r["urgency_level"] for r in requests.json()] == ["critical", "low"], requests.text[:100]),
+            check("Total count header", requests.headers.get("x-total-count") == "2"),
+            check("Urgency filter", [r["id"] for r in critical.json()] == [receiver["id"]]),
+            check("Request status updated", status.status_code == 200 and status.json()["status"] == "fulfilled",
+                  status.text[:100]),
+            check("Status is required", missing_status.status_code == 400, str(missing_status.status_code)),
+            check("Status filter", [r["id"] for r in fulfilled.json()] == [receiver["id"]]),
+        ])
+
+
+def test_events():
+    with api_client() as client:
+        admin = login(client, "admin@example.com", role="admin")
+        headers, donor = create_donor(client)
+        denied = client.post(f"{API}/events/", json=EVENT, headers=headers)
+        created = client.post(f"{API}/events/", json=EVENT, headers=admin)
+        event = created.json()
+        listed = client.get(f"{API}/events/?status=upcoming")
+        projected = client.get(f"{API}/events/?fields=id,title")
+        updated = client.put(f"{API}/events/{event['id']}", json={"location": "Library"}, headers=admin)
+        nothing = client.put(f"{API}/events/{event['id']}", json={}, headers=admin)
+
+        registration = {"donor_id": donor["id"]}
+        registered = client.post(f"{API}/events/{event['id']}/register", json=registration, headers=headers)
+        twice = client.post(f"{API}/events/{event['id']}/register", json=registration, headers=headers)
+        client.post(f"{API}/events/{event['id']}/register", json={"donor_id": "walk-in"}, headers=headers)
+        full = client.post(f"{API}/events/{event['id']}/register", json={"donor_id": "late"}, headers=headers)
+        notifications = run_jobs()
+        unregistered = client.request("DELETE", f"{API}/events/{event['id']}/unregister", json=registration,
+                                      headers=headers)
+        deleted = client.delete(f"{API}/events/{event['id']}", headers=admin)
+        gone = client.get(f"{API}/events/{event['id']}")
+        return all([
+            check("Only admins create events", denied.status_code == 403, str(denied.status_code)),
+            check("Event created", created.status_code == 200 and event["registered_donors"] == [], created.text[:100]),
+            check("Public event list", [e["id"] for e in listed.json()] == [event["id"]]),
+            check("fields= projection", projected.json() == [{"id": event["id"], "title": EVENT["title"]}]),
+            check("Event updated", updated.status_code == 200 and updated.json()["location"] == "Library"),
+            check("Empty update rejected", nothing.status_code == 400),
+            check("Donor registered", registered.status_code == 200
+                  and registered.json()["registered_donors"] == [donor["id"]], registered.text[:100]),
+            check("Duplicate registration rejected", twice.status_code == 400),
+            check("Full event rejected", full.status_code == 400 and "full" in full.text, full.text[:100]),
+            check("Registration notifications ran", notifications == 2, str(notifications)),
+            check("Donor unregistered", unregistered.status_code == 200
+                  and unregistered.json()["registered_donors"] == ["walk-in"], unregistered.text[:100]),
+            check("Event deleted", deleted.status_code == 200 and gone.status_code == 404),
+        ])
+
+
+def test_registrations_on_small_pool():
+    # More concurrent transactional requests than pooled connections: each one
+    # must finish its user lookup before its unit of work takes a connection
+    timeout, settings.DB_POOL_TIMEOUT_SECONDS = settings.DB_POOL_TIMEOUT_SECONDS, 2
+    try:
+        return _registrations_on_small_pool()
+    finally:
+        settings.DB_POOL_TIMEOUT_SECONDS = timeout
+
+
+def _registrations_on_small_pool():
+    with api_client(pool_size=2) as client:
+        admin = login(client, "admin@example.com", role="admin")
+        event = client.post(f"{API}/events/", json={**EVENT, "capacity": 10}, headers=admin).json()
+        donors = [create_donor(client, f"donor{index}@example.com") for index in range(6)]
+
+        def register_for_event(donor):
+            headers, profile = donor
+            return client.post(f"{API}/events/{event['id']}/register", json={"donor_id": profile["id"]},
+                               headers=headers)
+
+        with ThreadPoolExecutor(len(donors)) as executor:
+            responses = list(executor.map(register_for_event, donors))
+        registered = client.get(f"{API}/events/{event['id']}").json()["registered_donors"]
+        return all([
+            check("Every registration succeeded", all(r.status_code == 200 for r in responses),
+                  str([r.status_code for r in responses])),
+            check("Every donor registered", len(registered) == len(donors), str(len(registered))),
+        ])
+
+
+def test_donation_records():
+    with api_client() as client:
+        admin = login(client, "admin@example.com", role="admin")
+        headers, donor = create_donor(client)
+        record = {"donor_id": donor["id"], "donation_date": "2030-01-15T10:00:00", "blood_type": "O+",
+                  "units_collected": 2}
+        created = client.post(f"{API}/donation-records/", json=record, headers=admin)
+        record_id = created.json()["id"]
+        listed = client.get(f"{API}/donation-records/?donor_id={donor['id']}")
+        mine = client.get(f"{API}/donation-records/my-records", headers=headers)
+        by_id = client.get(f"{API}/donation-records/{record_id}", headers=admin)
+        updated = client.put(f"{API}/donation-records/{record_id}", json={"notes": "Smooth"}, headers=admin)
+
+        passed = "hiv_test=true&hepatitis_b_test=true&hepatitis_c_test=true&syphilis_test=true"
+        approved = client.put(f"{API}/donation-records/{record_id}/test-results?{passed}", headers=admin)
+        approval_jobs = run_jobs()
+        inventory = client.get(f"{API}/database-test/table-structure/blood_inventory", headers=admin).json()
+        after_approval = client.get(f"{API}/donors/me", headers=headers).json()
+
+        failed = passed.replace("syphilis_test=true", "syphilis_test=false")
+        rejected = client.put(f"{API}/donation-records/{record_id}/test-results?{failed}", headers=admin)
+        run_jobs()
+        after_rejection = client.get(f"{API}/donors/me", headers=headers).json()
+        units_left = client.get(f"{API}/dashboard/stats", headers=admin).json()["total_blood_units"]
+
+        deleted = client.delete(f"{API}/donation-records/{record_id}", headers=admin)
+        gone = client.get(f"{API}/donation-records/{record_id}", headers=admin)
+        return all([
+            check("Record created", created.status_code == 200 and created.json()["status"] == "collected",
+                  created.text[:100]),
+            check("Records by donor", [r["id"] for r in listed.json()] == [record_id]),
+            check("Donor's own records", mine.status_code == 200 and [r["id"] for r in mine.json()] == [record_id]),
+            check("Record by id has test results", by_id.json()["test_results"]["hiv"] is False, by_id.text[:100]),
+            check("Record updated", updated.json()["notes"] == "Smooth"),
+            check("All tests passed approves", approved.json()["status"] == "approved", approved.text[:100]),
+            check("Approval job ran", approval_jobs == 1, str(approval_jobs)),
+            check("Approved units added to inventory",
+                  [(i["blood_type"], i["units_available"]) for i in inventory["sample_records"]] == [("O+", 2)],
+                  str(inventory)[:150]),
+            check("Donor's last donation date set", after_approval["last_donation_date"] is not None),
+            check("Failed test rejects", rejected.json()["status"] == "rejected"),
+            check("Rejection makes the donor ineligible", after_rejection["is_eligible"] is False),
+            check("Rejected units taken out of inventory", units_left == 0, str(units_left)),
+            check("Record deleted", deleted.status_code == 200 and gone.status_code == 404),
+        ])
+
+
+def test_inventory_published_after_commit():
+    # Live subscribers must not see an inventory change whose job rolled back
+    def inventory_events():
+        return [event for event in event_bus._recent if event["topic"] == "inventory"]
+
+    with api_client() as client:
+        admin = login(client, "admin@example.com", role="admin")
+        _, donor = create_donor(client)
+        record = client.post(f"{API}/donation-records/", headers=admin, json={
+            "donor_id": donor["id"], "donation_date": "2030-01-15T10:00:00", "blood_type": "O+", "units_collected": 2
+        }).json()
+        passed = "hiv_test=true&hepatitis_b_test=true&hepatitis_c_test=true&syphilis_test=true"
+        client.put(f"{API}/donation-records/{record['id']}/test-results?{passed}", headers=admin)
+        before = len(inventory_events())
+
+        def lost_connection(self):
+            if self.sqlite.in_transaction:
+                raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query (injected)")
+
+        jobs = job_queue.claim("test", settings.JOB_BATCH_SIZE)
+        commit, SQLiteConnection.commit = SQLiteConnection.commit, lost_connection
+        try:
+            for job in jobs:
+                job_queue.run(job)
+        finally:
+            SQLiteConnection.commit = commit
+        after_failure = len(inventory_events())
+
+        get_db().execute_update("UPDATE jobs SET run_at = CURRENT_TIMESTAMP(6)")  # retry now, not after backoff
+        retried = run_jobs()
+        published = inventory_events()[before:]
+        return all([
+            check("Nothing published when the job's commit fails", after_failure == before,
+                  str(after_failure - before)),
+            check("Published once the retry commits", retried == 1 and len(published) == 1
+                  and published[0]["data"]["item"]["units_available"] == 2, str(published)[:150]),
+        ])
+
+
+def test_password_hash_timeout():
+    # A hash that isn't done in time is backpressure (503), not a server error
+    timeout, settings.PASSWORD_HASH_TIMEOUT_SECONDS = settings.PASSWORD_HASH_TIMEOUT_SECONDS, 0
+    try:
+        with api_client() as client:
+            response = client.post(f"{API}/auth/register",
+                                   json={"email": "slow@example.com", "password": "secret123", "role": "donor"})
+    finally:
+        settings.PASSWORD_HASH_TIMEOUT_SECONDS = timeout
+    password_hasher._executor.shutdown(wait=True)  # let the abandoned hash finish
+    password_hasher._executor = ThreadPoolExecutor(max_workers=2)
+    return all([
+        check("Timed-out hash returns 503", response.status_code == 503, str(response.status_code)),
+        check("with Retry-After", "retry-after" in response.headers),
+        check("Abandoned hash released its slot once done", password_hasher.queue_depth == 0,
+              str(password_hasher.queue_depth)),
+    ])
+
+
+class BrokenPool(ThreadPoolExecutor):
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("A child process terminated abruptly (injected)")
+
+
+def test_password_hasher_restarts():
+    # A worker process that died breaks its pool; the next hash starts a new one
+    working, password_hasher._executor = password_hasher._executor, BrokenPool()
+    password_hashing.ProcessPoolExecutor = lambda **kwargs: working
+    try:
+        with api_client() as client:
+            response = client.post(f"{API}/auth/register",
+                                   json={"email": "after-crash@example.com", "password": "secret123", "role": "donor"})
+    finally:
+        password_hashing.ProcessPoolExecutor = ProcessPoolExecutor
+    return all([
+        check("Hash runs on a new pool", response.status_code == 200, response.text[:100]),
+        check("Broken pool replaced", password_hasher._executor is working),
+        check("No slot leaked", password_hasher.queue_depth == 0, str(password_hasher.queue_depth)),
+    ])
+
+
+def test_idempotent_create():
+    with api_client() as client:
+        headers = {**login(client, "alice@example.com", role="donor"), "Idempotency-Key": "create-alice"}
+        first = client.post(f"{API}/donors/", json=DONOR, headers=headers)
+        retry = client.post(f"{API}/donors/", json=DONOR, headers=headers)
+        changed = client.post(f"{API}/donors/", json={**DONOR, "age": 31}, headers=headers)
+        tokens = client.post(f"{API}/auth/login", json={"email": "alice@example.com", "password": "secret123"}).json()
+        refreshed = client.post(f"{API}/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+        after_refresh = client.post(f"{API}/donors/", json=DONOR, headers={
+            "Authorization": f"Bearer {refreshed['access_token']}", "Idempotency-Key": "create-alice"})
+        return all([
+            check("First request creates", first.status_code == 200, first.text[:100]),
+            check("Retry replays the stored response", retry.status_code == 200
+                  and retry.headers.get("idempotent-replayed") == "true" and retry.json() == first.json()),
+            check("Same key with another body rejected", changed.status_code == 422, str(changed.status_code)),
+            check("Retry with a refreshed token replays", after_refresh.status_code == 200
+                  and after_refresh.headers.get("idempotent-replayed") == "true", after_refresh.text[:100]),
+        ])
+
+
+def test_idempotency_lease():
+    with api_client():
+        store = IdempotencyStore(get_db())
+        claimed = store.claim("key", "body")
+        while_running = store.claim("key", "body")
+        get_db().execute_update("UPDATE idempotency_keys SET locked_until = DATE_SUB(CURRENT_TIMESTAMP(6), INTERVAL %s SECOND)", (1,))
+        other_body = store.claim("key", "other body")
+        taken_over = store.claim("key", "body")
+        again = store.claim("key", "body")
+        return all([
+            check("First claim owns the key", claimed is None),
+            check("Key in progress while its lease runs", while_running is not None
+                  and while_running["status"] == "in_progress", str(while_running)),
+            check("Abandoned key not taken over with another body", other_body is not None),
+            check("Abandoned key taken over after its lease", taken_over is None, str(taken_over)),
+            check("Takeover renews the lease", again is not None and not again["lease_expired"], str(again)),
+        ])
+
+
+def test_search():
+    with api_client() as client:
+        admin = login(client, "admin@example.com", role="admin")
+        _, donor = create_donor(client)
+        create_donor(client, "zed@example.com", name="Zed Other")
+        client.post(f"{API}/events/", json=EVENT, headers=admin)
+        by_name = client.get(f"{API}/search/?q=alic&types=donors", headers=admin)
+        by_email = client.get(f"{API}/search/?q=alice@ex&types=donors", headers=admin)
+        everything = client.get(f"{API}/search/?q=spring", headers=admin)
+        invalid = client.get(f"{API}/search/?q=alice&types=planets", headers=admin)
+        return all([
+            check("Name prefix match", [d["id"] for d in by_name.json()["donors"]] == [donor["id"]], by_name.text[:150]),
+            check("Email prefix match", [d["id"] for d in by_email.json()["donors"]] == [donor["id"]],
+                  by_email.text[:150]),
+            check("Events searched", [e["title"] for e in everything.json()["events"]] == [EVENT["title"]]
+                  and set(everything.json()) == {"donors", "receivers", "events"}, everything.text[:150]),
+            check("Unknown type rejected", invalid.status_code == 400),
+        ])
+
+
+def test_dashboard():
+    with api_client() as client:
+        admin = login(client, "admin@example.com", role="admin")
+        create_donor(client)
+        client.post(f"{API}/events/", json=EVENT, headers=admin)
+        stats = client.get(f"{API}/dashboard/stats", headers=admin)
+        body = stats.json()
+        return all([
+            check("Dashboard stats", stats.status_code == 200, stats.text[:100]),
+            check("Counts donors and upcoming events", body.get("total_donors") == 1 and body.get("upcoming_events") == 1,
+                  str(body)[:150]),
+        ])
+
+
+def test_admin_and_database_test():
+    with api_client() as client:
+        admin = login(client, "admin@example.com", role="admin")
+        donor_headers, donor = create_donor(client)
+        counts = client.get(f"{API}/database-test/table-counts", headers=admin).json()
+        structure = client.get(f"{API}/database-test/table-structure/donors", headers=admin).json()
+        invalid = client.get(f"{API}/database-test/table-structure/secrets", headers=admin)
+        read = client.post(f"{API}/database-test/dynamic-query", headers=admin,
+                           json={"table": "donors", "operation": "read", "record_id": donor["id"]})
+        profile = client.get(f"{API}/admin/query-profile", headers=admin)
+        slow = client.get(f"{API}/admin/slow-queries", headers=admin)
+        reset = client.delete(f"{API}/admin/query-profile", headers=admin)
+        forbidden = client.get(f"{API}/admin/query-profile", headers=donor_headers)
+        return all([
+            check("Table counts", counts.get("users") == 2 and counts.get("donors") == 1, str(counts)[:150]),
+            check("Table structure", structure.get("count") == 1 and len(structure.get("sample_records", [])) == 1),
+            check("Unknown table rejected", invalid.status_code == 400),
+            check("Dynamic read", read.status_code == 200 and donor["id"] in read.text, read.text[:100]),
+            check("Query profile", profile.status_code == 200 and profile.json()["routes"], profile.text[:100]),
+            check("Slow query log", slow.status_code == 200 and "entries" in slow.json()),
+            check("Query profile reset", reset.status_code == 204),
+            check("Admin endpoints need an admin", forbidden.status_code == 403, str(forbidden.status_code)),
+        ])
+
+
+def test_live_event_ids_across_workers():
+    # Two workers' buses: a client resuming on the other worker gets only newer events
+    first, second = EventBus(worker_id=1), EventBus(worker_id=2)
+    seen = first.publish("inventory", {"n": 1})
+    older = second.publish("inventory", {"n": 2})
+    time.sleep(0.002)
+    newer = [second.publish("inventory", {"n": n}) for n in (3, 4)]
+    ids = [seen["id"], older["id"]] + [event["id"] for event in newer]
+
+    async def resume():
+        subscription, missed = second.subscribe(["inventory"], last_event_id=older["id"])
+        second.unsubscribe(subscription)
+        return missed
+
+    missed = asyncio.run(resume())
+    return all([
+        check("Ids increase across workers", ids == sorted(set(ids)), str(ids)),
+        check("Resuming on another worker replays only newer events", [e["data"]["n"] for e in missed] == [3, 4],
+              str([e["data"]["n"] for e in missed])),
+    ])
+
+
+def test_metrics_access():
+    # TestClient requests come from "testclient", not loopback
+    token, settings.METRICS_TOKEN = settings.METRICS_TOKEN, "scrape-token"
+    try:
+        with api_client() as client:
+            client.get(f"{API}/donors/donors")  # a path param value that is also a path segment
+            anonymous = client.get("/metrics")
+            wrong = client.get("/metrics", headers={"Authorization": "Bearer guess"})
+            scraper = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+    finally:
+        settings.METRICS_TOKEN = token
+    return all([
+        check("Metrics hidden from other clients", anonymous.status_code == 403, str(anonymous.status_code)),
+        check("Wrong token rejected", wrong.status_code == 403, str(wrong.status_code)),
+        check("Scraper with the token gets metrics", scraper.status_code == 200
+              and "db_query_duration_seconds" in scraper.text, str(scraper.status_code)),
+        check("Requests labelled with their route template", 'route="/api/v1/donors/{donor_id}"' in scraper.text),
+    ])
+
+
+def test_session_denylist_reload():
+    # One thread reloads the denylist; a failed reload isn't retried on every request
+    denylist = SessionDenylist()
+    denylist.add("revoked")
+    reloading, finish, reloads = threading.Event(), threading.Event(), []
+
+    def failing_reload(self, minutes):
+        reloads.append(minutes)
+        reloading.set()
+        finish.wait(5)
+        raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query (injected)")
+
+    original, SessionOperations.get_recently_revoked_ids = SessionOperations.get_recently_revoked_ids, failing_reload
+    try:
+        with api_client():
+            reloader = threading.Thread(target=denylist.is_revoked, args=("revoked",))
+            reloader.start()
+            reloading.wait(5)
+            started = time.perf_counter()
+            during = [denylist.is_revoked("revoked") for _ in range(3)]
+            waited = time.perf_counter() - started
+            finish.set()
+            reloader.join(5)
+            after = denylist.is_revoked("revoked")
+    finally:
+        SessionOperations.get_recently_revoked_ids = original
+    return all([
+        check("Other requests use the current set during a reload", during == [True] * 3 and waited < 1,
+              f"{during} {waited:.2f}s"),
+        check("Failed reload keeps the current set", after),
+        check("Failed reload not retried until the next interval", len(reloads) == 1, str(len(reloads))),
+    ])
+
+
+def test_rate_limit_client():
+    def client(forwarded=None):
+        headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+        return client_key({"type": "http", "headers": headers, "client": ("10.0.0.2", 5000)})
+
+    direct = client("203.0.113.9")
+    proxies, settings.RATE_LIMIT_TRUSTED_PROXIES = settings.RATE_LIMIT_TRUSTED_PROXIES, 2
+    try:
+        spoofed = client("198.51.100.1, 203.0.113.9, 10.0.0.1")
+        short = client("203.0.113.9")
+    finally:
+        settings.RATE_LIMIT_TRUSTED_PROXIES = proxies
+    return all([
+        check("X-Forwarded-For ignored without trusted proxies", direct == "ip:10.0.0.2", direct),
+        check("Client is the address the trusted proxies saw, not a forged one", spoofed == "ip:203.0.113.9",
+              spoofed),
+        check("Fewer addresses than proxies falls back to the leftmost", short == "ip:203.0.113.9", short),
+    ])
+
+
+def test_auth_rate_limit():
+    # One user's failed logins don't lock out others behind the same address
+    classes = settings.RATE_LIMIT_CLASSES
+    with api_client() as client:
+        for email in ("alice@example.com", "bob@example.com"):
+            register(client, email)
+        settings.RATE_LIMIT_ENABLED = True
+        settings.RATE_LIMIT_CLASSES = {**classes, "auth": [0.001, 2], "auth_client": [0.001, 4]}
+        try:
+            alice = [client.post(f"{API}/auth/login", json={"email": "alice@example.com", "password": "wrong"})
+                     .status_code for _ in range(3)]
+            bob = client.post(f"{API}/auth/login", json={"email": "bob@example.com", "password": "secret123"})
+            client.post(f"{API}/auth/login", json={"email": "carol@example.com", "password": "secret123"})
+            over = client.post(f"{API}/auth/login", json={"email": "dave@example.com", "password": "secret123"})
+        finally:
+            settings.RATE_LIMIT_ENABLED = False
+            settings.RATE_LIMIT_CLASSES = classes
+        return all([
+            check("Repeated logins for one email limited", alice == [401, 401, 429], str(alice)),
+            check("Another email from the same address still logs in", bob.status_code == 200, bob.text[:100]),
+            check("Auth requests from one address capped across emails", over.status_code == 429,
+                  str(over.status_code)),
+        ])
+
+
+def test_isolation():
+    with api_client() as client:
+        admin = login(client, "admin@example.com", role="admin")
+        counts = client.get(f"{API}/database-test/table-counts", headers=admin).json()
+        return check("Each scenario starts with an empty database", counts.get("users") == 1
+                     and counts.get("donors") == 0, str(counts)[:150])
+
+
+TESTS = [
+    test_health,
+    test_auth,
+    test_donors,
+    test_receivers_and_requests,
+    test_events,
+    test_registrations_on_small_pool,
+    test_donation_records,
+    test_inventory_published_after_commit,
+    test_password_hash_timeout,
+    test_password_hasher_restarts,
+    test_idempotent_create,
+    test_idempotency_lease,
+    test_search,
+    test_dashboard,
+    test_admin_and_database_test,
+    test_live_event_ids_across_workers,
+    test_metrics_access,
+    test_session_denylist_reload,
+    test_rate_limit_client,
+    test_auth_rate_limit,
+    test_isolation,
+]
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_tests(TESTS, __doc__) else 1)
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+In-process API test harness
+Drives main.app through FastAPI's TestClient (an ASGI client, no server)
+with get_db() swapped for a SQLite database. A small dialect shim stands
+in for pymysql: it runs the MySQL schema from create_tables() and the
+app's statements on SQLite, returning DictCursor-style rows and pymysql
+errors. Every test gets its own database file (copied from a template
+built once per process), so tests don't see each other's rows and can run
+in parallel worker processes. No MySQL server is needed.
+
+    with api_client() as client:
+        headers = login(client, "donor@example.com", role="donor")
+        client.get("/api/v1/donors/me", headers=headers)
+
+run_tests() runs test functions (which report with check() and return a
+bool) across --jobs processes and prints their output in order.
+"""
+
+import os
+
+# Settings for the app under test; set before it is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("JOB_WORKER_THREADS", "0")
+os.environ.setdefault("SLOW_QUERY_THRESHOLD_MS", "0")
+os.environ.setdefault("DB_CONNECT_RETRIES", "0")
+os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict
+import pymysql
+
+# Error code for sqlite3 errors that have no closer MySQL equivalent (ER_UNKNOWN_ERROR)
+_UNKNOWN_ERROR = 1105
+_TIMESTAMP = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'{})"
+_DATETIME = "datetime('now', 'localtime'{})"
+_INTERVAL = {
+    "MICROSECOND": "(? / 1000000.0) || ' seconds'",
+    "SECOND": "? || ' seconds'",
+    "MINUTE": "? || ' minutes'",
+    "HOUR": "? || ' hours'",
+    "DAY": "? || ' days'",
+}
+_DATE_ARITHMETIC = re.compile(r"DATE_(ADD|SUB)\(CURRENT_TIMESTAMP(\(6\))?, INTERVAL \? (\w+)\)")
+_MATCH = re.compile(r"MATCH\(([^)]*)\) AGAINST \(\? IN BOOLEAN MODE\)")
+_ON_UPDATE = re.compile(r"^\s*(\w+) TIMESTAMP .*ON UPDATE CURRENT_TIMESTAMP", re.MULTILINE)
+
+
+def _adapt_datetime(value: datetime) -> str:
+    # Like pymysql: the time zone is dropped, microseconds only when there are some
+    return value.replace(tzinfo=None).isoformat(" ")
+
+
+def _convert_timestamp(value: bytes):
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("TIMESTAMP", _convert_timestamp)
+
+
+def _match_against(query: str, *values) -> float:
+    """MATCH ... AGAINST (... IN BOOLEAN MODE) on SQLite: +required, -excluded and word* prefix terms"""
+    words = set(re.findall(r"\w+", " ".join(str(value) for value in values if value is not None).lower()))
+    score = 0.0
+    for term in query.lower().split():
+        operator = term[0] if term[0] in "+-" else ""
+        word = term.lstrip("+-")
+        if word.endswith("*"):
+            found = any(candidate.startswith(word[:-1]) for candidate in words)
+        else:
+            found = word in words
+        if operator == "-" and found or operator == "+" and not found:
+            return 0.0
+        score += found and operator != "-"
+    return score
+
+
+# Collation name -> ENUM values, registered on every connection
+_ENUMS: Dict[str, tuple] = {}
+
+
+def _enum_column(match) -> str:
+    """ENUM(...) as TEXT with a collation that sorts, like MySQL, in declaration order"""
+    values = tuple(re.findall(r"'([^']*)'", match.group(1)))
+    name = "enum_" + "_".join(re.sub(r"\W", "", value) for value in values)
+    _ENUMS[name] = values
+    return f"TEXT COLLATE {name}"
+
+
+def _enum_collation(values: tuple):
+    order = {value: index for index, value in enumerate(values)}
+
+    def compare(left: str, right: str) -> int:
+        left_key, right_key = (order.get(left, len(order)), left), (order.get(right, len(order)), right)
+        return (left_key > right_key) - (left_key < right_key)
+    return compare
+
+
+@lru_cache(maxsize=1024)
+def translate(query: str, interpolated: bool = True) -> tuple:
+    """The SQLite statements for one MySQL statement (more than one when a table needs triggers)"""
+    sql = query.strip()
+    if interpolated:
+        sql = sql.replace("%s", "?").replace("%%", "%")
+
+    if sql.upper().startswith("CREATE TABLE"):
+        table = re.search(r"CREATE TABLE IF NOT EXISTS (\w+)", sql).group(1)
+        on_update = _ON_UPDATE.findall(sql)
+        sql = re.sub(r"ENUM\(([^)]*)\)", _enum_column, sql)
+        sql = sql.replace("BIGINT AUTO_INCREMENT PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT")
+        sql = sql.replace(" ON UPDATE CURRENT_TIMESTAMP", "")
+        sql = sql.replace("DEFAULT CURRENT_TIMESTAMP(6)", f"DEFAULT ({_TIMESTAMP.format('')})")
+        sql = sql.replace("DEFAULT CURRENT_TIMESTAMP", f"DEFAULT ({_DATETIME.format('')})")
+        # ON UPDATE CURRENT_TIMESTAMP: touch the column unless the statement set it
+        triggers = tuple(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_{column}_on_update AFTER UPDATE ON {table} "
+            f"FOR EACH ROW WHEN NEW.{column} IS OLD.{column} BEGIN "
+            f"UPDATE {table} SET {column} = {_DATETIME.format('')} WHERE rowid = NEW.rowid; END"
+            for column in on_update
+        )
+        return (sql, *triggers)
+    if sql.upper().startswith("CREATE FULLTEXT INDEX"):
+        return ()  # search runs MATCH through _match_against instead
+
+    def date_arithmetic(match):
+        sign = "+" if match.group(1) == "ADD" else "-"
+        base = _TIMESTAMP if match.group(2) else _DATETIME
+        return base.format(f", '{sign}' || {_INTERVAL[match.group(3).upper()]}")
+
+    sql = _DATE_ARITHMETIC.sub(date_arithmetic, sql)
+    sql = sql.replace("CURRENT_TIMESTAMP(6)", _TIMESTAMP.format(""))
+    sql = re.sub(r"\bCURRENT_TIMESTAMP\b", _DATETIME.format(""), sql)
+    sql = re.sub(r"\s+FOR UPDATE( SKIP LOCKED)?", "", sql)
+    sql = _MATCH.sub(r"mysql_match(?, \1)", sql)
+    sql = re.sub(r"\bGREATEST\(", "MAX(", sql)
+    sql = re.sub(r"\bLEAST\(", "MIN(", sql)
+    sql = sql.replace("INSERT IGNORE", "INSERT OR IGNORE")
+    if "ON DUPLICATE KEY UPDATE" in sql:
+        insert, update = sql.split("ON DUPLICATE KEY UPDATE")
+        update = re.sub(r"\bVALUES\((\w+)\)", r"excluded.\1", update)
+        sql = f"{insert}ON CONFLICT DO UPDATE SET{update}"
+    # MySQL's LIKE escapes with backslash by default (see escape_like)
+    sql = re.sub(r"\bLIKE \?", r"LIKE ? ESCAPE '\\'", sql)
+    return (sql,)
+
+
+def _mysql_error(error: sqlite3.Error) -> pymysql.err.MySQLError:
+    """The pymysql error the app would have seen from MySQL"""
+    message = str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        if "UNIQUE" in message or "PRIMARY KEY" in message:
+            return pymysql.err.IntegrityError(1062, f"Duplicate entry ({message})")
+        if "FOREIGN KEY" in message:
+            return pymysql.err.IntegrityError(1452, f"Cannot add or update a child row ({message})")
+        return pymysql.err.IntegrityError(1048, message)
+    if "already exists" in message:
+        return pymysql.err.OperationalError(1061 if "index" in message else 1050, message)
+    if "no such table" in message:
+        return pymysql.err.ProgrammingError(1146, message)
+    if "no such column" in message:
+        return pymysql.err.OperationalError(1054, message)
+    if "syntax error" in message:
+        return pymysql.err.ProgrammingError(1064, message)
+    if "locked" in message:
+        return pymysql.err.OperationalError(1205, message)
+    return pymysql.err.OperationalError(_UNKNOWN_ERROR, message)
+
+
+class SQLiteCursor:
+    """pymysql DictCursor on a SQLite connection: rows are dicts and SELECTs are buffered"""
+
+    def __init__(self, connection: "SQLiteConnection"):
+        self.connection = connection
+        self.rows = []
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def _run(self, query: str, params, many: bool):
+        if not self.connection.open:
+            raise pymysql.err.InterfaceError(0, "")
+        statements = translate(query, params is not None)
+        self.connection.register_enums()
+        cursor = self.connection.sqlite.cursor()
+        try:
+            for index, sql in enumerate(statements):
+                if index:
+                    cursor.execute(sql)
+                elif many:
+                    cursor.executemany(sql, [tuple(row) for row in params])
+                else:
+                    cursor.execute(sql, tuple(params) if params is not None else ())
+            self.description = cursor.description
+            if cursor.description:
+                names = [column[0] for column in cursor.description]
+                self.rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+                self.rowcount = len(self.rows)
+            else:
+                self.rows = []
+                self.rowcount = cursor.rowcount
+            self.lastrowid = cursor.lastrowid
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+        finally:
+            cursor.close()
+        return self.rowcount
+
+    def execute(self, query: str, params=None) -> int:
+        return self._run(query, params, many=False)
+
+    def executemany(self, query: str, params) -> int:
+        return self._run(query, params, many=True)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+
+class SQLiteConnection:
+    """pymysql connection (autocommit, begin/commit/rollback, ping) backed by a SQLite file"""
+
+    def __init__(self, path: str):
+        self.sqlite = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES
+        )
+        self.sqlite.execute("PRAGMA foreign_keys = ON")
+        self.sqlite.create_function("mysql_match", -1, _match_against, deterministic=True)
+        self.enums = set()
+        self.register_enums()
+        self.open = True
+
+    def register_enums(self):
+        """Add the collations of ENUM columns created since this connection was opened"""
+        if len(self.enums) != len(_ENUMS):
+            for name in _ENUMS.keys() - self.enums:
+                self.sqlite.create_collation(name, _enum_collation(_ENUMS[name]))
+                self.enums.add(name)
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self)
+
+    def ping(self, reconnect: bool = False):
+        if not self.open:
+            raise pymysql.err.InterfaceError(0, "")
+
+    def begin(self):
+        # IMMEDIATE takes the write lock up front, standing in for SELECT ... FOR UPDATE
+        self.commit()
+        self.sqlite.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self.sqlite.in_transaction:
+            self.sqlite.execute("COMMIT")
+
+    def rollback(self):
+        if self.sqlite.in_transaction:
+            self.sqlite.execute("ROLLBACK")
+
+    def close(self):
+        if self.open:
+            self.open = False
+            self.sqlite.close()
+
+
+def connect(database: str, **kwargs) -> SQLiteConnection:
+    """Stands in for pymysql.connect; the database name is the SQLite file"""
+    return SQLiteConnection(database)
+
+
+pymysql.connect = connect
+
+from app.core.config import settings
+from app.core import database, db_operations
+from app.core.database import Database, create_tables
+from app.core.jobs import job_queue
+from app.core.password_hashing import password_hasher
+from fastapi.testclient import TestClient
+from main import app
+
+# bcrypt on threads: the harness doesn't need the spawned worker processes
+password_hasher._executor = ThreadPoolExecutor(max_workers=2)
+
+_workdir = tempfile.TemporaryDirectory(prefix="api-tests-")
+_template: str = None
+_databases = 0
+
+
+def _use(path: str, pool_size: int = 4) -> Database:
+    """Point get_db() at a new Database on the SQLite file at path"""
+    settings.DB_NAME = path
+    database.db = Database(pool_size=pool_size)
+    db_operations._count_cache.clear()
+    return database.db
+
+
+def _template_path() -> str:
+    """Database file with the schema, built once per process and copied for each test"""
+    global _template
+    if _template is None:
+        path = os.path.join(_workdir.name, "template.sqlite3")
+        _use(path)
+        create_tables()
+        database.db.close()
+        _template = path
+    return _template
+
+
+@contextlib.contextmanager
+def isolated_database(pool_size: int = 4):
+    """A fresh, empty database (with the schema) behind get_db() for the with block"""
+    global _databases
+    template = _template_path()
+    _databases += 1
+    path = os.path.join(_workdir.name, f"test-{_databases}.sqlite3")
+    shutil.copyfile(template, path)
+    previous = database.db
+    db = _use(path, pool_size)
+    try:
+        yield db
+    finally:
+        db.close()
+        database.db = previous
+        os.remove(path)
+
+
+@contextlib.contextmanager
+def api_client(pool_size: int = 4):
+    """TestClient for main.app on an isolated database (startup events don't run)"""
+    with isolated_database(pool_size):
+        yield TestClient(app)
+
+
+def register(client: TestClient, email: str, password: str = "secret123", role: str = "donor") -> dict:
+    response = client.post("/api/v1/auth/register", json={"email": email, "password": password, "role": role})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def login(client: TestClient, email: str, password: str = "secret123", role: str = None) -> dict:
+    """Authorization headers for email, registering it first when role is given"""
+    if role:
+        register(client, email, password, role)
+    response = client.post("/api/v1/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def run_jobs() -> int:
+    """Run the queued background jobs that are due, as a job worker would; returns how many ran"""
+    ran = 0
+    while True:
+        jobs = job_queue.claim("test-harness", settings.JOB_BATCH_SIZE)
+        if not jobs:
+            return ran
+        for job in jobs:
+            job_queue.run(job)
+            ran += 1
+
+
+def check(name, condition, detail=""):
+    print(f"{'✓' if condition else '✗'} {name}{f' ({detail})' if detail else ''}")
+    return condition
+
+
+def _run_one(test) -> tuple:
+    """Run a test, capturing what it prints; returns (passed, output)"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            passed = bool(test())
+        except Exception:
+            traceback.print_exc(file=output)
+            passed = False
+    return passed, output.getvalue()
+
+
+def _run_named(module: str, name: str) -> tuple:
+    return _run_one(getattr(sys.modules.get(module) or __import__(module), name))
+
+
+def run_tests(tests, description: str = None) -> bool:
+    """Run test functions, in parallel worker processes with --jobs; prints each test's output in order"""
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (default: one per CPU)")
+    parser.add_argument("-k", dest="pattern", help="only run tests whose name contains this")
+    args = parser.parse_args()
+    if args.pattern:
+        tests = [test for test in tests if args.pattern in test.__name__]
+
+    started = time.perf_counter()
+    if args.jobs > 1 and len(tests) > 1:
+        module = tests[0].__module__
+        if module == "__main__":
+            module = os.path.splitext(os.path.basename(sys.modules["__main__"].__file__))[0]
+        # spawn: the parent already has threads (log writer) that fork would not carry over
+        with multiprocessing.get_context("spawn").Pool(min(args.jobs, len(tests))) as pool:
+            results = pool.starmap(_run_named, [(module, test.__name__) for test in tests])
+    else:
+        results = [_run_one(test) for test in tests]
+
+    for test, (passed, output) in zip(tests, results):
+        print(f"\n--- {test.__name__} ---")
+        print(output, end="")
+    passed = sum(result[0] for result in results)
+    print(f"\n{passed}/{len(tests)} scenarios passed in {time.perf_counter() - started:.1f}s")
+    return passed == len(tests)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the N+1 / duplicate query audit
+Runs statements against the in-memory MySQL stand-in from
+test_db_resilience.py and checks what the audit reports, both around a
+block (audit_queries) and per request (QueryAuditMiddleware). No MySQL
+server is needed.
+"""
+
+import sys
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from test_db_resilience import check, new_database
+from app.core.config import settings
+from app.core.db_operations import DynamicDBOperations
+from app.core.query_audit import QueryAuditError, QueryAuditMiddleware, audit_queries
+
+
+def test_duplicate_statement():
+    database = new_database()
+    with audit_queries("duplicate", mode="off") as audit:
+        for _ in range(2):
+            database.execute_query("SELECT * FROM donation_events WHERE id = %s", ("event-1",))
+    kinds = [finding["kind"] for finding in audit.report()]
+    return check("Identical statement twice is a duplicate", kinds == ["duplicate"], str(kinds))
+
+
+def test_lookup_loop():
+    ops = DynamicDBOperations(new_database())
+    with audit_queries("lookup loop", mode="off") as audit:
+        for donor_id in ["donor-1", "donor-2", "donor-3", "donor-4", "donor-5", "donor-6"]:
+            ops.get_record_by_id("donors", donor_id)
+    findings = audit.report()
+    finding = findings[0] if len(findings) == 1 else {}
+    return all([
+        check("Single-row lookups in a loop are one finding", finding.get("kind") == "lookup_loop",
+              str([f["kind"] for f in findings])),
+        check("Finding suggests an IN query", "WHERE id IN (...)" in finding.get("suggestion", "")),
+        check("Finding has the call stack", any("get_record_by_id" in frame for frame in finding.get("stack", [])),
+              str(finding.get("stack"))),
+    ])
+
+
+def test_repeated_shape():
+    database = new_database()
+    with audit_queries("repeated", mode="off") as audit:
+        for index in range(settings.QUERY_AUDIT_MAX_REPEATS + 1):
+            database.execute_update("UPDATE donors SET age = %s WHERE blood_type = %s", (30 + index, "O+"))
+    kinds = [finding["kind"] for finding in audit.report()]
+    return check("Shape over QUERY_AUDIT_MAX_REPEATS is repeated", kinds == ["repeated"], str(kinds))
+
+
+def test_raise_mode():
+    database = new_database()
+    try:
+        with audit_queries("raise"):
+            database.execute_query("SELECT COUNT(*) as count FROM donors")
+            database.execute_query("SELECT COUNT(*) as count FROM donors")
+        return check("audit_queries raises in raise mode", False, "no error")
+    except QueryAuditError as e:
+        return check("audit_queries raises in raise mode", "duplicate" in str(e))
+
+
+def test_middleware():
+    database = new_database()
+    ops = DynamicDBOperations(database)
+    app = FastAPI()
+    app.add_middleware(QueryAuditMiddleware)
+
+    @app.get("/donors/{count}")
+    def donors(count: int):
+        return [ops.get_record_by_id("donors", f"donor-{index}") for index in range(count)]
+
+    settings.QUERY_AUDIT_MODE = "raise"
+    try:
+        client = TestClient(app)
+        clean = client.get("/donors/2")
+        flagged = client.get("/donors/5")
+    finally:
+        settings.QUERY_AUDIT_MODE = "off"
+    findings = flagged.json().get("findings", []) if flagged.status_code == 500 else []
+    return all([
+        check("Request under the thresholds passes", clean.status_code == 200, str(clean.status_code)),
+        check("N+1 request fails with its findings", [f["kind"] for f in findings] == ["lookup_loop"],
+              f"{flagged.status_code} {[f['kind'] for f in findings]}"),
+        check("Failure names the route", "GET /donors/{count}" in flagged.json().get("detail", "")),
+    ])
+
+
+def main():
+    print("Testing the query audit...")
+    tests = [
+        test_duplicate_statement,
+        test_lookup_loop,
+        test_repeated_shape,
+        test_raise_mode,
+        test_middleware,
+    ]
+    results = [test() for test in tests]
+    print(f"\n{sum(results)}/{len(results)} scenarios passed")
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Read replica routing tests
+Replaces pymysql.connect with in-memory stand-ins for a primary and two
+replicas, each answering SELECTs with its own name and reporting a
+configurable replication lag, then checks which server serves each read:
+round-robin over healthy replicas, read-your-writes stickiness, replicas
+skipped for lag or failure, and fallback to the primary. No MySQL server
+is needed.
+"""
+
+import contextvars
+import sys
+import time
+import pymysql
+
+from app.core.config import settings
+
+# Fast timings so the scenarios run in well under a second
+settings.DB_HOST = "primary"
+settings.DB_REPLICA_HOSTS = ["replica1", "replica2"]
+settings.DB_REPLICA_MAX_LAG_SECONDS = 5
+settings.DB_REPLICA_LAG_CHECK_SECONDS = 0
+settings.DB_READ_YOUR_WRITES_SECONDS = 0.2
+settings.DB_CONNECT_RETRIES = 0
+settings.DB_READ_RETRIES = 0
+settings.DB_CIRCUIT_FAILURE_THRESHOLD = 100
+
+
+class FakeServer:
+    """Stand-in MySQL server: SELECTs return its name, SHOW REPLICA STATUS its lag"""
+
+    def __init__(self, name, replica):
+        self.name = name
+        self.replica = replica
+        self.reset()
+
+    def reset(self):
+        self.lag = 0 if self.replica else None  # None: replication broken
+        self.standalone = False  # not replicating at all: no replica status
+        self.down = False  # refuse connects, drop open connections
+        self.drop_queries = 0  # lose the connection on this many SELECTs
+        self.reads = 0
+        self.writes = 0
+
+
+servers = {
+    "primary": FakeServer("primary", replica=False),
+    "replica1": FakeServer("replica1", replica=True),
+    "replica2": FakeServer("replica2", replica=True),
+}
+
+
+def connect(host, **kwargs):
+    server = servers[host]
+    if server.down:
+        raise pymysql.err.OperationalError(2003, f"Can't connect to MySQL server on {host} (injected)")
+    return FakeConnection(server)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def execute(self, query, params=None):
+        server = self.connection.server
+        if server.down or not self.connection.open:
+            self.connection.open = False
+            raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query (injected)")
+        if query.startswith("SHOW REPLICA STATUS"):
+            self.rows = [{"Seconds_Behind_Source": server.lag}] if server.replica and not server.standalone else []
+        elif query.startswith("SELECT"):
+            if server.drop_queries:
+                server.drop_queries -= 1
+                self.connection.open = False
+                raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query (injected)")
+            server.reads += 1
+            self.rows = [{"server": server.name}]
+        else:
+            server.writes += 1
+            self.rows = []
+        self.rowcount = len(self.rows) or 1
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.open = True
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def ping(self, reconnect=False):
+        if self.server.down or not self.open:
+            self.open = False
+            raise pymysql.err.OperationalError(2006, "MySQL server has gone away (injected)")
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+pymysql.connect = connect
+
+from app.core.database import Database, read_session
+
+
+def check(name, condition, detail=""):
+    print(f"{'✓' if condition else '✗'} {name}{f' ({detail})' if detail else ''}")
+    return condition
+
+
+def new_database():
+    for server in servers.values():
+        server.reset()
+    return Database(pool_size=2)
+
+
+def request(function, session=None):
+    """Run function as its own request (fresh context), acting for session"""
+    def run():
+        if session is not None:
+            read_session.set(session)
+        return function()
+    return contextvars.Context().run(run)
+
+
+def served_by(database, session=None, **kwargs):
+    """Name of the server that answered a read"""
+    return request(lambda: database.execute_query("SELECT 1", **kwargs)[0]["server"], session)
+
+
+def test_round_robin():
+    database = new_database()
+    readers = [served_by(database) for _ in range(4)]
+    request(lambda: database.execute_update("UPDATE donors SET weight = 70"))
+    primary = served_by(database, primary=True)
+    return all([
+        check("Reads alternate between healthy replicas", sorted(readers) == ["replica1"] * 2 + ["replica2"] * 2,
+              str(readers)),
+        check("Writes go to the primary", servers["primary"].writes == 1
+              and servers["replica1"].writes == servers["replica2"].writes == 0),
+        check("primary=True reads from the primary", primary == "primary", primary),
+    ])
+
+
+def test_read_your_writes():
+    database = new_database()
+
+    def write_then_read():
+        database.execute_update("UPDATE donors SET weight = 70")
+        return database.execute_query("SELECT 1")[0]["server"]
+
+    same_request = request(write_then_read, "user:alice")
+    next_request = served_by(database, "user:alice")
+    other_user = served_by(database, "user:bob")
+    time.sleep(settings.DB_READ_YOUR_WRITES_SECONDS + 0.05)
+    later = served_by(database, "user:alice")
+    return all([
+        check("Read after a write in the same request uses the primary", same_request == "primary", same_request),
+        check("Writer's next request reads from the primary", next_request == "primary", next_request),
+        check("Other users still read from replicas", other_user.startswith("replica"), other_user),
+        check("Writer back on replicas after DB_READ_YOUR_WRITES_SECONDS", later.startswith("replica"), later),
+    ])
+
+
+def test_lagging_replica_skipped():
+    database = new_database()
+    servers["replica1"].lag = settings.DB_REPLICA_MAX_LAG_SECONDS + 5
+    readers = {served_by(database) for _ in range(4)}
+    servers["replica2"].lag = None
+    all_behind = served_by(database)
+    servers["replica1"].lag = servers["replica2"].lag = 0
+    caught_up = {served_by(database) for _ in range(4)}
+    return all([
+        check("Replica behind DB_REPLICA_MAX_LAG_SECONDS skipped", readers == {"replica2"}, str(readers)),
+        check("Primary used when no replica is current", all_behind == "primary", all_behind),
+        check("Replicas used again once caught up", caught_up == {"replica1", "replica2"}, str(caught_up)),
+    ])
+
+
+def test_standalone_replica():
+    database = new_database()
+    servers["replica1"].standalone = True
+    readers = {served_by(database) for _ in range(4)}
+    standalone, settings.DB_REPLICA_ALLOW_STANDALONE = settings.DB_REPLICA_ALLOW_STANDALONE, True
+    try:
+        allowed = {served_by(database) for _ in range(4)}
+    finally:
+        settings.DB_REPLICA_ALLOW_STANDALONE = standalone
+    return all([
+        check("Replica host that isn't replicating skipped", readers == {"replica2"}, str(readers)),
+        check("Used as a stand-in with DB_REPLICA_ALLOW_STANDALONE", allowed == {"replica1", "replica2"},
+              str(allowed)),
+    ])
+
+
+def test_failed_replica():
+    database = new_database()
+    servers["replica1"].down = True
+    readers = {served_by(database) for _ in range(4)}
+    servers["replica2"].down = True
+    all_down = served_by(database)
+    servers["replica1"].down = servers["replica2"].down = False
+    return all([
+        check("Unreachable replica skipped", readers == {"replica2"}, str(readers)),
+        check("Primary used when every replica is down", all_down == "primary", all_down),
+    ])
+
+
+def test_replica_fails_mid_read():
+    database = new_database()
+    settings.DB_REPLICA_LAG_CHECK_SECONDS = 60
+    try:
+        served_by(database)  # first lag check
+        servers["replica1"].drop_queries = servers["replica2"].drop_queries = 1
+        readers = [served_by(database) for _ in range(2)]
+        after = served_by(database)
+        healthy = [replica.healthy for replica in database.replicas]
+        database._replicas_checked_at = float("-inf")
+        rechecked = served_by(database)
+    finally:
+        settings.DB_REPLICA_LAG_CHECK_SECONDS = 0
+    return all([
+        check("Read retried on the primary when a replica drops it", readers == ["primary", "primary"],
+              str(readers)),
+        check("Failed replicas not used until the next check", after == "primary" and healthy == [False, False],
+              f"{after} {healthy}"),
+        check("Next lag check brings them back", rechecked.startswith("replica"), rechecked),
+    ])
+
+
+def main():
+    print("Testing read replica routing with stand-in servers...")
+    tests = [
+        test_round_robin,
+        test_read_your_writes,
+        test_lagging_replica_skipped,
+        test_standalone_replica,
+        test_failed_replica,
+        test_replica_fails_mid_read,
+    ]
+    results = [test() for test in tests]
+    print(f"\n{sum(results)}/{len(results)} scenarios passed")
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Stand-in trace collector for local development
+Accepts the span batches the API posts with TRACING_EXPORTER=collector,
+prints each request's spans as an indented tree and appends them to a
+JSON lines file. Point TRACING_COLLECTOR_URL at it (the default,
+http://localhost:4318/v1/traces, matches the default port).
+
+Usage: python trace_collector.py [--port 4318] [--output traces.jsonl]
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def print_tree(spans):
+    """Print one trace's spans, children under their parents in start order"""
+    children = defaultdict(list)
+    ids = {span["span_id"] for span in spans}
+    for span in sorted(spans, key=lambda span: span["start_time_unix_nano"]):
+        children[span["parent_span_id"] if span["parent_span_id"] in ids else None].append(span)
+
+    def walk(parent_id, depth):
+        for span in children[parent_id]:
+            attributes = " ".join(f"{key}={value}" for key, value in span["attributes"].items())
+            status = "" if span["status"] == "ok" else f" [{span.get('error.type', 'error')}]"
+            print(f"{'  ' * depth}{span['name']} {span['duration_ms']:.2f}ms{status} {attributes}".rstrip())
+            walk(span["span_id"], depth + 1)
+
+    print(f"trace {spans[0]['trace_id']}")
+    walk(None, 1)
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    output = "traces.jsonl"
+
+    def do_POST(self):
+        try:
+            spans = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))["spans"]
+        except (ValueError, KeyError, TypeError):
+            self.send_response(400)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+        traces = defaultdict(list)
+        for span in spans:
+            traces[span["trace_id"]].append(span)
+        for trace_spans in traces.values():
+            print_tree(trace_spans)
+        with open(self.output, "a", encoding="utf-8") as output:
+            output.write("".join(json.dumps(span) + "\n" for span in spans))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="traces.jsonl", help="JSON lines file the spans are appended to")
+    args = parser.parse_args()
+
+    CollectorHandler.output = args.output
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), CollectorHandler)
+    print(f"Collecting traces on http://127.0.0.1:{args.port}/v1/traces")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()